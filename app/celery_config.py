@@ -1,6 +1,14 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import (
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_success,
+    worker_init,
+    worker_process_init,
+)
 
 default = os.environ.get("DJANGO_SETTINGS_MODULE")
 
@@ -15,6 +23,52 @@ app.conf.beat_schedule = CELERYBEAT_SCHEDULE
 app.autodiscover_tasks()
 
 
+# gevent workers (chain queues) need a cooperative database driver
+@worker_init.connect
+def patch_database_driver(**kwargs):
+    from services.utils.db_connections import make_psycopg_green
+
+    make_psycopg_green()
+
+
+# prefork children must not share the parent's database sockets
+@worker_process_init.connect
+def reset_inherited_connections(**kwargs):
+    from services.utils.db_connections import discard_inherited_connections
+
+    discard_inherited_connections()
+
+
+# tasks declared with read_only=True read from the replicas like GET requests
+@task_prerun.connect
+def route_read_only_task(task=None, **kwargs):
+    from services.utils.db_router import enable_replicas_for_task
+
+    enable_replicas_for_task(task)
+
+
+@task_postrun.connect
+def reset_read_only_task(task=None, **kwargs):
+    from services.utils.db_router import reset_replicas_for_task
+
+    reset_replicas_for_task(task)
+
+
+# refreshes queued through the SyncGate free their target when the task is done
+@task_success.connect
+def release_sync_lock(sender=None, **kwargs):
+    from services.utils.sync_gate import release_sync_on_success
+
+    release_sync_on_success(sender=sender, **kwargs)
+
+
+@task_failure.connect
+def release_failed_sync_lock(sender=None, task_id=None, **kwargs):
+    from services.utils.sync_gate import release_sync_on_failure
+
+    release_sync_on_failure(sender=sender, task_id=task_id, **kwargs)
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f"request: {self.request!r}")
@@ -6,4 +6,24 @@ CELERYBEAT_SCHEDULE = {
         "schedule": crontab(minute=0, hour=0),
         "args": (),
     },
+    "index-stakes-every-5-minutes": {
+        "task": "blockchain.sync_stakes",
+        "schedule": crontab(minute="*/5"),
+        "args": (),
+    },
+    "reconcile-dao-stats-every-hour": {
+        "task": "dao.reconcile_dao_stats",
+        "schedule": crontab(minute=30),
+        "args": (),
+    },
+    "flush-forum-views-every-minute": {
+        "task": "forum.flush_views",
+        "schedule": crontab(),
+        "args": (),
+    },
+    "finalize-ended-dips-every-minute": {
+        "task": "forum.finalize_ended_dips",
+        "schedule": crontab(),
+        "args": (),
+    },
 }
@@ -0,0 +1,17 @@
+import os
+
+bind = "0.0.0.0:8000"
+workers = int(os.environ.get("GUNICORN_WORKERS", 3))
+# recycle workers now and then, persistent database connections go with them
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+raw_env = [f"DB_APPLICATION_NAME={os.environ.get('DB_APPLICATION_NAME', 'daocafe-web')}"]
+
+
+def post_fork(server, worker):
+    """with preload_app the master may hold connections, children open their own"""
+    if not server.cfg.preload_app:
+        return
+    from services.utils.db_connections import discard_inherited_connections
+
+    discard_inherited_connections()
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
+from kombu import Queue
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
 
@@ -35,6 +36,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "drf_spectacular",
     "rest_framework_simplejwt",
@@ -55,6 +57,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "services.utils.db_router.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -88,9 +91,42 @@ DATABASES = {
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASSWORD"),
+        # persistent connections, reused across requests and tasks of a process and
+        # pinged before reuse so a restarted postgres never surfaces as a failed request
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "application_name": os.environ.get("DB_APPLICATION_NAME", "daocafe"),
+            "connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", 5)),
+            # detect dead peers on idle persistent connections
+            "keepalives": 1,
+            "keepalives_idle": 30,
+            "keepalives_interval": 10,
+            "keepalives_count": 3,
+        },
     }
 }
 
+# read replicas, comma-separated hosts sharing the primary's credentials. safe-method
+# requests read from them unless the client wrote within REPLICA_PIN_SECONDS or the
+# replica lags more than REPLICA_MAX_LAG_SECONDS
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))
+):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["services.utils.db_router.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", 2))
+REPLICA_LAG_CHECK_SECONDS = int(os.environ.get("REPLICA_LAG_CHECK_SECONDS", 5))
+
 
 LANGUAGE_CODE = "en-us"
 
@@ -136,7 +172,11 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_HEADERS = list(default_headers) + [
     'sentry-trace',
     'baggage',
+    'if-none-match',
+    'if-modified-since',
 ]
+# let the frontend read validators for conditional polling
+CORS_EXPOSE_HEADERS = ['etag', 'last-modified']
 
 
 REST_FRAMEWORK = {
@@ -145,6 +185,16 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson renders decimals, datetimes and uuids natively
+    "DEFAULT_RENDERER_CLASSES": [
+        "services.utils.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "services.utils.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     
     # Add throttling configuration
     "DEFAULT_THROTTLE_CLASSES": [
@@ -167,7 +217,7 @@ REST_FRAMEWORK = {
 # Hide browsable API in production
 if not DEBUG:
     REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
-        "rest_framework.renderers.JSONRenderer",
+        "services.utils.renderers.ORJSONRenderer",
     ]
 
 
@@ -179,6 +229,17 @@ CACHES = {
         "LOCATION": "redis://redis:6379/1",
     }
 }
+
+# raw redis connection for counters and sets that do not fit the cache api
+REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/2")
+
+# public read endpoints served from the cache, invalidated by generation bumps on writes
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "True").lower() == "true"
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 300))
+
+# server-sent events: keepalive comment interval and lifetime of one stream
+SSE_HEARTBEAT_SECONDS = int(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+SSE_MAX_SECONDS = int(os.environ.get("SSE_MAX_SECONDS", 300))
 ######## DRF CONFIG ########
 
 SPECTACULAR_SETTINGS = {
@@ -221,6 +282,14 @@ SPECTACULAR_SETTINGS = {
             "name": "dynamic",
             "description": "dynamic handling view for thread and dip replies",
         },
+        {
+            "name": "search",
+            "description": "full-text search over threads, dips and replies",
+        },
+        {
+            "name": "jobs",
+            "description": "status and results of queued blockchain jobs",
+        },
     ],
 }
 
@@ -253,6 +322,55 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_BACKEND = "redis://redis:6379/0"
 CELERY_TIMEZONE = "UTC"
 
+# chain i/o runs on chain.<network> queues (gevent workers), database maintenance and
+# image work on the prefork maintenance queue. networks missing from
+# CHAIN_QUEUE_NETWORKS share chain.default. a worker started without -Q consumes every
+# queue below, production workers pick theirs with -Q / -X
+CHAIN_QUEUE_NETWORKS = [
+    int(network)
+    for network in os.environ.get(
+        "CHAIN_QUEUE_NETWORKS", "1,10,56,100,130,137,480,8453,42161,11155111,31337"
+    ).split(",")
+    if network.strip()
+]
+CELERY_TASK_DEFAULT_QUEUE = "celery"
+CELERY_TASK_QUEUES = [
+    Queue("celery"),
+    Queue("maintenance"),
+    Queue("chain.default"),
+    *(Queue(f"chain.{network}") for network in CHAIN_QUEUE_NETWORKS),
+]
+CELERY_TASK_ROUTES = ("services.utils.task_routing.route_task",)
+CELERY_TASK_ANNOTATIONS = ("services.utils.task_routing.QueueAnnotations",)
+# one reserved task per pool slot, queued work never waits behind a long run it was
+# prefetched with
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# fetch and refresh endpoints answer 202 with a job id, job state lives in redis this long
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", 60 * 60 * 24))
+
+# refresh endpoints coalesce onto the sync in flight for the same target and skip
+# targets synced within the freshness window (seconds per operation)
+SYNC_GATE_ENABLED = os.environ.get("SYNC_GATE_ENABLED", "True").lower() == "true"
+SYNC_FRESHNESS_SECONDS = {
+    "default": int(os.environ.get("SYNC_FRESHNESS_SECONDS", 30)),
+    "dao_fetch": 0,
+}
+SYNC_LOCK_SECONDS = int(os.environ.get("SYNC_LOCK_SECONDS", 600))
+
+# redis redelivers tasks not acknowledged within visibility_timeout, eta tasks included
+CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 60 * 60}
+
+# active dips are finalized when voting ends. a finalize task with the end time as eta
+# is queued once the end is within the horizon (kept below visibility_timeout), a
+# sweep every minute catches dips past their end. passed dips waiting for execution
+# are re-read at most every FINALIZE_RECHECK_SECONDS
+FINALIZE_ETA_HORIZON_SECONDS = int(os.environ.get("FINALIZE_ETA_HORIZON_SECONDS", 45 * 60))
+FINALIZE_GRACE_SECONDS = int(os.environ.get("FINALIZE_GRACE_SECONDS", 5))
+FINALIZE_RECHECK_SECONDS = int(os.environ.get("FINALIZE_RECHECK_SECONDS", 10 * 60))
+# on-demand status refreshes delay their chain reads this long, once for all steps
+FINALIZE_PROPAGATION_SECONDS = int(os.environ.get("FINALIZE_PROPAGATION_SECONDS", 15))
+
 # Blockchain settings
 BLOCKCHAIN_SCAN_BLOCK_RANGE = 100000  # Default number of blocks to scan for events
 
@@ -13,6 +13,14 @@ CACHES = {
     }
 }
 
+REDIS_URL = f"redis://{REDIS_HOST}:6379/2"
+
+# redis outlives the test database, cached payloads would leak between runs
+RESPONSE_CACHE_ENABLED = False
+
+# sync locks and freshness markers outlive the test database as well
+SYNC_GATE_ENABLED = False
+
 # Override Celery broker URL
 CELERY_BROKER_URL = f"redis://{REDIS_HOST}:6379/0"
 CELERY_RESULT_BACKEND = f"redis://{REDIS_HOST}:6379/0"
@@ -10,6 +10,7 @@ from django.conf.urls.static import static
 from forum.views import DipSyncronizationView, DipSingleSyncronizationView
 
 from dao.views import StakeView
+from core.views import JobStatusView
 from forum.urls import vote_router
 
 api_urlpatterns = [
@@ -37,6 +38,12 @@ api_urlpatterns = [
         DipSingleSyncronizationView.as_view({"patch": "update"}),
         name="refresh-status",
     ),
+    # background jobs queued by the fetch and refresh endpoints
+    path(
+        "jobs/<uuid:job_id>/",
+        JobStatusView.as_view({"get": "retrieve"}),
+        name="job-status",
+    ),
 ]
 
 urlpatterns = [
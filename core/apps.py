@@ -5,3 +5,12 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
 
+    def ready(self):
+        import core.signals  # noqa
+        from django.db.backends.signals import connection_created
+        from services.utils.db_connections import ConnectionMetrics
+
+        connection_created.connect(
+            ConnectionMetrics.connection_opened,
+            dispatch_uid="db_connection_metrics",
+        )
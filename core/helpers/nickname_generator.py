@@ -25,3 +25,18 @@ def generate_unique_nickname():
                 return nickname
     except ProgrammingError:
         return generate_random_nickname()
+
+
+def generate_unique_nicknames(count) -> list:
+    """nicknames unique among themselves and the stored users, one query per round"""
+    from core.models import User
+
+    nicknames = set()
+    while len(nicknames) < count:
+        candidates = {generate_random_nickname() for _ in range(count - len(nicknames))}
+        candidates -= nicknames
+        taken = set(
+            User.objects.filter(nickname__in=candidates).values_list("nickname", flat=True)
+        )
+        nicknames |= candidates - taken
+    return list(nicknames)
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+
+from services.utils.image_variants import ImageVariantService
+
+
+def snapshot_users(user_ids, request=None) -> dict:
+    """
+    current nickname and avatar of the users listed in stored snapshots (top stakers,
+    top voters), one query. snapshots keep the user id and are resolved when served, a
+    rename or a new upload shows up and replaced image files are never referenced
+
+    Args:
+        user_ids (iterable): ids collected from the snapshots
+        request (Request, optional): makes the avatar urls absolute
+
+    Returns:
+        dict: {user id: {"user": nickname, "image": avatar url}}
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return {}
+    users = get_user_model().objects.filter(id__in=user_ids).only(
+        "id", "nickname", "image", "image_variants"
+    )
+    return {
+        user.id: {
+            "user": user.nickname,
+            "image": ImageVariantService.url(user, "image", "avatar", request),
+        }
+        for user in users
+    }
+
+
+def render_snapshot(entries, users) -> list:
+    """
+    Args:
+        entries (list): stored snapshot rows carrying user_id
+        users (dict): result of snapshot_users
+
+    Returns:
+        list: rows with the current nickname and avatar, without the internal user id
+    """
+    rendered = []
+    for entry in entries or []:
+        entry = dict(entry)
+        user = users.get(entry.pop("user_id", None), {})
+        entry["user"] = user.get("user", entry.get("user"))
+        entry["image"] = user.get("image")
+        rendered.append(entry)
+    return rendered
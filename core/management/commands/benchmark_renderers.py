@@ -0,0 +1,131 @@
+import datetime
+import decimal
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from services.utils.renderers import ORJSONRenderer
+
+
+def lexical_tree(paragraphs):
+    return {
+        "root": {
+            "type": "root",
+            "children": [
+                {
+                    "type": "paragraph",
+                    "children": [
+                        {"type": "text", "text": f"paragraph {index} " * 12, "format": 0}
+                    ],
+                }
+                for index in range(paragraphs)
+            ],
+        }
+    }
+
+
+def sample_payloads():
+    """pages shaped like the dao directory, a thread detail and presale transactions"""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    amount = decimal.Decimal("123456789012345678901234567890")
+    author = {"nickname": "holder", "email": None, "image": "https://dao.cafe/media/a.webp"}
+    return {
+        "dao list": {
+            "data": {
+                "count": 10,
+                "next": None,
+                "previous": None,
+                "results": [
+                    {
+                        "dao_name": f"dao {index}",
+                        "slug": f"dao{index}",
+                        "dao_image": "https://dao.cafe/media/images/dao/logo_card.webp",
+                        "network": 11155111,
+                        "symbol": "DAO",
+                        "stake": {
+                            "staker_count": "120",
+                            "total_staked": amount,
+                            "top_stakers": [
+                                {"user": "holder", "amount": amount, "image": None}
+                            ]
+                            * 5,
+                        },
+                        "treasury": {"0x" + "ab" * 20: amount, "0x" + "00" * 20: amount},
+                        "circulating_supply": amount,
+                    }
+                    for index in range(10)
+                ],
+            }
+        },
+        "thread detail": {
+            "id": 1,
+            "title": "treasury allocation",
+            "content": lexical_tree(40),
+            "created_at": now,
+            "author": author,
+            "replies": {
+                "count": 10,
+                "next": None,
+                "results": [
+                    {
+                        "id": index,
+                        "content": lexical_tree(4),
+                        "author": author,
+                        "created_at": now,
+                        "likes_count": index,
+                        "is_liked": False,
+                    }
+                    for index in range(10)
+                ],
+            },
+        },
+        "presale transactions": {
+            "data": {
+                "count": 10,
+                "next": None,
+                "previous": None,
+                "results": [
+                    {
+                        "id": index,
+                        "user_address": "0x" + "cd" * 20,
+                        "user_nickname": "buyer",
+                        "action": "buy",
+                        "token_amount": amount,
+                        "eth_amount": amount,
+                        "transaction_hash": "0x" + uuid.uuid4().hex * 2,
+                        "timestamp": now,
+                    }
+                    for index in range(10)
+                ],
+            }
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare the CPU time of DRF's JSONRenderer and the orjson renderer per response"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    def measure(self, renderer, data, iterations):
+        started = time.process_time()
+        for _ in range(iterations):
+            renderer.render(data)
+        return (time.process_time() - started) / iterations * 1_000_000
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        stock, fast = JSONRenderer(), ORJSONRenderer()
+
+        for name, data in sample_payloads().items():
+            size = len(fast.render(data))
+            stock_us = self.measure(stock, data, iterations)
+            fast_us = self.measure(fast, data, iterations)
+            self.stdout.write(
+                f"{name:<22} {size / 1024:7.1f} KiB  json {stock_us:8.1f} us  "
+                f"orjson {fast_us:7.1f} us  saved {stock_us - fast_us:8.1f} us/request "
+                f"({stock_us / fast_us:4.1f}x)"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from services.utils.db_connections import ConnectionMetrics
+
+
+class Command(BaseCommand):
+    help = "Show database connections opened per process role and live connections on postgres"
+
+    def handle(self, *args, **options):
+        snapshot = ConnectionMetrics.snapshot()
+        self.stdout.write(f"CONN_MAX_AGE: {snapshot['conn_max_age']}s")
+
+        for role, counters in sorted(snapshot["counters"].items()):
+            self.stdout.write(
+                f"{role}: {counters.get('opened', 0)} connections opened "
+                f"by {counters.get('processes', 0)} forked processes"
+            )
+
+        total = sum(row["count"] for row in snapshot["server"])
+        self.stdout.write(
+            f"postgres: {total} of {snapshot['max_connections']} connections in use"
+        )
+        for row in snapshot["server"]:
+            self.stdout.write(
+                f"  {row['application'] or '-'} {row['state']}: {row['count']}"
+            )
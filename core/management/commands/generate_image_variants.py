@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from core.models import User
+from dao.models import Dao
+from services.utils.image_variants import ImageVariantService
+
+
+class Command(BaseCommand):
+    help = "Generate missing webp and jpeg derivatives of dao and user images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Generate in this process instead of enqueueing celery tasks",
+        )
+
+    def handle(self, *args, **options):
+        from core.tasks import generate_image_variants
+
+        for model in (Dao, User):
+            pending = 0
+            for instance in model.objects.iterator():
+                if not ImageVariantService.pending_fields(instance):
+                    continue
+                pending += 1
+                if options["sync"]:
+                    ImageVariantService.generate(instance)
+                else:
+                    generate_image_variants.delay(instance._meta.label, instance.pk)
+            self.stdout.write(f"{pending} {model.__name__} rows need image variants")
+        self.stdout.write(self.style.SUCCESS("Image variants scheduled"))
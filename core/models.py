@@ -76,6 +76,10 @@ class User(AbstractBaseUser, PermissionsMixin):
         validators=[FileExtensionValidator(["jpg", "jpeg", "png"])],
         default="images/default-placeholder.jpg",
     )
+    # resized derivatives written by the generate_image_variants task
+    image_variants = models.JSONField(
+        default=dict, blank=True, help_text="webp and jpeg derivatives of image"
+    )
     date_joined = models.DateTimeField(auto_now_add=True)
     last_seen = models.DateTimeField(auto_now=True, null=True)
     is_active = models.BooleanField(default=True)
@@ -83,6 +87,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = "eth_address"
     REQUIRED_FIELDS = []
+    IMAGE_VARIANTS = {"image": ("avatar",)}
 
     objects = UserManager()
 
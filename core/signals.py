@@ -0,0 +1,44 @@
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+from services.utils.image_variants import ImageVariantService
+from .models import User
+
+# fields embedded in cached dao and forum payloads (authors, stakers, voters)
+PROFILE_FIELDS = {"nickname", "image", "image_variants"}
+
+
+def profile_values(instance):
+    """loaded profile fields of the user, deferred ones are left out instead of fetched"""
+    values = {}
+    for field in PROFILE_FIELDS & instance.__dict__.keys():
+        value = instance.__dict__[field]
+        # image is a file name once loaded and a FieldFile after the first access
+        values[field] = getattr(value, "name", value)
+    return values
+
+
+@receiver(post_init, sender=User)
+def remember_profile(sender, instance, **kwargs):
+    instance._loaded_profile = profile_values(instance)
+
+
+@receiver(pre_save, sender=User)
+def detect_profile_change(sender, instance, update_fields=None, **kwargs):
+    loaded = getattr(instance, "_loaded_profile", {})
+    current = profile_values(instance)
+    fields = PROFILE_FIELDS if update_fields is None else PROFILE_FIELDS & set(update_fields)
+
+    instance._profile_changed = not instance._state.adding and any(
+        field in current and current[field] != loaded.get(field) for field in fields
+    )
+    instance._loaded_profile = {**loaded, **current}
+
+
+def profile_changed(instance, created):
+    """a new user is embedded nowhere yet, saves such as last_login leave payloads valid"""
+    return not created and getattr(instance, "_profile_changed", False)
+
+
+@receiver(post_save, sender=User)
+def schedule_user_image_variants(sender, instance, **kwargs):
+    ImageVariantService.schedule(instance)
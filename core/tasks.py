@@ -0,0 +1,31 @@
+from celery import shared_task
+from django.apps import apps
+from logging_config import logger
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=10,
+    autoretry_for=(OSError,),
+    name="media.generate_image_variants",
+)
+def generate_image_variants(self, model_label, pk):
+    """
+    generates the resized webp and jpeg derivatives of a freshly uploaded image
+
+    Args:
+        model_label (str): app_label.ModelName of a model declaring IMAGE_VARIANTS
+        pk (int): primary key of the instance
+
+    Returns:
+        dict: image_variants stored on the instance
+    """
+    from services.utils.image_variants import ImageVariantService
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        logger.info(f"{model_label} {pk} was deleted before its variants were generated")
+        return {}
+    return ImageVariantService.generate(instance)
@@ -58,3 +58,56 @@ class CommandTests(SimpleTestCase):
             name="delete dips every 24 hours",
             task="forum.tasks.dip_cleanup",
         )
+
+
+class RendererBenchmarkTests(SimpleTestCase):
+    """orjson renderer output and the renderer benchmark command"""
+
+    def test_orjson_renderer_matches_stock_output(self):
+        import datetime
+        import decimal
+        import json
+        from rest_framework.renderers import JSONRenderer
+        from services.utils.renderers import ORJSONRenderer
+
+        data = {
+            "amount": decimal.Decimal("123456789012345678901234567890"),
+            "at": datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc),
+            "text": "ünïcode",
+        }
+        rendered = json.loads(ORJSONRenderer().render(data))
+        stock = json.loads(JSONRenderer().render(data))
+
+        # the stock encoder rounds decimals through float, orjson keeps every digit
+        self.assertEqual(rendered.pop("amount"), "123456789012345678901234567890")
+        stock.pop("amount")
+        self.assertEqual(rendered, stock)
+
+    def test_benchmark_renderers_reports_every_payload(self):
+        from io import StringIO
+
+        out = StringIO()
+        call_command("benchmark_renderers", iterations=5, stdout=out)
+
+        for name in ("dao list", "thread detail", "presale transactions"):
+            self.assertIn(name, out.getvalue())
+
+
+class ConnectionLifecycleTests(SimpleTestCase):
+    """persistent connections are not shared with forked children"""
+
+    def test_discard_inherited_connections_keeps_parent_socket_open(self):
+        from unittest.mock import MagicMock
+        from services.utils import db_connections
+
+        parent_socket = MagicMock()
+        inherited = MagicMock(connection=parent_socket)
+
+        with patch.object(
+            db_connections.connections, "all", return_value=[inherited]
+        ), patch.object(db_connections.ConnectionMetrics, "process_started"):
+            db_connections.discard_inherited_connections()
+
+        self.assertIsNone(inherited.connection)
+        parent_socket.close.assert_not_called()
+        self.assertIn(parent_socket, db_connections._inherited)
@@ -0,0 +1,73 @@
+"""
+test read replica routing and primary pinning after writes
+"""
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from services.utils.db_router import (
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+    use_replicas,
+)
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica_0"],
+    REPLICA_MAX_LAG_SECONDS=2,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class ReplicaRoutingTests(SimpleTestCase):
+    """reads go to a replica only for safe requests of clients that did not just write"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        # lag measurements are cached between requests
+        cache.clear()
+
+    @patch("services.utils.db_router.ReplicaHealth.measure", return_value=0.1)
+    def test_reads_use_replica_only_when_enabled(self, patched_measure):
+        self.assertEqual(self.router.db_for_read(None), "default")
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(None), "replica_0")
+            self.assertEqual(self.router.db_for_write(None), "default")
+        self.assertEqual(self.router.db_for_read(None), "default")
+
+    @patch("services.utils.db_router.ReplicaHealth.measure", return_value=30.0)
+    def test_lagging_replica_falls_back_to_primary(self, patched_measure):
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(None), "default")
+
+    @patch("services.utils.db_router.ReplicaHealth.measure", return_value=0.0)
+    def test_client_is_pinned_to_primary_after_write(self, patched_measure):
+        routed = []
+
+        def view(request):
+            routed.append(self.router.db_for_read(None))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        headers = {"HTTP_AUTHORIZATION": "Bearer writer"}
+
+        middleware(self.factory.get("/api/v1/dao/", **headers))
+        middleware(self.factory.post("/api/v1/dao/slugish/threads/", **headers))
+        middleware(self.factory.get("/api/v1/dao/", **headers))
+        middleware(self.factory.get("/api/v1/dao/", HTTP_AUTHORIZATION="Bearer reader"))
+
+        self.assertEqual(routed, ["replica_0", "default", "default", "replica_0"])
+
+    @patch("services.utils.db_router.ReplicaHealth.measure", return_value=0.0)
+    def test_payloads_after_a_bump_are_read_from_primary(self, patched_measure):
+        import time
+        from services.utils.response_cache import ResponseCache
+
+        with use_replicas():
+            # a replica may not have replayed the write behind a fresh generation yet
+            with ResponseCache.reads_for(int(time.time())):
+                self.assertEqual(self.router.db_for_read(None), "default")
+            with ResponseCache.reads_for(int(time.time()) - 60):
+                self.assertEqual(self.router.db_for_read(None), "replica_0")
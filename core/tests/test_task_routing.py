@@ -0,0 +1,48 @@
+"""
+test celery routing of chain tasks to per-network queues
+"""
+
+from django.test import TestCase, override_settings
+
+from dao.tests.dao_utils import DaoBaseMixin
+from forum.tasks import dip_cleanup, sync_proposals_task, update_presale_state
+from dao.tasks import fetch_dao_job
+from services.utils.task_routing import QueueAnnotations, route_task
+
+
+@override_settings(CHAIN_QUEUE_NETWORKS=[11155111])
+class TaskRoutingTests(TestCase):
+    """chain tasks follow the network of their dao, maintenance stays apart"""
+
+    def setUp(self):
+        self.dao = DaoBaseMixin().create_dao()
+
+    def route(self, task, *args, **kwargs):
+        return route_task(task.name, args, kwargs, {}, task=task)
+
+    def test_chain_task_goes_to_queue_of_its_network(self):
+        self.assertEqual(self.route(sync_proposals_task, self.dao.id), {"queue": "chain.11155111"})
+        self.assertEqual(
+            self.route(fetch_dao_job, "job", 1, "0xabc", network=11155111),
+            {"queue": "chain.11155111"},
+        )
+
+    def test_unknown_network_and_sweeps_share_default_chain_queue(self):
+        self.assertEqual(
+            self.route(fetch_dao_job, "job", 1, "0xabc", network=1),
+            {"queue": "chain.default"},
+        )
+        self.assertEqual(self.route(sync_proposals_task, 999999), {"queue": "chain.default"})
+        self.assertEqual(self.route(update_presale_state), {"queue": "chain.default"})
+
+    def test_maintenance_and_other_tasks(self):
+        self.assertEqual(self.route(dip_cleanup), {"queue": "maintenance"})
+        self.assertIsNone(route_task("core.something", (), {}, {}))
+
+    def test_chain_tasks_are_acknowledged_late(self):
+        annotations = QueueAnnotations()
+        self.assertEqual(
+            annotations.annotate(sync_proposals_task),
+            {"acks_late": True, "reject_on_worker_lost": True},
+        )
+        self.assertEqual(annotations.annotate(dip_cleanup), {"acks_late": True})
@@ -0,0 +1,26 @@
+from rest_framework import viewsets, status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from drf_spectacular.utils import extend_schema
+from services.utils.exception_handler import ErrorHandlingMixin
+from services.utils.jobs import JobStore
+
+
+@extend_schema(tags=["jobs"])
+class JobStatusView(ErrorHandlingMixin, viewsets.ViewSet):
+    """
+    progress and result of a background job queued by a refresh or fetch endpoint.
+    poll until status is succeeded or failed, jobs expire after JOB_RESULT_TTL
+    """
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def retrieve(self, request, job_id=None):
+        job = JobStore.get(job_id)
+        # jobs of other users are reported as missing, not forbidden
+        if job is None or job.pop("owner") not in (None, request.user.pk):
+            raise NotFound(f"job {job_id} does not exist or has expired")
+        return Response(job, status=status.HTTP_200_OK)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from dao.packages.services.stake_service import StakeService
+
+
+class Command(BaseCommand):
+    help = "Rebuild denormalized staking statistics (staker count, total staked, top stakers) of DAOs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dao", type=int, nargs="*", help="only reconcile the given dao ids"
+        )
+
+    def handle(self, *args, **options):
+        reconciled = StakeService.reconcile_dao_stats(options.get("dao"))
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled staking statistics for {reconciled} DAOs")
+        )
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_stakes(apps, schema_editor):
+    """keeps the most recent stake row per (user, dao) before the unique constraint is added"""
+    Stake = apps.get_model("dao", "Stake")
+    seen = set()
+    for stake in Stake.objects.order_by("-id").only("id", "user_id", "dao_id"):
+        key = (stake.user_id, stake.dao_id)
+        if key in seen:
+            stake.delete()
+        else:
+            seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dao', '0009_remove_treasury_native_balance_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='stake_sync_block',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(remove_duplicate_stakes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='stake',
+            unique_together={('user', 'dao')},
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_staking_stats(apps, schema_editor):
+    """fills the new columns from existing stakes, the top stakers snapshot is left to reconcile_dao_stats"""
+    Dao = apps.get_model("dao", "Dao")
+    Stake = apps.get_model("dao", "Stake")
+    stats = (
+        Stake.objects.order_by()
+        .values("dao_id")
+        .annotate(staker_count=Count("id"), total_staked=Sum("amount"))
+    )
+    for row in stats:
+        Dao.objects.filter(id=row["dao_id"]).update(
+            staker_count=row["staker_count"], total_staked=row["total_staked"] or 0
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dao', '0010_stake_indexer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dao',
+            name='staker_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dao',
+            name='top_stakers',
+            field=models.JSONField(blank=True, default=list, help_text='snapshot of the largest stakers for the dao directory'),
+        ),
+        migrations.AddField(
+            model_name='dao',
+            name='total_staked',
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=32),
+        ),
+        migrations.RunPython(backfill_staking_stats, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dao',
+            index=models.Index(fields=['is_active', '-total_staked'], name='dao_dao_is_acti_fd7ae4_idx'),
+        ),
+    ]
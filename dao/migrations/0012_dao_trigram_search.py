@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-19 00:05
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dao', '0011_dao_staking_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='dao',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['dao_name'], name='dao_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dao',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['token_name'], name='dao_token_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dao',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['symbol'], name='dao_symbol_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dao',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['slug'], name='dao_slug_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
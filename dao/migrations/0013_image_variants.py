@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dao', '0012_dao_trigram_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dao',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='webp and jpeg derivatives of dao_image and cover_image'),
+        ),
+    ]
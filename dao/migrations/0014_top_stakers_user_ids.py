@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:10
+
+from django.db import migrations
+
+
+def snapshot_user_ids(apps, schema_editor):
+    """top stakers keep the user id, image urls are resolved when served"""
+    Dao = apps.get_model("dao", "Dao")
+    User = apps.get_model("core", "User")
+
+    for dao in Dao.objects.exclude(top_stakers=[]).only("id", "top_stakers"):
+        nicknames = [staker.get("user") for staker in dao.top_stakers]
+        ids = dict(
+            User.objects.filter(nickname__in=nicknames).values_list("nickname", "id")
+        )
+        dao.top_stakers = [
+            {
+                "user_id": ids.get(staker.get("user")),
+                "user": staker.get("user"),
+                "amount": staker.get("amount"),
+            }
+            for staker in dao.top_stakers
+        ]
+        dao.save(update_fields=["top_stakers"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_image_variants'),
+        ('dao', '0013_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(snapshot_user_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dao", "0014_top_stakers_user_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contract",
+            name="deployment_block",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
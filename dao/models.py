@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
+from django.contrib.postgres.indexes import GinIndex
 from core.validators.eth_network_validator import validate_network
 
 
@@ -54,6 +55,43 @@ class Dao(models.Model):
     )
     version = models.CharField(null=False, default="1.0.0")
 
+    # staking statistics maintained by StakeService whenever stakes change
+    staker_count = models.PositiveIntegerField(default=0)
+    total_staked = models.DecimalField(max_digits=32, decimal_places=0, default=0)
+    top_stakers = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="snapshot of the largest stakers for the dao directory",
+    )
+    # resized derivatives written by the generate_image_variants task
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="webp and jpeg derivatives of dao_image and cover_image",
+    )
+
+    IMAGE_VARIANTS = {"dao_image": ("avatar", "card"), "cover_image": ("cover",)}
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["is_active", "-total_staked"]),
+            # trigram indexes behind the directory search
+            GinIndex(
+                fields=["dao_name"], name="dao_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["token_name"],
+                name="dao_token_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["symbol"], name="dao_symbol_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                fields=["slug"], name="dao_slug_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ]
+
     @property
     def contracts(self):
         """returns all associated contracts for the dao object"""
@@ -65,6 +103,10 @@ class Contract(models.Model):
     token_address = models.CharField(max_length=42, null=False, blank=False)
     treasury_address = models.CharField(max_length=42, null=False, blank=False)
     staking_address = models.CharField(max_length=42, null=False, blank=False)
+    # last block whose stake events were indexed
+    stake_sync_block = models.PositiveBigIntegerField(default=0)
+    # block of the factory DAOCreated log, stake indexing starts there
+    deployment_block = models.PositiveBigIntegerField(default=0)
 
     dao = models.ForeignKey(Dao, on_delete=models.CASCADE, related_name="dao_contracts")
 
@@ -87,6 +129,7 @@ class Stake(models.Model):
     )
 
     class Meta:
+        unique_together = ["user", "dao"]
         indexes = [
             models.Index(fields=["dao"]),
             models.Index(fields=["user"]),
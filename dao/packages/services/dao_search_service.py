@@ -0,0 +1,87 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, Exists, FloatField, OuterRef, Q, Value, When
+from django.db.models.functions import Cast, Greatest
+from rest_framework import serializers
+from dao.models import Presale, PresaleStatus
+
+
+class DaoSearchService:
+    """server-side filtering and fuzzy name search for the dao directory"""
+
+    MIN_QUERY_LENGTH = 2
+    # columns covered by the gin_trgm_ops indexes
+    SEARCH_FIELDS = ("dao_name", "token_name", "symbol", "slug")
+
+    @staticmethod
+    def filter_directory(queryset, params):
+        """
+        applies the directory filters from the query string
+
+        Args:
+            queryset (QuerySet): Dao queryset
+            params (QueryDict): request query params, network, presale and min_staked
+
+        Returns:
+            QuerySet: filtered queryset
+        """
+        network = params.get("network")
+        if network and network.isdigit():
+            queryset = queryset.filter(network=int(network))
+
+        min_staked = params.get("min_staked")
+        if min_staked and min_staked.isdigit():
+            queryset = queryset.filter(total_staked__gte=int(min_staked))
+
+        presale = params.get("presale")
+        if presale:
+            if presale not in PresaleStatus.values:
+                raise serializers.ValidationError(
+                    f"presale must be one of {', '.join(PresaleStatus.values)}"
+                )
+            # exists instead of a join so daos with several presales are not repeated
+            queryset = queryset.filter(
+                Exists(Presale.objects.filter(dao=OuterRef("pk"), status=presale))
+            )
+        return queryset
+
+    @staticmethod
+    def search(queryset, query):
+        """
+        fuzzy match on name, token name, symbol and slug. substring and trigram
+        similarity conditions are both answered by the trigram gin indexes,
+        exact symbol or slug hits always rank first
+
+        Args:
+            queryset (QuerySet): Dao queryset
+            query (str): raw query from the request
+
+        Returns:
+            QuerySet: matching daos annotated with rank (double precision for cursors)
+        """
+        query = query.strip()
+        if len(query) < DaoSearchService.MIN_QUERY_LENGTH:
+            raise serializers.ValidationError(
+                f"q must be at least {DaoSearchService.MIN_QUERY_LENGTH} characters"
+            )
+
+        # word similarity compares the query with the closest words of a column, whole
+        # column similarity stays under the threshold for one misspelled word of a long name
+        matches = Q()
+        for field in DaoSearchService.SEARCH_FIELDS:
+            matches |= Q(**{f"{field}__icontains": query})
+            matches |= Q(**{f"{field}__trigram_word_similar": query})
+
+        similarity = Greatest(
+            *(
+                TrigramWordSimilarity(query, field)
+                for field in DaoSearchService.SEARCH_FIELDS
+            )
+        )
+        exact = Case(
+            When(Q(symbol__iexact=query) | Q(slug__iexact=query), then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return queryset.filter(matches).annotate(
+            rank=Cast(exact + similarity, FloatField())
+        )
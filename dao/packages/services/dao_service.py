@@ -43,6 +43,7 @@ class DaoService:
                 token_address=chain_data["token_address"],
                 treasury_address=chain_data["treasury_address"],
                 staking_address=chain_data["staking_address"],
+                deployment_block=chain_data.get("deployment_block", 0),
             )
             logger.info("Dao and contracts have been successfully instantiated")
         
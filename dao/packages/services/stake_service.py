@@ -1,4 +1,10 @@
-from .__init__ import Stake, Dao, logger, DaoConfirmationService
+from .__init__ import Stake, Dao, Contract, logger, transaction, DaoConfirmationService
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from core.helpers.nickname_generator import generate_unique_nicknames
+from services.utils.response_cache import ResponseCache
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import RowNumber
 from typing import Optional
 
 
@@ -8,7 +14,7 @@ class StakeService:
     @staticmethod
     def create_stake_instance(user, dao_id=None, slug=None) -> Stake:
         """
-        creates a stake instance if not already staked. depends on info retrieval from blockchain
+        creates or updates the stake of the user from the chain, removes it once fully unstaked
 
         Args:
             user (int): user extracted from request context
@@ -16,7 +22,7 @@ class StakeService:
             slug (string, optional): passed from a serializer context. Defaults to None.
 
         Returns:
-            Stake: the created Stake object
+            Stake: the stored Stake object, unsaved with a zero amount after a full unstake
         """
         logger.info(f"passed id: {dao_id}, passed user: {user}")
 
@@ -35,23 +41,211 @@ class StakeService:
             staking_address=staking_address, user_address=user.eth_address
         )
 
-        stake = Stake.objects.filter(user=user, dao=dao).first()
-
-        if not stake:
-            stake = Stake.objects.create(
-                amount=staked_amount,
-                voting_power=voting_power,
-                user=user,
-                dao=dao,
-            )
-        else:
-            stake.amount = staked_amount
-            stake.voting_power = voting_power
-            stake.save()
+        with transaction.atomic():
+            if int(staked_amount) > 0:
+                stake, _ = Stake.objects.update_or_create(
+                    user=user,
+                    dao=dao,
+                    defaults={"amount": staked_amount, "voting_power": voting_power},
+                )
+            else:
+                # fully unstaked holders are removed like in bulk_upsert_stakes
+                Stake.objects.filter(user=user, dao=dao).delete()
+                stake = Stake(amount=0, voting_power=voting_power, user=user, dao=dao)
 
+            StakeService.refresh_dao_stats(dao.id)
         return stake
 
     @staticmethod
     def has_staked_amount(user, dao):
         stake = Stake.objects.filter(user=user, dao=dao).first()
         return stake and stake.amount > 0
+
+    @staticmethod
+    def bulk_upsert_stakes(dao, holder_states, synced_block=None) -> int:
+        """
+        writes the on-chain state of many holders with a handful of queries.
+        holders that fully unstaked are removed so aggregates only count real stakers
+
+        Args:
+            dao (Dao): dao the holders staked in
+            holder_states (dict): address -> {"amount": int, "voting_power": int}
+            synced_block (int, optional): block the states were read at, stored on the dao contract
+
+        Returns:
+            int: number of upserted stakes
+        """
+        addresses = [address.lower() for address in holder_states]
+
+        with transaction.atomic():
+            users = StakeService._holder_users(addresses)
+
+            stakes = []
+            unstaked_user_ids = []
+            for address, state in holder_states.items():
+                user_id = users[address.lower()]
+                if int(state["amount"]) > 0:
+                    stakes.append(
+                        Stake(
+                            user_id=user_id,
+                            dao=dao,
+                            amount=state["amount"],
+                            voting_power=state["voting_power"],
+                        )
+                    )
+                else:
+                    unstaked_user_ids.append(user_id)
+
+            Stake.objects.bulk_create(
+                stakes,
+                update_conflicts=True,
+                unique_fields=["user", "dao"],
+                update_fields=["amount", "voting_power"],
+            )
+            if unstaked_user_ids:
+                Stake.objects.filter(dao=dao, user_id__in=unstaked_user_ids).delete()
+
+            if synced_block is not None:
+                Contract.objects.filter(dao=dao).update(stake_sync_block=synced_block)
+
+            StakeService.refresh_dao_stats(dao.id)
+
+        logger.info(
+            f"dao {dao.id}: upserted {len(stakes)} stakes, removed {len(unstaked_user_ids)}"
+        )
+        return len(stakes)
+
+    @staticmethod
+    def _holder_users(addresses) -> dict:
+        """
+        ids of the users behind the holder addresses, users for new holders are created
+        in one insert with batch-unique nicknames and unusable passwords like create_user
+
+        Args:
+            addresses (list): lowercase holder addresses
+
+        Returns:
+            dict: address -> user id
+        """
+        User = get_user_model()
+
+        def existing():
+            return dict(
+                User.objects.filter(eth_address__in=addresses).values_list(
+                    "eth_address", "id"
+                )
+            )
+
+        users = existing()
+        missing = [address for address in addresses if address not in users]
+        if not missing:
+            return users
+
+        new_users = []
+        for address, nickname in zip(missing, generate_unique_nicknames(len(missing))):
+            user = User(eth_address=address, nickname=nickname)
+            user.set_unusable_password()
+            new_users.append(user)
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+        users = existing()
+
+        # rows skipped by a concurrent insert of the same nickname or address
+        for address in addresses:
+            if address in users:
+                continue
+            try:
+                with transaction.atomic():
+                    users[address] = User.objects.create_user(eth_address=address).id
+            except IntegrityError:
+                users[address] = User.objects.get(eth_address=address).id
+        return users
+
+    @staticmethod
+    def top_stakers_by_dao(dao_ids, limit=5) -> dict:
+        """
+        fetches the largest stakes of many daos in a single query ranked with a window function
+
+        Args:
+            dao_ids (iterable): ids of the daos on the current page
+            limit (int, optional): stakers per dao. Defaults to 5.
+
+        Returns:
+            dict: dao_id -> list of Stake objects with the user joined, largest first
+        """
+        stakes = (
+            Stake.objects.filter(dao_id__in=dao_ids)
+            .select_related("user")
+            .annotate(
+                rank=Window(
+                    expression=RowNumber(),
+                    partition_by=[F("dao_id")],
+                    order_by=[F("amount").desc(), F("id").asc()],
+                )
+            )
+            .filter(rank__lte=limit)
+            .order_by("dao_id", "rank")
+        )
+
+        top_stakers = {dao_id: [] for dao_id in dao_ids}
+        for stake in stakes:
+            top_stakers[stake.dao_id].append(stake)
+        return top_stakers
+
+    @staticmethod
+    def refresh_dao_stats(dao_id, limit=5) -> None:
+        """
+        recomputes the denormalized staker_count, total_staked and top_stakers of a dao.
+        called inside the same transaction as every stake write so readers never aggregate
+
+        Args:
+            dao_id (int): dao whose stakes changed
+            limit (int, optional): size of the top stakers snapshot. Defaults to 5.
+        """
+        with transaction.atomic():
+            # lock the dao row so concurrent refreshes of the same dao apply in order
+            Dao.objects.select_for_update().filter(id=dao_id).first()
+
+            totals = Stake.objects.filter(dao_id=dao_id).aggregate(
+                staker_count=Count("id"), total_staked=Sum("amount")
+            )
+            top_stakers = [
+                # nickname and avatar are resolved when served, see snapshot_users
+                {
+                    "user_id": stake.user_id,
+                    "user": stake.user.nickname,
+                    "amount": str(stake.amount),
+                }
+                for stake in StakeService.top_stakers_by_dao([dao_id], limit)[dao_id]
+            ]
+
+            Dao.objects.filter(id=dao_id).update(
+                staker_count=totals["staker_count"],
+                total_staked=totals["total_staked"] or 0,
+                top_stakers=top_stakers,
+            )
+            # queryset updates skip model signals
+            ResponseCache.bump("dao")
+
+    @staticmethod
+    def reconcile_dao_stats(dao_ids=None) -> int:
+        """
+        rebuilds the staking statistics of every dao (or the given ones) from the stake table,
+        repairs drift from writes that bypassed the service
+
+        Args:
+            dao_ids (iterable, optional): restricts the reconciliation to these daos
+
+        Returns:
+            int: number of reconciled daos
+        """
+        daos = Dao.objects.all()
+        if dao_ids:
+            daos = daos.filter(id__in=dao_ids)
+
+        reconciled = 0
+        for dao_id in daos.values_list("id", flat=True).iterator():
+            StakeService.refresh_dao_stats(dao_id)
+            reconciled += 1
+
+        logger.info(f"reconciled staking statistics of {reconciled} daos")
+        return reconciled
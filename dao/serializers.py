@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import QuerySet
 
 # CUSTOM MODULES
 from core.validators.eth_network_validator import validate_network
@@ -6,6 +7,8 @@ from .models import Dao, Contract, Stake, Presale, PresaleStatus, PresaleTransac
 from .packages.services.dao_service import DaoService
 from .packages.services.stake_service import StakeService
 from services.blockchain.dao_service import DaoConfirmationService
+from services.utils.image_variants import ImageVariantService
+from core.helpers.snapshot_users import render_snapshot, snapshot_users
 from logging_config import logger
 
 # DAO/DAO DEPLOYMENT SERIALIZERS
@@ -53,10 +56,10 @@ class DaoInitialSerializer(serializers.ModelSerializer):
         )
         data_from_chain = blockchain_service._get_initial_data()
         data_from_chain["network"] = validated_data["network"]
-        logger.info(f"user {self.context['request'].user.eth_address}")
+        logger.info(f"user {self.context['user'].eth_address}")
         logger.info(f"data from chain: {data_from_chain['sender']}")
         contracts = self.dao_service.instantiate_dao_and_contracts(
-            user=self.context["request"].user,
+            user=self.context["user"],
             chain_data=data_from_chain,
         )
 
@@ -109,15 +112,10 @@ class StakeSerializer(serializers.ModelSerializer):
         representation["user"] = user.nickname
         representation["eth_address"] = user.eth_address
         
-        # Handle image URL with absolute URI if request is available
-        if user.image:
-            request = self.context.get('request')
-            if request is not None:
-                representation["image"] = request.build_absolute_uri(user.image.url)
-            else:
-                representation["image"] = user.image.url
-        else:
-            representation["image"] = None
+        # stake rows link the avatar derivative, not the original upload
+        representation["image"] = ImageVariantService.url(
+            user, "image", "avatar", self.context.get("request")
+        )
             
         return representation
 
@@ -213,6 +211,8 @@ class DaoActiveSerializer(serializers.ModelSerializer):
     treasury = serializers.SerializerMethodField()
     circulating_supply = serializers.SerializerMethodField()
 
+    ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
     class Meta:
         model = Dao
         fields = [
@@ -239,6 +239,26 @@ class DaoActiveSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
+    @staticmethod
+    def _first_contract(obj):
+        """reads the prefetched contracts instead of issuing contracts.first()"""
+        return next(iter(obj.contracts), None)
+
+    @staticmethod
+    def _treasury(obj):
+        try:
+            return obj.treasury_balance
+        except Treasury.DoesNotExist:
+            return None
+
+    def _image_url(self, image):
+        if not image:
+            return None
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(image.url)
+        return image.url
+
     def get_contracts(self, obj):
         return [
             {
@@ -250,116 +270,115 @@ class DaoActiveSerializer(serializers.ModelSerializer):
             for contract in obj.contracts
         ]
 
+    def _staker_users(self, obj) -> dict:
+        """nickname and avatar of the top stakers of every dao being serialized, one query"""
+        users = self.context.get("staker_users")
+        if users is None:
+            daos = self.root.instance
+            if not isinstance(daos, (list, tuple, QuerySet)):
+                daos = [obj]
+            users = snapshot_users(
+                (staker.get("user_id") for dao in daos for staker in dao.top_stakers or []),
+                self.context.get("request"),
+            )
+            self.context["staker_users"] = users
+        return users
+
     def get_stake(self, obj):
-        # Get top 5 stakers
-        top_stakers = []
-        top_stakes = obj.dao_stakers.order_by('-amount')[:5]
-        
-        request = self.context.get('request')
-        for stake in top_stakes:
-            staker_data = {
-                "user": stake.user.nickname,
-                "amount": str(stake.amount),
-            }
-            
-            # Add user image if available
-            if stake.user.image:
-                if request is not None:
-                    staker_data["image"] = request.build_absolute_uri(stake.user.image.url)
-                else:
-                    staker_data["image"] = stake.user.image.url
-            else:
-                staker_data["image"] = None
-                
-            top_stakers.append(staker_data)
-        
+        # statistics are denormalized on the dao by StakeService, no aggregation per request
         return {
             "staker_count": str(obj.staker_count),
             "total_staked": str(obj.total_staked),
-            "top_stakers": top_stakers
+            "top_stakers": render_snapshot(obj.top_stakers, self._staker_users(obj)),
         }
 
     def get_user_stake(self, obj):
         request = self.context["request"]
         if request and request.user.is_authenticated:
-            stake = obj.dao_stakers.filter(user=request.user).first()
+            # prefetched by the view, otherwise a single lookup
+            stakes = getattr(obj, "user_stakes", None)
+            if stakes is None:
+                stakes = obj.dao_stakers.filter(user=request.user)[:1]
+            stake = next(iter(stakes), None)
             if stake:
                 return {
                     "has_staked": str(stake.amount),
                     "voting_power": str(stake.voting_power),
                 }
         return {"has_staked": "0", "voting_power": "0"}
-        
+
     def get_treasury(self, obj):
         """Get the treasury balance for the DAO"""
-        try:
-            treasury = obj.treasury_balance
+        treasury = self._treasury(obj)
+        if treasury is not None:
             return treasury.balances
-        except Treasury.DoesNotExist:
-            # If no treasury exists, return empty balances
-            ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
-            contract = obj.contracts.first()
-            if contract:
-                return {
-                    contract.token_address: "0",
-                    ZERO_ADDRESS: "0"
-                }
-            return {}
-    
+
+        # If no treasury exists, return empty balances
+        contract = self._first_contract(obj)
+        if contract:
+            return {contract.token_address: "0", self.ZERO_ADDRESS: "0"}
+        return {}
+
     def get_circulating_supply(self, obj):
         """Calculate the circulating supply as total_supply minus treasury token balance"""
-        try:
-            treasury = obj.treasury_balance
-            total_supply = obj.total_supply or 0
-            
-            # Get the DAO token balance
-            contract = obj.contracts.first()
-            if contract and contract.token_address in treasury.balances:
-                token_balance = int(treasury.balances.get(contract.token_address, 0))
-                circulating = max(0, total_supply - token_balance)
-                return str(circulating)
-            return str(total_supply)
-        except (Treasury.DoesNotExist, AttributeError):
-            return str(obj.total_supply or 0)
+        total_supply = obj.total_supply or 0
+        treasury = self._treasury(obj)
+        contract = self._first_contract(obj)
+
+        if treasury is not None and contract and contract.token_address in (
+            treasury.balances or {}
+        ):
+            token_balance = int(treasury.balances.get(contract.token_address, 0))
+            return str(max(0, total_supply - token_balance))
+        return str(total_supply)
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        view = self.context.get("view")
-        if view and view.action == "list":
-            [
-                representation.pop(key)
-                for key in [
-                    "contracts",
-                    "description",
-                    "created_at",
-                    "updated_at",
-                    "total_supply",
-                    "version",
-                    "token_name",
-                    "owner",
-                    "socials",
-                    "cover_image",
-                ]
-            ]
 
         # Ensure total_supply is a string
         if "total_supply" in representation:
             representation["total_supply"] = str(representation["total_supply"])
-            
+
         # Convert image fields to absolute URLs if request is available
-        request = self.context.get('request')
-        if request is not None:
-            # Handle dao_image
-            if 'dao_image' in representation and instance.dao_image:
-                representation['dao_image'] = request.build_absolute_uri(instance.dao_image.url)
-            
-            # Handle cover_image
-            if 'cover_image' in representation and instance.cover_image:
-                representation['cover_image'] = request.build_absolute_uri(instance.cover_image.url)
+        for key in ["dao_image", "cover_image"]:
+            if key in representation and getattr(instance, key):
+                representation[key] = self._image_url(getattr(instance, key))
 
         return representation
 
 
+class DaoListSerializer(DaoActiveSerializer):
+    """directory card of an active dao, only computes the fields shown in the list"""
+
+    class Meta(DaoActiveSerializer.Meta):
+        fields = [
+            "dao_name",
+            "slug",
+            "dao_image",
+            "dip_count",
+            "network",
+            "symbol",
+            "stake",
+            "user_stake",
+            "treasury",
+            "circulating_supply",
+        ]
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        # directory cards use the derivatives, the original stays on the detail view
+        request = self.context.get("request")
+        representation["dao_image"] = ImageVariantService.url(
+            instance, "dao_image", "card", request
+        )
+        representation["dao_image_variants"] = {
+            variant: ImageVariantService.urls(instance, "dao_image", variant, request)
+            for variant in instance.IMAGE_VARIANTS["dao_image"]
+        }
+        return representation
+
+
 class PresaleSerializer(serializers.ModelSerializer):
     dao_slug = serializers.SerializerMethodField()
     
@@ -388,19 +407,6 @@ class PresaleSerializer(serializers.ModelSerializer):
     
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        # Convert decimal fields to strings for JSON serialization
-        decimal_fields = [
-            "total_token_amount", 
-            "initial_price", 
-            "current_price", 
-            "remaining_in_tier", 
-            "total_remaining", 
-            "total_raised"
-        ]
-        for field in decimal_fields:
-            if field in representation:
-                representation[field] = str(representation[field])
-        
         # Remove dao field from response as we already have dao_slug
         representation.pop("dao", None)
         return representation
@@ -424,12 +430,3 @@ class PresaleTransactionSerializer(serializers.ModelSerializer):
             'timestamp'
         ]
         read_only_fields = fields
-    
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        # Convert decimal fields to strings for JSON serialization
-        decimal_fields = ['token_amount', 'eth_amount']
-        for field in decimal_fields:
-            if field in representation:
-                representation[field] = str(representation[field])
-        return representation
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from services.utils.response_cache import ResponseCache
+from services.utils.image_variants import ImageVariantService
+from core.models import User
+from core.signals import profile_changed
+from .models import Dao, Contract, Stake, Treasury, Presale, PresaleTransaction
+
+
+@receiver([post_save, post_delete], sender=Dao)
+@receiver([post_save, post_delete], sender=Contract)
+@receiver([post_save, post_delete], sender=Stake)
+@receiver([post_save, post_delete], sender=Treasury)
+def invalidate_dao_responses(sender, **kwargs):
+    ResponseCache.bump("dao")
+
+
+@receiver(post_save, sender=User)
+def invalidate_dao_responses_on_profile(sender, instance, created, **kwargs):
+    # top stakers carry the current nickname and avatar
+    if profile_changed(instance, created):
+        ResponseCache.bump("dao")
+
+
+@receiver([post_save, post_delete], sender=Presale)
+def invalidate_presale_responses(sender, **kwargs):
+    ResponseCache.bump("presale")
+
+
+@receiver([post_save, post_delete], sender=PresaleTransaction)
+def invalidate_presale_responses_on_transaction(sender, created=True, **kwargs):
+    # transactions are immutable records, only new and removed ones change the payloads
+    if created:
+        ResponseCache.bump("presale")
+
+
+@receiver(post_save, sender=Dao)
+def schedule_dao_image_variants(sender, instance, **kwargs):
+    ImageVariantService.schedule(instance)
@@ -0,0 +1,219 @@
+from celery import shared_task
+from logging_config import logger
+from services.utils.jobs import JobTask
+from services.utils.events import DaoEvents
+
+
+def stake_scan_start(contract, indexer) -> int:
+    """
+    first block to index for a contract: the block after the last indexed one, the
+    deployment block on the first run. contracts created before the deployment block
+    was stored look it up once in the factory logs
+
+    Args:
+        contract (Contract): contract of the dao being indexed
+        indexer (StakeIndexerService): indexer of its staking contract
+
+    Returns:
+        int: block to start the scan from
+    """
+    from services.blockchain.dao_service import DaoConfirmationService
+
+    if contract.stake_sync_block:
+        return contract.stake_sync_block + 1
+    if not contract.deployment_block:
+        try:
+            chain_data = DaoConfirmationService(
+                dao_address=contract.dao_address, network=contract.network
+            )._get_initial_data()
+            contract.deployment_block = chain_data["deployment_block"]
+            contract.save(update_fields=["deployment_block"])
+        except Exception as ex:
+            # a stake missed before the scan range is picked up by its holder's refresh
+            logger.warning(
+                f"no deployment block for dao {contract.dao_id}, scanning the last blocks: {str(ex)}"
+            )
+            return indexer.from_block
+    return contract.deployment_block
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=10,
+    autoretry_for=(Exception,),
+    name="blockchain.sync_stakes",
+)
+def sync_stakes_task(self, dao_id=None):
+    """
+    indexes stake and unstake events of every active dao (or a single one)
+    and upserts the current stake of each holder that changed since the last run.
+    a failing dao is logged and skipped, the next run resumes it from its last indexed block
+
+    Args:
+        dao_id (int, optional): The ID of the DAO to index. If None, index all active DAOs.
+
+    Returns:
+        dict: synced daos with the number of upserted holders, and the failed ones
+    """
+    from .models import Contract
+    from .packages.services.stake_service import StakeService
+    from services.blockchain.stake_indexer_service import StakeIndexerService
+
+    contracts = Contract.objects.select_related("dao").filter(dao__is_active=True)
+    if dao_id:
+        contracts = contracts.filter(dao_id=dao_id)
+
+    synced = {}
+    failed = []
+    for contract in contracts:
+        try:
+            indexer = StakeIndexerService(
+                dao_address=contract.dao_address,
+                staking_address=contract.staking_address,
+                network=contract.network,
+            )
+            to_block = indexer.current_block
+            from_block = stake_scan_start(contract, indexer)
+            if from_block > to_block:
+                continue
+
+            holders = indexer.fetch_changed_holders(from_block, to_block)
+            states = indexer.read_holder_states(holders, block_identifier=to_block)
+            synced[contract.dao_id] = StakeService.bulk_upsert_stakes(
+                contract.dao, states, synced_block=to_block
+            )
+        except Exception as ex:
+            logger.error(f"failed to sync stakes of dao {contract.dao_id}: {str(ex)}")
+            failed.append(contract.dao_id)
+
+    return {
+        "status": "completed",
+        "message": f"indexed stakes for {len(synced)} daos, {len(failed)} failed",
+        "data": synced,
+        "failed": failed,
+    }
+
+
+@shared_task(name="dao.reconcile_dao_stats")
+def reconcile_dao_stats_task():
+    """periodically repairs the denormalized staking statistics of every dao"""
+    from .packages.services.stake_service import StakeService
+
+    reconciled = StakeService.reconcile_dao_stats()
+    return {"status": "completed", "message": f"reconciled {reconciled} daos"}
+
+
+################### REQUEST-TRIGGERED JOBS ###################
+
+
+@shared_task(
+    bind=True,
+    base=JobTask,
+    max_retries=2,
+    default_retry_delay=5,
+    autoretry_for=(Exception,),
+    name="blockchain.fetch_dao",
+)
+def fetch_dao_job(self, job_id, user_id, dao_address, network):
+    """
+    reads the dao deployment from the factory logs and creates the dao with its contracts
+
+    Args:
+        job_id (str): id of the job, equal to the task id
+        user_id (int): owner of the new dao
+        dao_address (str): address of the deployed dao
+        network (int): chain id
+
+    Returns:
+        dict: the created contracts with the initial dao data
+    """
+    from django.contrib.auth import get_user_model
+    from .serializers import DaoInitialSerializer
+
+    user = get_user_model().objects.get(pk=user_id)
+    self.progress(10, "reading factory logs")
+    serializer = DaoInitialSerializer(
+        data={"dao_address": dao_address, "network": network},
+        context={"user": user},
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return serializer.data
+
+
+@shared_task(
+    bind=True,
+    base=JobTask,
+    max_retries=2,
+    default_retry_delay=5,
+    autoretry_for=(Exception,),
+    name="blockchain.refresh_stake",
+)
+def refresh_stake_job(self, job_id, user_id, dao_id=None, slug=None):
+    """
+    reads the stake and voting power of the user from the staking contract
+
+    Args:
+        job_id (str): id of the job, equal to the task id
+        user_id (int): staker
+        dao_id (int, optional): dao to read the stake in
+        slug (str, optional): slug of the dao when no id is given
+
+    Returns:
+        dict: the refreshed stake
+    """
+    from django.contrib.auth import get_user_model
+    from .serializers import StakeSerializer
+
+    user = get_user_model().objects.get(pk=user_id)
+    self.progress(10, "reading stake")
+    serializer = StakeSerializer(
+        data={}, context={"dao_id": dao_id, "slug": slug, "user": user}
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return serializer.data
+
+
+@shared_task(
+    bind=True,
+    base=JobTask,
+    max_retries=2,
+    default_retry_delay=5,
+    autoretry_for=(Exception,),
+    name="blockchain.refresh_presale",
+)
+def refresh_presale_job(self, job_id, presale_id):
+    """
+    reads the presale state from its contract then indexes new purchases and sales
+
+    Args:
+        job_id (str): id of the job, equal to the task id
+        presale_id (int): presale to refresh
+
+    Returns:
+        dict: the refreshed presale
+    """
+    from .models import Contract, Presale
+    from .packages.services.presale_service import PresaleService
+    from .serializers import PresaleSerializer
+
+    presale = Presale.objects.select_related("dao").get(id=presale_id)
+    contract = Contract.objects.get(dao_id=presale.dao_id)
+
+    self.progress(10, "reading presale state")
+    presale_service = PresaleService(
+        presale_contract=presale.presale_contract, network=contract.network
+    )
+    updated_presale = presale_service.update_presale_state(presale)
+    if not updated_presale:
+        raise RuntimeError("failed to update presale state")
+
+    self.progress(50, "fetching presale events")
+    presale_service.fetch_presale_events(updated_presale)
+
+    slug = presale.dao.slug
+    DaoEvents.publish(slug, DaoEvents.PRESALE_UPDATED, DaoEvents.presale_state(updated_presale))
+    DaoEvents.sync_completed(slug, job_id, "presale", presale_id=presale.id)
+    return PresaleSerializer(updated_presale).data
@@ -5,6 +5,7 @@ import os
 from core.helpers.create_user import create_user
 from dao.models import Dao, Contract, Presale, PresaleTransaction, PresaleStatus
 from uuid import uuid4
+from unittest.mock import patch
 
 
 class DaoBaseMixin:
@@ -90,6 +91,20 @@ class PresaleFactoryMixin(DaoFactoryMixin):
         return presale
 
 
+
+def run_jobs_inline(task):
+    """patches the task so enqueued jobs run in the test process, like an eager worker"""
+
+    def apply_inline(args=None, kwargs=None, task_id=None, **options):
+        return task.apply(args=args, kwargs=kwargs, task_id=task_id)
+
+    return patch.object(task, "apply_async", side_effect=apply_inline)
+
+
+def job_status(client, response, **headers):
+    """follows the status url of a 202 job response"""
+    return client.get(response.data["status_url"], **headers)
+
 """
 
 class PresaleTransaction(models.Model):
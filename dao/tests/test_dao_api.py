@@ -4,13 +4,18 @@ from rest_framework import status
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from unittest import skipUnless
 from unittest.mock import patch
+from django.db import connection
 import tempfile
 import os
 
 from core.helpers.create_user import create_user
 
-from .dao_utils import DaoBaseMixin, DaoFactoryMixin
+from .dao_utils import DaoBaseMixin, DaoFactoryMixin, run_jobs_inline, job_status
+from dao.tasks import fetch_dao_job, refresh_stake_job
+from django.test import override_settings
+from services.utils.events import DaoEvents
 from dao.models import Dao, Stake
 
 from logging_config import logger
@@ -116,10 +121,15 @@ class DaoAPITests(APITestCase):
             "network": 11155111,
         }
 
-        response = self.client.post(
-            f"{self.url_prefix}dao/fetch/", payload, **self.HTTP_AUTHORIZATION
-        )
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with run_jobs_inline(fetch_dao_job):
+            response = self.client.post(
+                f"{self.url_prefix}dao/fetch/", payload, **self.HTTP_AUTHORIZATION
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        job = job_status(self.client, response, **self.HTTP_AUTHORIZATION).data
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["result"]["dao_address"], dao_address)
 
     @patch("services.blockchain.dao_service.DaoConfirmationService._get_initial_data")
     @patch("dao.packages.services.stake_service.StakeService.create_stake_instance")
@@ -151,10 +161,11 @@ class DaoAPITests(APITestCase):
             "dao_address": dao_address,
             "network": 11155111,
         }
-        fetch_response = self.client.post(
-            f"{self.url_prefix}dao/fetch/", fetch_payload, **self.HTTP_AUTHORIZATION
-        )
-        self.assertEqual(fetch_response.status_code, status.HTTP_201_CREATED)
+        with run_jobs_inline(fetch_dao_job):
+            fetch_response = self.client.post(
+                f"{self.url_prefix}dao/fetch/", fetch_payload, **self.HTTP_AUTHORIZATION
+            )
+        self.assertEqual(fetch_response.status_code, status.HTTP_202_ACCEPTED)
 
         # Get the created DAO
         created_dao = Dao.objects.get(dao_contracts__dao_address=dao_address)
@@ -221,15 +232,19 @@ class DaoAPITests(APITestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["amount"], str(stake.amount))
+        self.assertEqual(len(response.data["data"]["results"]), 1)
+        self.assertEqual(
+            response.data["data"]["results"][0]["amount"], str(stake.amount)
+        )
 
         response = self.client.get(
             f"{self.url_prefix}refresh/stake/", {"slug": new_dao.slug}
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["amount"], str(stake.amount))
+        self.assertEqual(len(response.data["data"]["results"]), 1)
+        self.assertEqual(
+            response.data["data"]["results"][0]["amount"], str(stake.amount)
+        )
 
     def test_refresh_stake_retrieval_stake_paginated(self):
         new_dao = self.dao_base.create_dao(slug="slug123")
@@ -247,3 +262,307 @@ class DaoAPITests(APITestCase):
 
         for key in self.pagination_keys:
             self.assertIn(key, response.data["data"])
+
+    @patch("dao.packages.services.stake_service.StakeService.create_stake_instance")
+    def test_refresh_stake_runs_as_job(self, mock_create_stake):
+        new_dao = self.dao_base.create_dao(slug="jobdao")
+        mock_create_stake.return_value = Stake(
+            amount=5 * 10**18, voting_power=5 * 10**18, user=self.user, dao=new_dao
+        )
+
+        with run_jobs_inline(refresh_stake_job):
+            response = self.client.post(
+                f"{self.url_prefix}refresh/stake/",
+                {"dao_slug": new_dao.slug},
+                **self.HTTP_AUTHORIZATION,
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "queued")
+        mock_create_stake.assert_called_once_with(
+            dao_id=None, slug=new_dao.slug, user=self.user
+        )
+
+        job = job_status(self.client, response, **self.HTTP_AUTHORIZATION).data
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["result"]["amount"], str(5 * 10**18))
+
+        # jobs are private to the user that queued them
+        stranger = RefreshToken.for_user(create_user()).access_token
+        response = job_status(
+            self.client, response, HTTP_AUTHORIZATION=f"Bearer {stranger}"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(SSE_HEARTBEAT_SECONDS=1)
+    async def test_dao_events_stream_relays_published_events(self):
+        response = await self.async_client.get(f"{self.url_prefix}dao/missing/events/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.async_client.get(
+            f"{self.url_prefix}dao/{self.dao.slug}/events/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["X-Accel-Buffering"], "no")
+
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        DaoEvents.sync_completed(self.dao.slug, "task-1", "votes", dip_id=7)
+
+        chunk = await anext(stream)
+        while chunk.startswith(b":"):
+            chunk = await anext(stream)
+        await stream.aclose()
+
+        self.assertEqual(
+            chunk,
+            b'event: sync.completed\ndata: {"task_id":"task-1","kind":"votes","dip_id":7}\n\n',
+        )
+
+    def test_stake_indexer_upserts_holders(self):
+        from dao.packages.services.stake_service import StakeService
+
+        new_dao = self.dao_factory.create_dao(slug="indexed")
+        Stake.objects.create(
+            amount=5, voting_power=5, user=self.user, dao=new_dao
+        )
+        new_holder = "0x" + "ab" * 20
+
+        StakeService.bulk_upsert_stakes(
+            new_dao,
+            {
+                self.user.eth_address: {"amount": 0, "voting_power": 0},
+                new_holder: {"amount": 10**18, "voting_power": 2 * 10**18},
+            },
+            synced_block=1234,
+        )
+
+        stakes = Stake.objects.filter(dao=new_dao)
+        self.assertEqual(stakes.count(), 1)
+        self.assertEqual(stakes.get().user.eth_address, new_holder)
+        self.assertEqual(stakes.get().voting_power, 2 * 10**18)
+        self.assertEqual(new_dao.dao_contracts.get().stake_sync_block, 1234)
+        self.assertFalse(stakes.get().user.has_usable_password())
+
+        # a nickname taken since it was generated skips the row, the holder still gets a user
+        late_holder = "0x" + "cd" * 20
+        with patch(
+            "dao.packages.services.stake_service.generate_unique_nicknames",
+            return_value=[self.user.nickname],
+        ):
+            StakeService.bulk_upsert_stakes(
+                new_dao, {late_holder: {"amount": 1, "voting_power": 1}}
+            )
+        late_user = Stake.objects.get(dao=new_dao, user__eth_address=late_holder).user
+        self.assertNotEqual(late_user.nickname, self.user.nickname)
+
+    @patch("dao.packages.services.stake_service.DaoConfirmationService")
+    def test_stake_refresh_upserts_and_removes_full_unstake(self, patched_service):
+        from dao.packages.services.stake_service import StakeService
+
+        new_dao = self.dao_factory.create_dao(slug="refreshed")
+        chain = patched_service.return_value
+        chain.read_staked_amount.return_value = 7
+        chain.read_voting_power.return_value = 7
+
+        StakeService.create_stake_instance(self.user, dao_id=new_dao.id)
+        chain.read_staked_amount.return_value = 9
+        stake = StakeService.create_stake_instance(self.user, dao_id=new_dao.id)
+        self.assertEqual(Stake.objects.get(dao=new_dao).amount, 9)
+        self.assertEqual(stake.amount, 9)
+
+        chain.read_staked_amount.return_value = 0
+        StakeService.create_stake_instance(self.user, dao_id=new_dao.id)
+        self.assertFalse(Stake.objects.filter(dao=new_dao).exists())
+        new_dao.refresh_from_db()
+        self.assertEqual(new_dao.staker_count, 0)
+        self.assertEqual(new_dao.top_stakers, [])
+
+    def test_stake_sync_backfills_from_deployment_and_isolates_failures(self):
+        from unittest.mock import MagicMock
+        from dao.tasks import sync_stakes_task
+
+        broken = self.dao_factory.create_dao(slug="broken")
+        fresh = self.dao_factory.create_dao(slug="fresh")
+        legacy = self.dao_factory.create_dao(slug="legacy")
+        fresh.dao_contracts.update(deployment_block=500)
+        broken_staking = broken.dao_contracts.get().staking_address
+        scans = {}
+
+        def indexer(staking_address, **kwargs):
+            def fetch_changed_holders(from_block, to_block):
+                if staking_address == broken_staking:
+                    raise ConnectionError("rpc down")
+                scans[staking_address] = from_block
+                return set()
+
+            instance = MagicMock(current_block=1000, from_block=900)
+            instance.fetch_changed_holders.side_effect = fetch_changed_holders
+            instance.read_holder_states.return_value = {}
+            return instance
+
+        with patch(
+            "services.blockchain.stake_indexer_service.StakeIndexerService",
+            side_effect=indexer,
+        ), patch(
+            "services.blockchain.dao_service.DaoConfirmationService._get_initial_data",
+            return_value={"deployment_block": 700},
+        ), patch(
+            "services.blockchain.dao_service.DaoConfirmationService.__init__",
+            return_value=None,
+        ):
+            result = sync_stakes_task.apply().get()
+
+        self.assertEqual(result["failed"], [broken.id])
+        self.assertIn(fresh.id, result["data"])
+        self.assertEqual(scans[fresh.dao_contracts.get().staking_address], 500)
+        # a dao created before deployment blocks were stored looks its block up once
+        legacy_contract = legacy.dao_contracts.get()
+        self.assertEqual(scans[legacy_contract.staking_address], 700)
+        self.assertEqual(legacy_contract.deployment_block, 700)
+        self.assertEqual(legacy_contract.stake_sync_block, 1000)
+
+    def test_dao_list_query_count_is_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def list_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(
+                    f"{self.url_prefix}dao/", **self.HTTP_AUTHORIZATION
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        def create_staked_dao(slug):
+            dao = self.dao_factory.create_dao(slug=slug)
+            for _ in range(3):
+                Stake.objects.create(
+                    amount=10, voting_power=10, user=create_user(), dao=dao
+                )
+
+        create_staked_dao("few")
+        queries_for_few = list_queries()
+
+        for index in range(4):
+            create_staked_dao(f"more{index}")
+        queries_for_more = list_queries()
+
+        self.assertEqual(queries_for_few, queries_for_more)
+
+    def test_dao_staking_stats_maintained_on_stake_writes(self):
+        from dao.packages.services.stake_service import StakeService
+
+        small_dao = self.dao_factory.create_dao(slug="small")
+        large_dao = self.dao_factory.create_dao(slug="large")
+        StakeService.bulk_upsert_stakes(
+            small_dao, {"0x" + "01" * 20: {"amount": 5, "voting_power": 5}}
+        )
+        StakeService.bulk_upsert_stakes(
+            large_dao,
+            {
+                "0x" + "02" * 20: {"amount": 70, "voting_power": 70},
+                "0x" + "03" * 20: {"amount": 30, "voting_power": 30},
+            },
+        )
+
+        large_dao.refresh_from_db()
+        self.assertEqual(large_dao.staker_count, 2)
+        self.assertEqual(large_dao.total_staked, 100)
+        self.assertEqual(
+            [staker["amount"] for staker in large_dao.top_stakers], ["70", "30"]
+        )
+
+        response = self.client.get(
+            f"{self.url_prefix}dao/", {"ordering": "-total_staked"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["data"]["results"]
+        self.assertEqual([dao["slug"] for dao in results[:2]], ["large", "small"])
+        self.assertEqual(results[0]["stake"]["total_staked"], "100")
+
+    def test_dao_list_answers_conditional_requests(self):
+        response = self.client.get(f"{self.url_prefix}dao/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        response = self.client.get(f"{self.url_prefix}dao/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(
+            f"{self.url_prefix}dao/",
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Stake.objects.create(amount=1, voting_power=1, user=self.user, dao=self.dao)
+        response = self.client.get(f"{self.url_prefix}dao/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_dao_directory_filters_by_network_and_presale(self):
+        other_network = self.dao_factory.create_dao(slug="sepolia2", network="1")
+        response = self.client.get(f"{self.url_prefix}dao/", {"network": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [dao["slug"] for dao in response.data["data"]["results"]],
+            [other_network.slug],
+        )
+
+        response = self.client.get(f"{self.url_prefix}dao/", {"presale": "active"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["results"], [])
+
+        response = self.client.get(f"{self.url_prefix}dao/", {"presale": "unknown"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_dao_search_requires_query(self):
+        response = self.client.get(f"{self.url_prefix}dao/discover/", {"q": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == "postgresql", "trigram search needs postgres")
+    def test_dao_search_ranks_fuzzy_matches(self):
+        self.dao_factory.create_dao(slug="uniswap", dao_name="Uniswap Governance")
+        self.dao_factory.create_dao(slug="unity", dao_name="Unity Collective")
+
+        response = self.client.get(f"{self.url_prefix}dao/discover/", {"q": "uniswp"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["data"]["results"]
+        self.assertEqual(results[0]["slug"], "uniswap")
+        self.assertIn("next", response.data["data"])
+
+        response = self.client.get(
+            f"{self.url_prefix}dao/discover/", {"q": "uniswp", "network": "1"}
+        )
+        self.assertEqual(response.data["data"]["results"], [])
+
+    def test_dao_image_variants_generated_and_listed(self):
+        from io import BytesIO
+        from PIL import Image
+        from services.utils.image_variants import ImageVariantService
+
+        buffer = BytesIO()
+        Image.new("RGB", (1600, 900), "purple").save(buffer, "PNG")
+        upload = SimpleUploadedFile("logo.png", buffer.getvalue(), "image/png")
+
+        with patch("core.tasks.generate_image_variants.delay") as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                dao = self.dao_factory.create_dao(slug="pictured", dao_image=upload)
+        mock_delay.assert_called_once_with("dao.Dao", dao.id)
+
+        ImageVariantService.generate(dao)
+        dao.refresh_from_db()
+        card = dao.image_variants["dao_image"]["card"]
+        with dao.dao_image.storage.open(card["webp"]) as stored:
+            self.assertEqual(Image.open(stored).size, (400, 400))
+        self.assertEqual(ImageVariantService.pending_fields(dao), ["cover_image"])
+
+        response = self.client.get(f"{self.url_prefix}dao/", {"network": "11155111"})
+        listed = next(
+            item for item in response.data["data"]["results"] if item["slug"] == "pictured"
+        )
+        self.assertTrue(listed["dao_image"].endswith(card["webp"]))
+        self.assertTrue(
+            listed["dao_image_variants"]["avatar"]["jpeg"].endswith("_avatar.jpeg")
+        )
@@ -3,7 +3,14 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from decimal import Decimal
 
-from .dao_utils import DaoBaseMixin, DaoFactoryMixin, PresaleFactoryMixin
+from .dao_utils import (
+    DaoBaseMixin,
+    DaoFactoryMixin,
+    PresaleFactoryMixin,
+    run_jobs_inline,
+    job_status,
+)
+from dao.tasks import refresh_presale_job
 from core.helpers.create_user import create_user
 from dao.models import Presale, PresaleTransaction, PresaleStatus, Dao
 from unittest.mock import patch, MagicMock
@@ -110,14 +117,19 @@ class PresaleAPITest(APITestCase):
         mock_update_state.return_value = updated_presale
         mock_fetch_events.return_value = []
 
-        response = self.client.patch(
-            f"{self.url_prefix}{presale.id}/refresh/", **self.HTTP_AUTHORIZATION
-        )
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data["current_tier"], updated_presale.current_tier)
-        self.assertEqual(response.data["current_price"], str(20))
-        self.assertEqual(response.data["total_raised"], str(500))
-        self
+        with run_jobs_inline(refresh_presale_job):
+            response = self.client.patch(
+                f"{self.url_prefix}{presale.id}/refresh/", **self.HTTP_AUTHORIZATION
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIn("job_id", response.data)
+
+        job = job_status(self.client, response, **self.HTTP_AUTHORIZATION).data
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["progress"], 100)
+        self.assertEqual(job["result"]["current_tier"], updated_presale.current_tier)
+        self.assertEqual(job["result"]["current_price"], str(20))
+        self.assertEqual(job["result"]["total_raised"], str(500))
 
         mock_update_state.assert_called_once()
         mock_fetch_events.assert_called_once()
@@ -136,13 +148,16 @@ class PresaleAPITest(APITestCase):
 
         mock_update_state.return_value = None
 
-        response = self.client.patch(
-            f"{self.url_prefix}{presale.id}/refresh/",
-            **self.HTTP_AUTHORIZATION,
-        )
+        with run_jobs_inline(refresh_presale_job):
+            response = self.client.patch(
+                f"{self.url_prefix}{presale.id}/refresh/",
+                **self.HTTP_AUTHORIZATION,
+            )
 
-        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
-        self.assertIn("error", response.data)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = job_status(self.client, response, **self.HTTP_AUTHORIZATION).data
+        self.assertEqual(job["status"], "failed")
+        self.assertIsNotNone(job["error"])
 
     def test_presale_transactions_list(self):
         """Test listing transactions for a presale"""
@@ -190,26 +205,29 @@ class PresaleAPITest(APITestCase):
             )
 
         # Test first page
-        response = self.client.get(
-            f"{self.url_prefix}{self.presale.id}/transactions/",
-            {"page": 1, "page_size": 10},
-        )
+        response = self.client.get(f"{self.url_prefix}{self.presale.id}/transactions/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["data"]["results"]), 10)
         self.assertEqual(response.data["data"]["count"], 15)
         self.assertIsNotNone(response.data["data"]["next"])
         self.assertIsNone(response.data["data"]["previous"])
-        # # Test second page
-        response = self.client.get(
-            f"{self.url_prefix}{self.presale.id}/transactions/",
-            {"page": 2, "page_size": 10},
-        )
+        first_page_hashes = {
+            tx["transaction_hash"] for tx in response.data["data"]["results"]
+        }
+
+        # Test second page through the cursor, the total is only counted on the first page
+        response = self.client.get(response.data["data"]["next"])
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["data"]["results"]), 5)
-        self.assertEqual(response.data["data"]["count"], 15)
+        self.assertIsNone(response.data["data"]["count"])
         self.assertIsNone(response.data["data"]["next"])
         self.assertIsNotNone(response.data["data"]["previous"])
+        self.assertTrue(
+            first_page_hashes.isdisjoint(
+                tx["transaction_hash"] for tx in response.data["data"]["results"]
+            )
+        )
 
     def test_presale_status_update(self):
         """Test that presale status is updated when total_remaining becomes zero"""
@@ -242,11 +260,13 @@ class PresaleAPITest(APITestCase):
             presale.dao = dao_with_contract
             presale.save()
 
-            response = self.client.patch(
-                f"{self.url_prefix}{presale.id}/refresh/", **self.HTTP_AUTHORIZATION
-            )
-            self.assertEqual(response.status_code, status.HTTP_200_OK)
-            self.assertEqual(response.data["status"], PresaleStatus.COMPLETED)
+            with run_jobs_inline(refresh_presale_job):
+                response = self.client.patch(
+                    f"{self.url_prefix}{presale.id}/refresh/", **self.HTTP_AUTHORIZATION
+                )
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            job = job_status(self.client, response, **self.HTTP_AUTHORIZATION).data
+            self.assertEqual(job["result"]["status"], PresaleStatus.COMPLETED)
 
     def test_presale_transactions_empty(self):
         """Test that an empty list is returned when a presale has no transactions"""
@@ -325,11 +345,12 @@ class PresaleAPITest(APITestCase):
         ) as mock_update:
             mock_update.return_value = presale
 
-            response = self.client.patch(
-                f"{self.url_prefix}{presale.id}/refresh/", **self.HTTP_AUTHORIZATION
-            )
+            with run_jobs_inline(refresh_presale_job):
+                response = self.client.patch(
+                    f"{self.url_prefix}{presale.id}/refresh/", **self.HTTP_AUTHORIZATION
+                )
 
-            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
             mock_fetch_events.assert_called_once_with(presale)
 
@@ -355,15 +376,16 @@ class PresaleAPITest(APITestCase):
             invalid_presale.save()
 
             # Call the refresh endpoint
-            response = self.client.patch(
-                f"{self.url_prefix}{invalid_presale.id}/refresh/",
-                **self.HTTP_AUTHORIZATION,
-            )
-
-            self.assertEqual(
-                response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            self.assertIn("error", response.data)
+            with run_jobs_inline(refresh_presale_job):
+                response = self.client.patch(
+                    f"{self.url_prefix}{invalid_presale.id}/refresh/",
+                    **self.HTTP_AUTHORIZATION,
+                )
+
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            job = job_status(self.client, response, **self.HTTP_AUTHORIZATION).data
+            self.assertEqual(job["status"], "failed")
+            self.assertIsNotNone(job["error"])
 
     def test_presale_refresh_authentication_required(self):
         """Test that authentication is required for presale refresh"""
@@ -1,11 +1,16 @@
 from django.urls import path
 
-from .views import DaoInitialView, DaoCompleteView, ActiveDaosView, PresaleView, StakeView, PresaleRefreshView, PresaleTransactionsView
+from .views import DaoInitialView, DaoCompleteView, ActiveDaosView, DaoSearchView, PresaleView, StakeView, PresaleRefreshView, PresaleTransactionsView, DaoEventsView
 
 app_name = "dao"
 
 urlpatterns = [
     path("", ActiveDaosView.as_view({"get": "list"}), name="daos-list"),
+    path(
+        "discover/",
+        DaoSearchView.as_view({"get": "list"}),
+        name="daos-search",
+    ),
     path("fetch/", DaoInitialView.as_view({"post": "create"}), name="dao-fetch"),
     path("save/", DaoCompleteView.as_view({"patch": "update"}), name="dao-save"),
     path(
@@ -13,6 +18,7 @@ urlpatterns = [
         ActiveDaosView.as_view({"get": "retrieve"}),
         name="daos-retrieve",
     ),
+    path("<slug:slug>/events/", DaoEventsView.as_view(), name="dao-events"),
     path(
         "stakes/",
         StakeView.as_view({"get": "list", "post": "create"}),
@@ -1,7 +1,9 @@
-from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import status, serializers
+from rest_framework.exceptions import NotAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from django.shortcuts import get_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 
 # CUSTOM MODULES
 from .models import Dao, Stake, Presale, Contract, PresaleTransaction
@@ -10,6 +12,7 @@ from .serializers import (
     StakeSerializer,
     DaoCompleteSerializer,
     DaoActiveSerializer,
+    DaoListSerializer,
     PresaleSerializer,
     PresaleTransactionSerializer,
 )
@@ -17,10 +20,14 @@ from .packages.abstract.abstract_views import (
     BaseDaoView,
     PublicBaseDaoView,
 )
-from .packages.services.presale_service import PresaleService
-from django.db.models import When, Case, Sum, Count, F
+from .packages.services.dao_search_service import DaoSearchService
+from django.db.models import Prefetch
 from logging_config import logger
-from services.utils.custom_pagination import CustomPagination
+from services.utils.custom_pagination import CustomCursorPagination, CustomPagination
+from services.utils.response_cache import CachedResponseMixin
+from services.utils.jobs import JobResponseMixin
+from services.utils.events import EventStream
+from .tasks import fetch_dao_job, refresh_stake_job, refresh_presale_job
 
 ######################## VIEWS ########################
 
@@ -29,9 +36,10 @@ from services.utils.custom_pagination import CustomPagination
 
 
 @extend_schema(tags=["dao"])
-class DaoInitialView(BaseDaoView):
+class DaoInitialView(JobResponseMixin, BaseDaoView):
     """view for managing user's DAOs
-    supports: list, retrieve, create for authenticated users
+    supports: list, retrieve, create for authenticated users.
+    create validates the addresses and queues the factory log scan as a job
     """
 
     serializer_class = DaoInitialSerializer
@@ -42,21 +50,34 @@ class DaoInitialView(BaseDaoView):
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
+        context["user"] = self.request.user
         context["network"] = self.request.data.get("network")
         return context
 
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dao_address = serializer.validated_data["dao_address"]
+        network = serializer.validated_data["network"]
+        return self.job_response(
+            fetch_dao_job,
+            "dao_fetch",
+            request.user.pk,
+            dao_address,
+            network,
+            # a double submit joins the scan already running
+            sync_target=f"{network}:{dao_address.lower()}:{request.user.pk}",
+        )
+
 
 @extend_schema(tags=["refresh"])
-class StakeView(BaseDaoView):
+class StakeView(JobResponseMixin, CachedResponseMixin, BaseDaoView):
     serializer_class = StakeSerializer
-
-    def paginate_queryset(self, queryset):
-        dao_id = self.request.GET.get("id")
-        slug = self.request.GET.get("slug")
-
-        if dao_id or slug:
-            return None
-        return super().paginate_queryset(queryset)
+    cache_scopes = ("dao",)
+    cached_actions = ()
+    conditional_actions = ("list",)
+    # amounts change with every stake, page numbers instead of a cursor on them
+    pagination_class = CustomPagination
 
     def get_queryset(self):
         dao_id = self.request.GET.get("id")
@@ -67,7 +88,7 @@ class StakeView(BaseDaoView):
             queryset = queryset.filter(dao__id=dao_id)
         elif slug:
             queryset = queryset.filter(dao__slug=slug)
-        return queryset.order_by("-amount")
+        return queryset.select_related("user").order_by("-amount", "-id")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -91,6 +112,26 @@ class StakeView(BaseDaoView):
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    def create(self, request, *args, **kwargs):
+        """queues reading the stake and voting power of the requesting user"""
+        if not request.user.is_authenticated:
+            raise NotAuthenticated("authentication credentials were not provided")
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        context = serializer.context
+        if not context["dao_id"] and not context["slug"]:
+            raise serializers.ValidationError("either dao_id or slug must be provided")
+
+        return self.job_response(
+            refresh_stake_job,
+            "stake_refresh",
+            request.user.pk,
+            dao_id=context["dao_id"],
+            slug=context["slug"],
+            sync_target=f"{context['dao_id'] or context['slug']}:{request.user.pk}",
+        )
+
 
 @extend_schema(tags=["dao"])
 class DaoCompleteView(BaseDaoView):
@@ -109,7 +150,7 @@ class DaoCompleteView(BaseDaoView):
 
 # RETRIEVE ACTIVE DAOS REQUIRES NO AUTH
 @extend_schema(tags=["dao"])
-class ActiveDaosView(PublicBaseDaoView):
+class ActiveDaosView(CachedResponseMixin, PublicBaseDaoView):
     """
     view for public access to active DAOs
     supports: list, retrieve for all users
@@ -117,27 +158,125 @@ class ActiveDaosView(PublicBaseDaoView):
 
     serializer_class = DaoActiveSerializer
     lookup_field = "slug"
+    cache_scopes = ("dao",)
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return DaoListSerializer
+        return super().get_serializer_class()
+
+    ORDERING_FIELDS = ["created_at", "total_staked", "staker_count"]
+
+    def get_ordering(self):
+        ordering = self.request.query_params.get("ordering", "-created_at")
+        if ordering.lstrip("-") not in self.ORDERING_FIELDS:
+            ordering = "-created_at"
+        return [ordering, "-id"]
 
     def get_queryset(self):
-        return Dao.objects.filter(is_active=True).annotate(
-            staker_count=Count("dao_stakers"),
-            total_staked=Sum("dao_stakers__amount"),
+        queryset = (
+            Dao.objects.filter(is_active=True)
+            .select_related("treasury_balance")
+            .prefetch_related("dao_contracts")
+            .order_by(*self.get_ordering())
         )
+        queryset = DaoSearchService.filter_directory(
+            queryset, self.request.query_params
+        )
+        if self.request.user.is_authenticated:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "dao_stakers",
+                    queryset=Stake.objects.filter(user=self.request.user),
+                    to_attr="user_stakes",
+                )
+            )
+        return queryset
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
         return context
 
+    def apply_user_overlay(self, data, request):
+        daos = data["data"]["results"] if self.action == "list" else [data]
+        stakes = {
+            slug: {"has_staked": str(amount), "voting_power": str(voting_power)}
+            for slug, amount, voting_power in Stake.objects.filter(
+                user=request.user, dao__slug__in=[dao["slug"] for dao in daos]
+            ).values_list("dao__slug", "amount", "voting_power")
+        }
+        for dao in daos:
+            dao["user_stake"] = stakes.get(
+                dao["slug"], {"has_staked": "0", "voting_power": "0"}
+            )
+        return data
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="ordering",
+                type=str,
+                description="created_at, total_staked or staker_count, prefix with - for descending",
+            ),
+            OpenApiParameter(
+                name="min_staked", type=int, description="minimum total staked"
+            ),
+            OpenApiParameter(name="network", type=int, description="chain id"),
+            OpenApiParameter(
+                name="presale",
+                type=str,
+                description="only daos with a presale in this status (active, paused, completed)",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class DaoSearchView(ActiveDaosView):
+    """
+    fuzzy search of the dao directory by name, token name, symbol or slug,
+    takes the same filters as the directory and pages with a cursor on the rank
+    """
+
+    pagination_class = CustomCursorPagination
+    cursor_ordering = ("-rank", "-id")
+
+    def get_queryset(self):
+        return DaoSearchService.search(
+            super().get_queryset(), self.request.query_params.get("q", "")
+        ).order_by(*self.cursor_ordering)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="q", type=str, required=True, description="search text"
+            ),
+            OpenApiParameter(
+                name="min_staked", type=int, description="minimum total staked"
+            ),
+            OpenApiParameter(name="network", type=int, description="chain id"),
+            OpenApiParameter(
+                name="presale",
+                type=str,
+                description="only daos with a presale in this status (active, paused, completed)",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 @extend_schema(tags=["presale"])
-class PresaleView(PublicBaseDaoView):
+class PresaleView(CachedResponseMixin, PublicBaseDaoView):
     """
     View for accessing presale information
     Supports: list, retrieve for all users
     """
 
     serializer_class = PresaleSerializer
+    cache_scopes = ("presale",)
 
     def get_queryset(self):
         slug = self.kwargs.get("slug")
@@ -177,9 +316,9 @@ class PresaleView(PublicBaseDaoView):
 
 
 @extend_schema(tags=["refresh"])
-class PresaleRefreshView(BaseDaoView):
+class PresaleRefreshView(JobResponseMixin, BaseDaoView):
     """
-    View for refreshing presale state from the blockchain
+    View for refreshing presale state from the blockchain, the refresh runs as a job
     """
 
     def get_serializer_class(self):
@@ -193,46 +332,38 @@ class PresaleRefreshView(BaseDaoView):
         context = super().get_serializer_context()
         context["request"] = self.request
         return context
-        
+
     def update(self, request, *args, **kwargs):
         presale = self.get_object()
 
-        # Get the contract for the presale's DAO
-        contract = get_object_or_404(Contract, dao_id=presale.dao_id)
+        # the job needs the dao contracts to know the network
+        get_object_or_404(Contract, dao_id=presale.dao_id)
 
-        # Update the presale state
-        presale_service = PresaleService(
-            presale_contract=presale.presale_contract, network=contract.network
+        return self.job_response(
+            refresh_presale_job,
+            "presale_refresh",
+            presale.id,
+            sync_target=presale.id,
+            shared=True,
         )
-        updated_presale = presale_service.update_presale_state(presale)
-
-        if not updated_presale:
-            return Response(
-                {"error": "Failed to update presale state"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-
-        # Fetch and process events
-        presale_service.fetch_presale_events(updated_presale)
-
-        serializer = self.get_serializer(updated_presale)
-        return Response(serializer.data)
 
 
 @extend_schema(tags=["presale"])
-class PresaleTransactionsView(PublicBaseDaoView):
+class PresaleTransactionsView(CachedResponseMixin, PublicBaseDaoView):
     """
     View for accessing presale transaction history
     Supports: list for all users with pagination
     """
 
     serializer_class = PresaleTransactionSerializer
-    pagination_class = CustomPagination
+    pagination_class = CustomCursorPagination
+    cache_scopes = ("presale",)
+    cursor_ordering = ("-timestamp", "-id")
 
     def get_queryset(self):
         presale_id = self.kwargs.get("id")
-        return PresaleTransaction.objects.filter(presale_id=presale_id).order_by(
-            "-timestamp"
+        return PresaleTransaction.objects.filter(presale_id=presale_id).select_related(
+            "user"
         )
         
     def get_serializer_context(self):
@@ -243,14 +374,37 @@ class PresaleTransactionsView(PublicBaseDaoView):
     @extend_schema(
         parameters=[
             OpenApiParameter(
-                name="page", type=int, description="Page number for pagination"
-            ),
-            OpenApiParameter(
-                name="page_size",
-                type=int,
-                description="Number of items per page (max 10)",
+                name="cursor",
+                type=str,
+                description="opaque cursor taken from the next/previous links",
             ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+
+
+# SERVER-SENT EVENTS, SERVED BY THE ASGI APP
+
+
+class DaoEventsView(View):
+    """
+    text/event-stream of sync completions (with the task ids the refresh endpoints
+    return), new dips, vote tallies and presale state of one dao. an async view so a
+    connection waiting for events holds no thread
+    """
+
+    async def get(self, request, slug):
+        if not await Dao.objects.filter(slug=slug).aexists():
+            return JsonResponse(
+                {"error": f"resource not found: dao {slug} does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        response = StreamingHttpResponse(
+            EventStream.stream(slug), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # nginx must hand every event over as soon as it is written
+        response["X-Accel-Buffering"] = "no"
+        return response
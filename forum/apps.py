@@ -7,3 +7,4 @@ class ForumConfig(AppConfig):
 
     def ready(self):
         import forum.tasks  # noqa
+        import forum.signals  # noqa
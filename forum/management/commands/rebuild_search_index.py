@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from forum.models import Thread, Dip, Reply
+from forum.packages.services.search_service import SearchService
+
+
+class Command(BaseCommand):
+    help = "Rebuild full-text search vectors of threads, DIPs and replies"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=SearchService.BATCH_SIZE,
+            help="Rows written per bulk update",
+        )
+
+    def handle(self, *args, **options):
+        for model in (Thread, Dip, Reply):
+            rows = SearchService.rebuild(model, options["batch_size"])
+            self.stdout.write(f"Rebuilt search vectors of {rows} {model.__name__} rows")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from forum.packages.services.engagement_service import EngagementService
+
+
+class Command(BaseCommand):
+    help = "Recompute like and reply counters of threads, DIPs and replies from the generic tables"
+
+    def handle(self, *args, **options):
+        repaired = EngagementService.repair_counters()
+        for model_name, rows in repaired.items():
+            self.stdout.write(f"Recomputed counters of {rows} {model_name} rows")
+        self.stdout.write(self.style.SUCCESS("Forum counters repaired"))
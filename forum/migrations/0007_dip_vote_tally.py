@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:48
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_vote_tally(apps, schema_editor):
+    """tallies the votes already stored for every dip"""
+    Vote = apps.get_model("forum", "Vote")
+    Dip = apps.get_model("forum", "Dip")
+    tallies = (
+        Vote.objects.order_by()
+        .values("dip_id")
+        .annotate(
+            for_votes=Sum("voting_power", filter=Q(support=True), default=0),
+            against_votes=Sum("voting_power", filter=Q(support=False), default=0),
+            voter_count=Count("id"),
+        )
+    )
+    for tally in tallies:
+        dip_id = tally.pop("dip_id")
+        Dip.objects.filter(id=dip_id).update(**tally)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0006_alter_dip_proposal_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dip',
+            name='against_votes',
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=32),
+        ),
+        migrations.AddField(
+            model_name='dip',
+            name='for_votes',
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=32),
+        ),
+        migrations.AddField(
+            model_name='dip',
+            name='tally_synced_block',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dip',
+            name='voter_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_vote_tally, migrations.RunPython.noop),
+    ]
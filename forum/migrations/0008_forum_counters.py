@@ -0,0 +1,83 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:50
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """replies_count was never maintained and likes_count is new, both are counted once here"""
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Like = apps.get_model("forum", "Like")
+    Reply = apps.get_model("forum", "Reply")
+
+    def count_for(model, content_type):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(content_type=content_type, object_id=OuterRef("pk"))
+                .order_by()
+                .values("object_id")
+                .annotate(total=Count("id"))
+                .values("total"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    for model_name in ("thread", "dip", "reply"):
+        # fresh databases have no content types (and no rows) yet
+        content_type = ContentType.objects.filter(
+            app_label="forum", model=model_name
+        ).first()
+        if content_type is None:
+            continue
+        counters = {"likes_count": count_for(Like, content_type)}
+        if model_name != "reply":
+            counters["replies_count"] = count_for(Reply, content_type)
+        apps.get_model("forum", model_name).objects.update(**counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('dao', '0011_dao_staking_stats'),
+        ('forum', '0007_dip_vote_tally'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dip',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='dip',
+            index=models.Index(fields=['dao', '-likes_count'], name='forum_dip_dao_id_7a834f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dip',
+            index=models.Index(fields=['dao', '-replies_count'], name='forum_dip_dao_id_81c318_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['dao', '-likes_count'], name='forum_threa_dao_id_30e824_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['dao', '-replies_count'], name='forum_threa_dao_id_cfa2f4_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_top_voters(apps, schema_editor):
+    """snapshots the five largest voters of every dip that already has votes"""
+    Vote = apps.get_model("forum", "Vote")
+    Dip = apps.get_model("forum", "Dip")
+    for dip_id in Vote.objects.order_by().values_list("dip_id", flat=True).distinct():
+        votes = (
+            Vote.objects.filter(dip_id=dip_id)
+            .select_related("user")
+            .order_by("-voting_power", "-id")[:5]
+        )
+        Dip.objects.filter(id=dip_id).update(
+            top_voters=[
+                {
+                    "user": vote.user.nickname,
+                    "eth_address": vote.user.eth_address,
+                    "image": vote.user.image.url if vote.user.image else None,
+                    "support": vote.support,
+                    "voting_power": str(vote.voting_power),
+                }
+                for vote in votes
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0008_forum_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dip',
+            name='top_voters',
+            field=models.JSONField(blank=True, default=list, help_text='snapshot of the largest voters for the voters summary'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['dip', '-voting_power', '-id'], name='forum_vote_dip_id_4784c8_idx'),
+        ),
+        migrations.RunPython(backfill_top_voters, migrations.RunPython.noop),
+    ]
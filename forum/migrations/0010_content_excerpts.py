@@ -0,0 +1,94 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:58
+
+from django.db import migrations, models
+
+# frozen copies of services.utils.lexical as of this migration, later changes to the
+# helpers must not change what this backfill writes
+BLOCK_NODES = {"paragraph", "heading", "quote", "listitem", "code", "linebreak"}
+
+
+def lexical_plain_text(content):
+    if not isinstance(content, dict):
+        return str(content or "")
+
+    parts = []
+    stack = [content.get("root", content)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        if isinstance(node.get("text"), str):
+            parts.append(node["text"])
+        if node.get("type") in BLOCK_NODES:
+            stack.append(" ")
+        stack.extend(reversed(node.get("children") or []))
+
+    return " ".join("".join(parts).split())
+
+
+def build_excerpt(text, length=280):
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0]
+    return f"{cut}…"
+
+
+def backfill_excerpts(apps, schema_editor):
+    """computes excerpt and word_count for content written before the columns existed"""
+    for model_name in ("Thread", "Dip", "Reply"):
+        model = apps.get_model("forum", model_name)
+        batch = []
+        for obj in model.objects.only("id", "content").iterator(chunk_size=500):
+            text = lexical_plain_text(obj.content)
+            obj.excerpt = build_excerpt(text)
+            obj.word_count = len(text.split())
+            batch.append(obj)
+            if len(batch) >= 500:
+                model.objects.bulk_update(batch, ["excerpt", "word_count"])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ["excerpt", "word_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0009_dip_top_voters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dip',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='dip',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.14 on 2026-10-19 00:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('dao', '0011_dao_staking_stats'),
+        ('forum', '0010_content_excerpts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dip',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dip',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='forum_dip_search__908190_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='reply',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='forum_reply_search__295367_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='forum_threa_search__69a5e3_gin'),
+        ),
+    ]
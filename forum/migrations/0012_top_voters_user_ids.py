@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:10
+
+from django.db import migrations
+
+
+def snapshot_user_ids(apps, schema_editor):
+    """top voters keep the user id, image urls are resolved when served"""
+    Dip = apps.get_model("forum", "Dip")
+    User = apps.get_model("core", "User")
+
+    for dip in Dip.objects.exclude(top_voters=[]).only("id", "top_voters"):
+        addresses = [voter.get("eth_address") for voter in dip.top_voters]
+        ids = dict(
+            User.objects.filter(eth_address__in=addresses).values_list("eth_address", "id")
+        )
+        top_voters = []
+        for voter in dip.top_voters:
+            voter = {key: value for key, value in voter.items() if key != "image"}
+            voter["user_id"] = ids.get(voter.get("eth_address"))
+            top_voters.append(voter)
+        dip.top_voters = top_voters
+        dip.save(update_fields=["top_voters"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_image_variants'),
+        ('forum', '0011_forum_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(snapshot_user_ids, migrations.RunPython.noop),
+    ]
@@ -2,8 +2,10 @@ from django.db import models
 
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.indexes import GinIndex
 from forum.packages.abstract.abstract_models import (
     BaseForumModel,
+    ExcerptModel,
     GenericContentModel,
     UserGenericContentModel,
     DipStatus,
@@ -29,9 +31,22 @@ class Dip(BaseForumModel):
         help_text="store socials and whitepaper as a json object",
     )
 
-    class Meta:
+    # vote tally maintained by VoteService whenever votes are synced
+    for_votes = models.DecimalField(max_digits=32, decimal_places=0, default=0)
+    against_votes = models.DecimalField(max_digits=32, decimal_places=0, default=0)
+    voter_count = models.PositiveIntegerField(default=0)
+    tally_synced_block = models.PositiveBigIntegerField(default=0)
+    top_voters = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="snapshot of the largest voters for the voters summary",
+    )
+
+    class Meta(BaseForumModel.Meta):
         unique_together = ["proposal_id", "dao"]
-        indexes = [models.Index(fields=["dao", "status", "proposal_id", "created_at"])]
+        indexes = BaseForumModel.Meta.indexes + [
+            models.Index(fields=["dao", "status", "proposal_id", "created_at"])
+        ]
 
 
 class Vote(models.Model):
@@ -44,6 +59,7 @@ class Vote(models.Model):
 
     class Meta:
         unique_together = ["dip", "user"]
+        indexes = [models.Index(fields=["dip", "-voting_power", "-id"])]
 
 
 class View(UserGenericContentModel): ...
@@ -52,7 +68,13 @@ class View(UserGenericContentModel): ...
 class Like(UserGenericContentModel): ...
 
 
-class Reply(GenericContentModel):
+class Reply(GenericContentModel, ExcerptModel):
     content = models.JSONField(help_text="Stores Lexical editor JSON content structure")
     likes = GenericRelation("Like")
+    likes_count = models.PositiveIntegerField(default=0)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+    class Meta(GenericContentModel.Meta):
+        indexes = GenericContentModel.Meta.indexes + [
+            GinIndex(fields=["search_vector"])
+        ]
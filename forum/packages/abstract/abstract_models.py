@@ -2,12 +2,45 @@ from django.db import models
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericRelation, GenericForeignKey
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from services.utils.lexical import lexical_plain_text, build_excerpt
+from forum.packages.services.search_service import SearchService
 
 
 # ABSTRACT MODELS WITH SHARED FIELDS ACROSS MULTIPLE MODELS
 
 
-class BaseForumModel(models.Model):
+class ExcerptModel(models.Model):
+    """
+    keeps a plain text excerpt, word count and full-text search vector of the Lexical
+    content, extracted on save
+    """
+
+    excerpt = models.CharField(max_length=300, blank=True, default="")
+    word_count = models.PositiveIntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        # partial saves that do not touch the text never load a deferred content column
+        if update_fields is not None and not {"content", "title"} & set(update_fields):
+            return super().save(*args, **kwargs)
+
+        text = lexical_plain_text(self.content)
+        self.excerpt = build_excerpt(text)
+        self.word_count = len(text.split())
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "excerpt", "word_count"}
+        super().save(*args, **kwargs)
+        # the vector is a database expression, written right after the row
+        SearchService.update_vector(self, text)
+
+
+class BaseForumModel(ExcerptModel):
     """abstract model for THREAD and DIP models"""
 
     title = models.CharField(max_length=200, default="no title")
@@ -19,13 +52,20 @@ class BaseForumModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     views_count = models.PositiveIntegerField(default=0, db_index=True)
+    # counters maintained by EngagementService alongside like and reply writes
     replies_count = models.PositiveIntegerField(default=0)
+    likes_count = models.PositiveIntegerField(default=0)
 
     dao = models.ForeignKey("dao.Dao", on_delete=models.CASCADE)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
     class Meta:
         abstract = True
+        indexes = [
+            models.Index(fields=["dao", "-likes_count"]),
+            models.Index(fields=["dao", "-replies_count"]),
+            GinIndex(fields=["search_vector"]),
+        ]
 
 
 class GenericContentModel(models.Model):
@@ -58,3 +58,8 @@ class BaseDipStatusUpdate(Helper, mixins.UpdateModelMixin, viewsets.GenericViewS
 class BaseVoters(
     Helper, CustomParserPaginationMixin, mixins.ListModelMixin, viewsets.GenericViewSet
 ): ...
+
+
+class BaseSearch(
+    Helper, CustomParserPaginationMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+): ...
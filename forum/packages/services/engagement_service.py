@@ -0,0 +1,100 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from forum.models import Like, Reply, Thread, Dip
+from logging_config import logger
+
+
+class EngagementService:
+    """keeps like and reply counters of forum objects and annotates per-user engagement"""
+
+    @staticmethod
+    def _count_for(model, content_type):
+        """correlated count of generic rows (likes, replies) pointing at the outer object"""
+        return Coalesce(
+            Subquery(
+                model.objects.filter(
+                    content_type=content_type, object_id=OuterRef("pk")
+                )
+                .order_by()
+                .values("object_id")
+                .annotate(total=Count("id"))
+                .values("total"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    @staticmethod
+    def annotate_engagement(queryset, user=None):
+        """
+        adds liked_by_user to every row and joins the author, counters are read from columns
+
+        Args:
+            queryset (QuerySet): Thread, Dip or Reply queryset
+            user (User, optional): user from the request, anonymous users never have likes
+
+        Returns:
+            QuerySet: annotated queryset
+        """
+        if user is not None and user.is_authenticated:
+            content_type = ContentType.objects.get_for_model(queryset.model)
+            liked_by_user = Exists(
+                Like.objects.filter(
+                    content_type=content_type, object_id=OuterRef("pk"), user=user
+                )
+            )
+        else:
+            liked_by_user = Value(False, output_field=BooleanField())
+
+        return queryset.select_related("author").annotate(liked_by_user=liked_by_user)
+
+    @staticmethod
+    def adjust_counter(model, object_id, field, delta) -> int:
+        """
+        atomically shifts a denormalized counter with an F() expression, never below zero.
+        callers run it in the same transaction as the like or reply write
+
+        Args:
+            model (Model): Thread, Dip or Reply
+            object_id (int): id of the object the like or reply points at
+            field (str): likes_count or replies_count
+            delta (int): amount to add, negative to subtract
+
+        Returns:
+            int: number of updated rows
+        """
+        queryset = model.objects.filter(id=object_id)
+        if delta < 0:
+            queryset = queryset.filter(**{f"{field}__gte": -delta})
+        return queryset.update(**{field: F(field) + delta})
+
+    @staticmethod
+    def repair_counters() -> dict:
+        """
+        recomputes every like and reply counter in bulk from the generic tables
+
+        Returns:
+            dict: model name -> number of rows rewritten
+        """
+        repaired = {}
+        for model in (Thread, Dip, Reply):
+            content_type = ContentType.objects.get_for_model(model)
+            counters = {"likes_count": EngagementService._count_for(Like, content_type)}
+            if model is not Reply:
+                counters["replies_count"] = EngagementService._count_for(
+                    Reply, content_type
+                )
+            repaired[model.__name__] = model.objects.update(**counters)
+
+        logger.info(f"repaired forum counters: {repaired}")
+        return repaired
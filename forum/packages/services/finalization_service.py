@@ -0,0 +1,370 @@
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from celery import chord, group
+from django.conf import settings
+from forum.models import Dip, DipStatus, ProposalType
+from logging_config import logger
+from services.utils.events import DaoEvents
+from services.utils.redis_client import get_redis
+from services.utils.sync_gate import SyncGate
+
+
+class DipFinalization:
+    """
+    active dips are finalized when their voting ends, no refresh request needed. a dip
+    ending within the eta horizon gets a finalize task with its end time as eta, the
+    sweep finalizes dips past their end in one batch per dao and schedules the ones
+    about to end. finalizing is idempotent: only active dips past their end are read,
+    one run holds a dip at a time and the commit only moves dips that are still active
+    """
+
+    PREFIX = "dip:finalize"
+
+    @staticmethod
+    def horizon() -> int:
+        return getattr(settings, "FINALIZE_ETA_HORIZON_SECONDS", 45 * 60)
+
+    @staticmethod
+    def grace() -> int:
+        # end_time is a block timestamp, give the chain a moment past the wall clock
+        return getattr(settings, "FINALIZE_GRACE_SECONDS", 5)
+
+    @staticmethod
+    def recheck() -> int:
+        return getattr(settings, "FINALIZE_RECHECK_SECONDS", 10 * 60)
+
+    @staticmethod
+    def propagation() -> int:
+        # refreshes follow a transaction the user just sent, reads wait for it to land
+        return getattr(settings, "FINALIZE_PROPAGATION_SECONDS", 15)
+
+    @staticmethod
+    def lock_timeout() -> int:
+        return getattr(settings, "SYNC_LOCK_SECONDS", 600)
+
+    @staticmethod
+    def _scheduled_key(dip_id) -> str:
+        return f"{DipFinalization.PREFIX}:scheduled:{dip_id}"
+
+    @staticmethod
+    def _claim_key(dip_id) -> str:
+        return f"{DipFinalization.PREFIX}:claim:{dip_id}"
+
+    @staticmethod
+    def _checked_key(dip_id) -> str:
+        return f"{DipFinalization.PREFIX}:checked:{dip_id}"
+
+    @staticmethod
+    def schedule(dip) -> bool:
+        """
+        queues the finalization of an active dip at its end time, once per dip. dips
+        ending after the horizon are left to a later sweep, an eta beyond the broker
+        visibility timeout would be redelivered
+
+        Args:
+            dip (Dip): dip that turned active
+
+        Returns:
+            bool: whether a finalize task was queued
+        """
+        from forum.tasks import finalize_dips_task
+
+        if dip.status != DipStatus.ACTIVE or dip.end_time is None:
+            return False
+        now = time.time()
+        if dip.end_time - now > DipFinalization.horizon():
+            return False
+
+        # kept past the eta, a second schedule call for the same dip is a no-op
+        if not get_redis().set(
+            DipFinalization._scheduled_key(dip.id),
+            dip.end_time,
+            nx=True,
+            ex=DipFinalization.horizon() * 2,
+        ):
+            return False
+
+        eta = datetime.fromtimestamp(
+            max(dip.end_time, now) + DipFinalization.grace(), tz=timezone.utc
+        )
+        finalize_dips_task.apply_async(args=[dip.dao_id, [dip.id]], eta=eta)
+        return True
+
+    @staticmethod
+    def ended(now=None) -> dict:
+        """
+        Returns:
+            dict: {dao id: [dip ids]} of active dips past their end, dips re-read within
+            the recheck window are left out
+        """
+        now = int(now or time.time())
+        rows = list(
+            Dip.objects.filter(
+                status=DipStatus.ACTIVE,
+                proposal_id__isnull=False,
+                end_time__lte=now,
+            ).values_list("dao_id", "id")
+        )
+        if not rows:
+            return {}
+
+        checked = get_redis().mget(
+            [DipFinalization._checked_key(dip_id) for _, dip_id in rows]
+        )
+        batches = defaultdict(list)
+        for (dao_id, dip_id), recently_checked in zip(rows, checked):
+            if not recently_checked:
+                batches[dao_id].append(dip_id)
+        return dict(batches)
+
+    @staticmethod
+    def ending_soon(now=None):
+        now = int(now or time.time())
+        return Dip.objects.filter(
+            status=DipStatus.ACTIVE,
+            proposal_id__isnull=False,
+            end_time__gt=now,
+            end_time__lte=now + DipFinalization.horizon(),
+        ).only("id", "dao_id", "status", "end_time")
+
+    @staticmethod
+    def sweep() -> dict:
+        """
+        queues one finalize task per dao with ended dips and schedules dips ending soon
+
+        Returns:
+            dict: numbers of queued batches, ended dips and newly scheduled dips
+        """
+        from forum.tasks import finalize_dips_task
+
+        batches = DipFinalization.ended()
+        for dao_id, dip_ids in batches.items():
+            finalize_dips_task.delay(dao_id, dip_ids)
+
+        scheduled = sum(DipFinalization.schedule(dip) for dip in DipFinalization.ending_soon())
+        return {
+            "batches": len(batches),
+            "ended": sum(len(dip_ids) for dip_ids in batches.values()),
+            "scheduled": scheduled,
+        }
+
+    @staticmethod
+    def pipeline(dao_id, dip_ids, task_id=None, countdown=0):
+        """
+        canvas finalizing dips of one dao: the chain reads and vote syncs run in
+        parallel, the commit gets all their results and applies every transition in
+        its own transaction. quorum and treasury are read once for the dao
+
+        Args:
+            dao_id (int): dao the dips belong to
+            dip_ids (list): dips to finalize
+            task_id (str, optional): id of the commit task, what refresh callers track
+            countdown (int): delay of the reads, lets a just-sent transaction propagate
+
+        Returns:
+            chord: the canvas, not yet applied
+        """
+        from forum.tasks import (
+            finalize_commit_task,
+            finalize_failed_task,
+            finalize_read_presale_task,
+            finalize_read_proposal_task,
+            finalize_read_quorum_task,
+            finalize_read_treasury_task,
+            finalize_sync_votes_task,
+        )
+
+        presale_dips = set(
+            Dip.objects.filter(
+                id__in=dip_ids, proposal_type=ProposalType.PRESALE
+            ).values_list("id", flat=True)
+        )
+        steps = [
+            finalize_read_quorum_task.si(dao_id),
+            finalize_read_treasury_task.si(dao_id),
+        ]
+        for dip_id in dip_ids:
+            steps.append(finalize_read_proposal_task.si(dip_id))
+            steps.append(finalize_sync_votes_task.si(dip_id))
+            if dip_id in presale_dips:
+                steps.append(finalize_read_presale_task.si(dip_id))
+
+        steps = [step.set(countdown=countdown) for step in steps]
+        commit = finalize_commit_task.s(dao_id, list(dip_ids)).set(
+            task_id=task_id or str(uuid.uuid4())
+        )
+        # a failed chord skips the commit without a task_failure, the errback cleans up
+        commit.link_error(finalize_failed_task.s(dao_id, list(dip_ids)))
+        return chord(group(steps), commit)
+
+    @staticmethod
+    def finalize(dao_id, dip_ids) -> list:
+        """
+        claims the ended dips of one dao and queues their finalization pipeline. a
+        claim is held until the commit or the errback of a failed pipeline, the sweep
+        takes a dip whose steps failed again after the recheck window
+
+        Args:
+            dao_id (int): dao the dips belong to
+            dip_ids (list): dips to finalize, finalized or not yet ended ones are skipped
+
+        Returns:
+            list: ids of the dips whose pipeline was queued
+        """
+        ended = Dip.objects.filter(
+            id__in=dip_ids,
+            dao_id=dao_id,
+            status=DipStatus.ACTIVE,
+            end_time__lte=int(time.time()),
+        ).values_list("id", flat=True)
+
+        task_id = str(uuid.uuid4())
+        claimed = [dip_id for dip_id in ended if DipFinalization.claim(dip_id, task_id)]
+        if claimed:
+            DipFinalization.pipeline(dao_id, claimed, task_id=task_id).apply_async()
+        return claimed
+
+    @staticmethod
+    def refresh(dao_id, dip_id, task_id):
+        """
+        on-demand finalization of one dip under the refresh task id. the dip is
+        claimed when free, a run already holding it keeps its claim and the commits of
+        both apply the transition once
+
+        Args:
+            dao_id (int): dao of the dip
+            dip_id (int): dip to refresh
+            task_id (str): commit task id handed out by the sync gate
+        """
+        DipFinalization.claim(dip_id, task_id)
+        DipFinalization.pipeline(
+            dao_id,
+            [dip_id],
+            task_id=task_id,
+            countdown=DipFinalization.propagation(),
+        ).apply_async()
+
+    @staticmethod
+    def claim(dip_id, owner) -> bool:
+        """holds a dip for one pipeline, the owner is the id of its commit task"""
+        return bool(
+            get_redis().set(
+                DipFinalization._claim_key(dip_id),
+                owner,
+                nx=True,
+                ex=DipFinalization.lock_timeout(),
+            )
+        )
+
+    @staticmethod
+    def release(dip_id, owner) -> None:
+        """frees the claim of a dip if the owner still holds it"""
+        key = DipFinalization._claim_key(dip_id)
+
+        def delete_own_claim(pipe):
+            held = pipe.get(key)
+            pipe.multi()
+            if held == owner:
+                pipe.delete(key)
+
+        get_redis().transaction(delete_own_claim, key)
+
+    @staticmethod
+    def backoff(dip_id) -> None:
+        """leaves the dip out of the sweep for the recheck window"""
+        get_redis().set(DipFinalization._checked_key(dip_id), 1, ex=DipFinalization.recheck())
+
+    @staticmethod
+    def abandon(task_id, dip_ids) -> None:
+        """
+        cleanup of a pipeline whose commit never ran: frees the refresh lock and the
+        claims of the run, the dips are read again after the recheck window
+        """
+        SyncGate.release(task_id)
+        for dip_id in dip_ids:
+            DipFinalization.release(dip_id, task_id)
+            DipFinalization.backoff(dip_id)
+
+    @staticmethod
+    def commit(results, dao_id, dip_ids, task_id=None) -> dict:
+        """
+        applies the results of the read steps, one transaction per dip
+
+        Args:
+            results (list): return values of the pipeline steps
+            dao_id (int): dao the dips belong to
+            dip_ids (list): dips of the pipeline
+            task_id (str, optional): commit task id, owner of the claims and reported to
+                event listeners
+
+        Returns:
+            dict: {dip id: status after the commit}
+        """
+        from forum.tasks import update_presale_state
+        from .status_service import UpdateStatus
+
+        reads = FinalizationReads(results)
+        update_service = UpdateStatus()
+        statuses = {}
+        slug = None
+        for dip_id in dip_ids:
+            try:
+                if dip_id in reads.failed or dip_id not in reads.proposals:
+                    # a step of this dip failed, the others are committed without it
+                    logger.error(f"dip {dip_id} left active, finalization steps failed")
+                    DipFinalization.backoff(dip_id)
+                    continue
+                dip, presale = update_service.commit_status(dip_id, reads)
+            except Exception as ex:
+                # the other dips go on, the sweep picks this one up again
+                logger.error(f"failed to finalize dip {dip_id}: {str(ex)}")
+                continue
+            finally:
+                DipFinalization.release(dip_id, task_id)
+
+            slug = dip.dao.slug
+            statuses[dip.id] = dip.status
+            if presale is not None:
+                update_presale_state.delay(presale.id)
+            if dip.status == DipStatus.ACTIVE:
+                # passed but not executed yet, read again after the recheck window
+                DipFinalization.backoff(dip.id)
+                continue
+
+            DaoEvents.publish_on_commit(
+                slug,
+                DaoEvents.DIP_STATUS,
+                {"id": dip.id, "proposal_id": dip.proposal_id, "status": dip.status},
+            )
+
+        if slug and task_id:
+            DaoEvents.sync_completed(slug, task_id, "dip_status", dip_ids=list(statuses))
+        return statuses
+
+
+class FinalizationReads:
+    """results of the parallel steps of one pipeline, merged for the commit"""
+
+    def __init__(self, results):
+        self.proposals = {}
+        self.presales = {}
+        self.quorum = None
+        self.treasury = None
+        # dips whose proposal read or vote sync failed after its retries
+        self.failed = set()
+
+        for result in results:
+            step = result.get("step") if isinstance(result, dict) else None
+            if step in ("proposal", "votes") and "error" in result:
+                self.failed.add(result["dip_id"])
+            elif step == "proposal":
+                self.proposals[result["dip_id"]] = result["proposal"]
+            elif step == "presale":
+                self.presales[result["dip_id"]] = result["presale"]
+            elif step == "quorum":
+                self.quorum = result["quorum"]
+            elif step == "treasury":
+                self.treasury = result["balances"]
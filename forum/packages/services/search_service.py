@@ -0,0 +1,145 @@
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import Case, F, FloatField, TextField, Value, When
+from django.db.models.functions import Cast
+from services.utils.lexical import lexical_plain_text
+from logging_config import logger
+
+
+class SearchService:
+    """full-text search over threads, dips and replies backed by the search_vector column"""
+
+    CONFIG = "english"
+    MIN_QUERY_LENGTH = 2
+    BATCH_SIZE = 500
+    HEADLINE_OPTIONS = {
+        "start_sel": "<mark>",
+        "stop_sel": "</mark>",
+        "min_words": 15,
+        "max_words": 35,
+    }
+
+    @staticmethod
+    def document(title, text):
+        """
+        weighted tsvector expression, title matches rank above body matches
+
+        Args:
+            title (str): title of a thread or dip, empty for replies
+            text (str): plain text extracted from the Lexical content
+
+        Returns:
+            CombinedSearchVector: expression to store in search_vector
+        """
+        return SearchVector(
+            Value(title or ""), weight="A", config=SearchService.CONFIG
+        ) + SearchVector(Value(text or ""), weight="B", config=SearchService.CONFIG)
+
+    @staticmethod
+    def update_vector(instance, text) -> None:
+        """
+        rewrites the search vector of a single row, called from save so the index
+        follows every content or title change
+
+        Args:
+            instance (Model): saved Thread, Dip or Reply
+            text (str): plain text already extracted from its content
+        """
+        model = type(instance)
+        model.objects.filter(pk=instance.pk).update(
+            search_vector=SearchService.document(getattr(instance, "title", ""), text)
+        )
+
+    @staticmethod
+    def rebuild(model, batch_size=None) -> int:
+        """
+        recomputes search vectors of every row in batches, for rows written before the
+        column existed or after a change of the search configuration
+
+        Args:
+            model (Model): Thread, Dip or Reply
+            batch_size (int, optional): rows per bulk update
+
+        Returns:
+            int: number of rows rewritten
+        """
+        batch_size = batch_size or SearchService.BATCH_SIZE
+        fields = ["id", "content"] + (["title"] if hasattr(model, "title") else [])
+        rebuilt, batch = 0, []
+        for obj in model.objects.only(*fields).iterator(chunk_size=batch_size):
+            obj.search_vector = SearchService.document(
+                getattr(obj, "title", ""), lexical_plain_text(obj.content)
+            )
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                rebuilt += model.objects.bulk_update(batch, ["search_vector"])
+                batch = []
+        if batch:
+            rebuilt += model.objects.bulk_update(batch, ["search_vector"])
+
+        logger.info(f"rebuilt search vectors of {rebuilt} {model.__name__} rows")
+        return rebuilt
+
+    @staticmethod
+    def parse_query(query):
+        return SearchQuery(query, search_type="websearch", config=SearchService.CONFIG)
+
+    @staticmethod
+    def search(queryset, query):
+        """
+        filters by a web-style query (quotes, or, -exclusions) and annotates the rank
+
+        Args:
+            queryset (QuerySet): Thread, Dip or Reply queryset
+            query (str): raw query from the request
+
+        Returns:
+            QuerySet: matching rows with rank, double precision so keyset cursors
+            round-trip exactly
+        """
+        search_query = SearchService.parse_query(query)
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), search_query), FloatField()),
+        )
+
+    @staticmethod
+    def headlines(rows, query) -> None:
+        """
+        sets the headline of each hit: the passage of its full text around the matched
+        words, wrapped in <mark>. only the rows of the served page are highlighted,
+        their content is loaded and flattened here and every headline comes from one query
+
+        Args:
+            rows (list): hits of one model, as returned by a page of search()
+            query (str): raw query from the request
+        """
+        if not rows:
+            return
+        model = type(rows[0])
+        texts = {
+            pk: lexical_plain_text(content)
+            for pk, content in model.objects.filter(
+                pk__in=[row.pk for row in rows]
+            ).values_list("pk", "content")
+        }
+        headlines = dict(
+            model.objects.filter(pk__in=texts)
+            .annotate(
+                headline=SearchHeadline(
+                    Case(
+                        *[When(pk=pk, then=Value(text)) for pk, text in texts.items()],
+                        output_field=TextField(),
+                    ),
+                    SearchService.parse_query(query),
+                    config=SearchService.CONFIG,
+                    **SearchService.HEADLINE_OPTIONS,
+                )
+            )
+            .values_list("pk", "headline")
+        )
+        for row in rows:
+            row.headline = headlines.get(row.pk, row.excerpt)
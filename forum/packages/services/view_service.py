@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from forum.models import View
+from services.utils.redis_client import get_redis
+from services.utils.response_cache import ResponseCache
+from logging_config import logger
+
+
+class ViewService:
+    """
+    buffers unique views in redis so detail reads never write to the database.
+    every content object has a set of viewer ids, a pending set lists the objects
+    with buffered viewers until flush_views moves them into View rows and views_count
+    """
+
+    PENDING_KEY = "forum:views:pending"
+    VIEWERS_KEY = "forum:views:{content_type_id}:{object_id}"
+
+    @staticmethod
+    def _viewers_key(content_type_id, object_id):
+        return ViewService.VIEWERS_KEY.format(
+            content_type_id=content_type_id, object_id=object_id
+        )
+
+    @staticmethod
+    def record_view(instance, user) -> int:
+        """
+        buffers a view of an authenticated user that has not viewed the object before
+
+        Args:
+            instance (Thread | Dip): viewed object
+            user (User): user from the request
+
+        Returns:
+            int: buffered views not yet flushed into views_count
+        """
+        content_type = ContentType.objects.get_for_model(instance)
+        key = ViewService._viewers_key(content_type.id, instance.id)
+        client = get_redis()
+
+        already_counted = View.objects.filter(
+            content_type=content_type, object_id=instance.id, user=user
+        ).exists()
+
+        if already_counted:
+            return client.scard(key)
+
+        pipeline = client.pipeline()
+        pipeline.sadd(key, user.id)
+        pipeline.sadd(ViewService.PENDING_KEY, f"{content_type.id}:{instance.id}")
+        pipeline.scard(key)
+        return pipeline.execute()[-1]
+
+    @staticmethod
+    def flush_views(batch_size=500) -> int:
+        """
+        moves buffered viewers into View rows and increments views_count by the new ones
+
+        Args:
+            batch_size (int, optional): objects flushed per call. Defaults to 500.
+
+        Returns:
+            int: number of views written
+        """
+        client = get_redis()
+        flushed = 0
+
+        for member in client.spop(ViewService.PENDING_KEY, batch_size) or []:
+            content_type_id, object_id = (int(part) for part in member.split(":"))
+            key = ViewService._viewers_key(content_type_id, object_id)
+            flushing_key = f"{key}:flushing"
+
+            # rename is atomic, views recorded meanwhile land in a fresh set
+            try:
+                client.rename(key, flushing_key)
+            except Exception:
+                continue
+
+            try:
+                flushed += ViewService._write_views(
+                    content_type_id,
+                    object_id,
+                    {int(user_id) for user_id in client.smembers(flushing_key)},
+                )
+                client.delete(flushing_key)
+            except Exception as ex:
+                # put the viewers back for the next run
+                logger.error(f"failed to flush views of {member}: {str(ex)}")
+                client.sunionstore(key, [key, flushing_key])
+                client.delete(flushing_key)
+                client.sadd(ViewService.PENDING_KEY, member)
+
+        if flushed:
+            logger.info(f"flushed {flushed} buffered views")
+        return flushed
+
+    @staticmethod
+    def _write_views(content_type_id, object_id, user_ids) -> int:
+        content_type = ContentType.objects.get_for_id(content_type_id)
+        model = content_type.model_class()
+        content = model.objects.filter(id=object_id)
+
+        # viewers or content deleted since the view was buffered would fail the insert
+        # on every run, they are dropped instead of being queued again
+        if not content.exists():
+            return 0
+        user_ids = set(
+            get_user_model()
+            .objects.filter(id__in=user_ids)
+            .values_list("id", flat=True)
+        )
+
+        with transaction.atomic():
+            existing = set(
+                View.objects.filter(
+                    content_type=content_type,
+                    object_id=object_id,
+                    user_id__in=user_ids,
+                ).values_list("user_id", flat=True)
+            )
+            new_user_ids = user_ids - existing
+            if not new_user_ids:
+                return 0
+
+            View.objects.bulk_create(
+                [
+                    View(
+                        content_type=content_type,
+                        object_id=object_id,
+                        user_id=user_id,
+                    )
+                    for user_id in new_user_ids
+                ],
+                ignore_conflicts=True,
+            )
+            content.update(views_count=F("views_count") + len(new_user_ids))
+            for slug in content.values_list("dao__slug", flat=True):
+                ResponseCache.bump(ResponseCache.forum_scope(slug))
+        return len(new_user_ids)
@@ -1,16 +1,19 @@
-from forum.models import Vote
+from forum.models import Dip, Vote
 from dao.models import Dao
 from services.blockchain.dao_service import DaoConfirmationService
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Count, Q, Sum
 import time
 
 # from django.conf import settings
 from logging_config import logger
+from services.utils.response_cache import ResponseCache
 
 
 class VoteService:
+    TOP_VOTERS = 5
 
     @staticmethod
     def _fetch_contracts(dip):
@@ -26,19 +29,21 @@ class VoteService:
         return user
 
     @staticmethod
-    def create_vote_instance(dip):
+    def create_vote_instance(dip, wait_for_propagation=True):
         contracts = VoteService._fetch_contracts(dip)
         logger.info(f"contracts: {contracts}")
 
         blockchain_service = DaoConfirmationService(dao_address=contracts.dao_address, network=contracts.network)
 
-        # Wait 15 seconds before fetching blockchain data to allow transaction propagation
-        logger.info("Waiting 15 seconds before fetching vote data from blockchain...")
-        time.sleep(15)
+        if wait_for_propagation:
+            # Wait 15 seconds before fetching blockchain data to allow transaction propagation
+            logger.info("Waiting 15 seconds before fetching vote data from blockchain...")
+            time.sleep(15)
         votes_from_chain = blockchain_service.start_vote_sync_process(dip.proposal_id)
 
         if votes_from_chain is None:
             logger.info(f"no votes found on chain for proposal: {dip.proposal_id}")
+            VoteService.refresh_tally(dip, synced_block=blockchain_service.current_block)
             return []
 
         created_votes = []
@@ -57,4 +62,48 @@ class VoteService:
                 )
                 created_votes.append(vote)
 
+            VoteService.refresh_tally(dip, synced_block=blockchain_service.current_block)
+
         return created_votes
+
+    @staticmethod
+    def refresh_tally(dip, synced_block=None):
+        """
+        stores the for/against voting power, voter count and top voters on the dip
+        so lists and the voters summary only read columns
+
+        Args:
+            dip (Dip): dip whose votes were synced
+            synced_block (int, optional): block the votes were read up to
+
+        Returns:
+            dict: the stored tally
+        """
+        tally = Vote.objects.filter(dip=dip).aggregate(
+            for_votes=Sum("voting_power", filter=Q(support=True), default=0),
+            against_votes=Sum("voting_power", filter=Q(support=False), default=0),
+            voter_count=Count("id"),
+        )
+        tally["top_voters"] = [
+            # nickname and avatar are resolved when served, see snapshot_users
+            {
+                "user_id": vote.user_id,
+                "user": vote.user.nickname,
+                "eth_address": vote.user.eth_address,
+                "support": vote.support,
+                "voting_power": str(vote.voting_power),
+            }
+            for vote in Vote.objects.filter(dip=dip)
+            .select_related("user")
+            .order_by("-voting_power", "-id")[: VoteService.TOP_VOTERS]
+        ]
+        if synced_block is not None:
+            tally["tally_synced_block"] = synced_block
+
+        Dip.objects.filter(id=dip.id).update(**tally)
+        ResponseCache.bump(ResponseCache.forum_scope(dip.dao.slug))
+        for field, value in tally.items():
+            setattr(dip, field, value)
+
+        logger.info(f"dip {dip.id} tally: {tally}")
+        return tally
@@ -9,10 +9,10 @@ from .models import Dip, Thread, Reply, Like, Vote
 from dao.models import Dao, Contract
 from .packages.abstract.abstract_models import DipStatus
 from user.serializers import UserSerializer
-from django.shortcuts import get_object_or_404
 from logging_config import logger
 from .packages.abstract.abstract_models import ProposalType
-from django.contrib.auth import get_user_model
+from .packages.services.engagement_service import EngagementService
+from services.utils.image_variants import ImageVariantService
 
 
 class LexicalContentValidator:
@@ -31,9 +31,7 @@ class LexicalContentValidator:
 class BaseForumSerializer(serializers.ModelSerializer):
     """base serializer for thread dip fields"""
 
-    author = UserSerializer(read_only=True)
-    replies_count = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
+    author = UserSerializer(read_only=True, avatar=True)
     is_liked = serializers.SerializerMethodField()
     content = serializers.JSONField(validators=[LexicalContentValidator()])
 
@@ -51,6 +49,8 @@ class BaseForumSerializer(serializers.ModelSerializer):
             "is_liked",
             "author",
             "dao",
+            "excerpt",
+            "word_count",
         ]
         read_only_fields = [
             "id",
@@ -60,15 +60,16 @@ class BaseForumSerializer(serializers.ModelSerializer):
             "author",
             "dao",
             "replies_count",
+            "likes_count",
+            "excerpt",
+            "word_count",
         ]
 
-    def get_replies_count(self, obj) -> int:
-        return obj.replies.count()
-
-    def get_likes_count(self, obj) -> int:
-        return obj.likes.count()
-
+    # list and detail querysets are annotated by EngagementService, the fallback
+    # only runs for freshly created objects
     def get_is_liked(self, obj) -> bool:
+        if hasattr(obj, "liked_by_user"):
+            return obj.liked_by_user
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
@@ -91,29 +92,28 @@ class BaseForumSerializer(serializers.ModelSerializer):
             )
         return False
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
+    def get_fields(self):
+        fields = super().get_fields()
         view = self.context.get("view")
+        # list querysets defer content, the excerpt is served instead
         if view and view.action == "list":
-            representation.pop("content")
-        return representation
+            fields.pop("content", None)
+        return fields
 
 
 class ReplySerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
+    author = UserSerializer(read_only=True, avatar=True)
     is_liked = serializers.SerializerMethodField()
     content = serializers.JSONField(validators=[LexicalContentValidator()])
 
     class Meta:
         model = Reply
         fields = ["id", "content", "author", "created_at", "likes_count", "is_liked"]
-        read_only_fields = ["id", "author", "created_at"]
-
-    def get_likes_count(self, obj):
-        return obj.likes.count()
+        read_only_fields = ["id", "author", "created_at", "likes_count"]
 
     def get_is_liked(self, obj):
+        if hasattr(obj, "liked_by_user"):
+            return obj.liked_by_user
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
@@ -141,6 +141,9 @@ class ReplySerializer(serializers.ModelSerializer):
                     author=self.context["request"].user,
                     **validated_data,
                 )
+                EngagementService.adjust_counter(
+                    type(parent_obj), parent_obj.id, "replies_count", 1
+                )
                 return reply
         except Exception as ex:
             raise serializers.ValidationError(str(ex))
@@ -151,14 +154,31 @@ class ThreadSerializer(BaseForumSerializer):
         model = Thread
 
 
+class RepliesPageField(serializers.SerializerMethodField):
+    """first page of replies prepared by the detail view with a cursor to the next page"""
+
+    EMPTY_PAGE = {"count": 0, "next": None, "results": []}
+
+    def to_representation(self, value):
+        return self.context.get("replies_page", self.EMPTY_PAGE)
+
+
 class ThreadDetailSerializer(ThreadSerializer):
-    replies = ReplySerializer(many=True, read_only=True)
+    replies = RepliesPageField()
 
     class Meta(ThreadSerializer.Meta):
         fields = ThreadSerializer.Meta.fields + ["replies"]
 
 
 class DipSerializer(BaseForumSerializer):
+    """
+    proposal_data.for_votes, against_votes, total_votes and the AMOUNT_KEYS are
+    rendered as decimal strings of wei
+    """
+
+    # proposal_data keys holding token amounts, as written by DipService and the frontend
+    AMOUNT_KEYS = ("amount", "tokenAmount", "initialPrice", "initial_price")
+
     proposal_data = serializers.JSONField(required=True)
     proposal_type = serializers.CharField()
 
@@ -181,6 +201,8 @@ class DipSerializer(BaseForumSerializer):
             "likes_count",
             "is_liked",
             "dao",
+            "excerpt",
+            "word_count",
         ]
         read_only_fields = [
             "id",
@@ -195,6 +217,8 @@ class DipSerializer(BaseForumSerializer):
             "replies_count",
             "likes_count",
             "is_liked",
+            "excerpt",
+            "word_count",
         ]
 
     def validate_proposal_type(self, value):
@@ -228,11 +252,14 @@ class DipSerializer(BaseForumSerializer):
         representation.pop("dao")
 
         proposal_data = representation["proposal_data"]
-        proposal_data["for_votes"] = getattr(instance, "for_votes", 0)
-        proposal_data["against_votes"] = getattr(instance, "against_votes", 0)
-        proposal_data["total_votes"] = (
-            proposal_data["for_votes"] + proposal_data["against_votes"]
-        )
+        # token amounts are copied from the chain as wei integers, beyond what json
+        # numbers hold exactly. they are always strings, like the tallies below
+        for key in self.AMOUNT_KEYS:
+            if proposal_data.get(key) is not None:
+                proposal_data[key] = str(proposal_data[key])
+        proposal_data["for_votes"] = str(instance.for_votes)
+        proposal_data["against_votes"] = str(instance.against_votes)
+        proposal_data["total_votes"] = str(instance.for_votes + instance.against_votes)
 
         representation["proposal_data"] = proposal_data
         return representation
@@ -291,7 +318,7 @@ class DipSingleRefreshSerializer(serializers.ModelSerializer):
 
 
 class DipDetailSerializer(DipSerializer):
-    replies = ReplySerializer(many=True, read_only=True)
+    replies = RepliesPageField()
 
     class Meta(DipSerializer.Meta):
         fields = DipSerializer.Meta.fields + [
@@ -330,25 +357,42 @@ class VoteSerializer(serializers.ModelSerializer):
 
 
 class VotingHistorySerializer(serializers.ModelSerializer):
+    """voter row, the user is joined by the view so no lookups happen per vote"""
+
+    user = serializers.CharField(source="user.nickname", read_only=True)
+    eth_address = serializers.CharField(source="user.eth_address", read_only=True)
+    image = serializers.SerializerMethodField()
+
     class Meta:
         model = Vote
-        fields = "__all__"
-        read_only_fields = [
-            "id",
-            "dip",
-            "user",
-            "support",
-            "voting_power",
-        ]
+        fields = ["id", "user", "eth_address", "image", "support", "voting_power"]
+        read_only_fields = fields
 
-    def validate(self, data):
-        logger.critical("entered to representation")
+    def get_image(self, obj):
+        return ImageVariantService.url(
+            obj.user, "image", "avatar", self.context.get("request")
+        )
 
-        return data
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        user = get_object_or_404(get_user_model(), id=representation["user"])
-        representation["user"] = user.nickname
-        representation.pop("dip", None)
-        return representation
+class SearchResultSerializer(serializers.Serializer):
+    """ranked search hit, headline is the matching passage with its words wrapped in <mark>"""
+
+    id = serializers.IntegerField(read_only=True)
+    title = serializers.CharField(read_only=True, default=None)
+    excerpt = serializers.CharField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+    rank = serializers.FloatField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    author = UserSerializer(read_only=True, avatar=True)
+    dao = serializers.SerializerMethodField()
+    parent = serializers.SerializerMethodField()
+
+    def get_dao(self, obj):
+        # replies belong to the dao of the thread or dip they answer
+        parent = getattr(obj, "content_object", None) if isinstance(obj, Reply) else obj
+        return parent.dao.slug if parent is not None else None
+
+    def get_parent(self, obj):
+        if not isinstance(obj, Reply):
+            return None
+        return {"type": obj.content_type.model, "id": obj.object_id}
@@ -0,0 +1,64 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.models import User
+from core.signals import profile_changed
+from dao.models import Dao
+from services.utils.response_cache import ResponseCache
+from .models import Thread, Dip, Reply, Like
+
+
+def forum_slug_of(instance):
+    """slug of the dao an object belongs to, generic parents (like -> reply -> thread) are joined in one query"""
+    if hasattr(instance, "dao_id"):
+        daos = Q(id=instance.dao_id)
+    else:
+        parent = ContentType.objects.get_for_id(instance.content_type_id).model_class()
+        if parent is Reply:
+            daos = Q(thread__replies__id=instance.object_id) | Q(
+                dip__replies__id=instance.object_id
+            )
+        elif parent in (Thread, Dip):
+            daos = Q(**{f"{parent._meta.model_name}__id": instance.object_id})
+        else:
+            return None
+    return Dao.objects.filter(daos).values_list("slug", flat=True).first()
+
+
+def invalidate_forum(instance):
+    slug = forum_slug_of(instance)
+    if slug:
+        ResponseCache.bump(ResponseCache.forum_scope(slug))
+
+
+@receiver([post_save, post_delete], sender=Thread)
+@receiver([post_save, post_delete], sender=Dip)
+@receiver([post_save, post_delete], sender=Reply)
+def invalidate_forum_responses(sender, instance, **kwargs):
+    invalidate_forum(instance)
+
+
+@receiver([post_save, post_delete], sender=Like)
+def invalidate_forum_responses_on_like(sender, instance, created=True, **kwargs):
+    # likes are never edited, only new and removed ones change the payloads
+    if created:
+        invalidate_forum(instance)
+
+
+def forum_slugs_of_user(user):
+    """daos whose forum shows the user as author, replier or top voter, one query"""
+    threads = Thread.objects.filter(Q(author=user) | Q(replies__author=user))
+    dips = Dip.objects.filter(
+        Q(author=user) | Q(replies__author=user) | Q(votes__user=user)
+    )
+    return Dao.objects.filter(
+        Q(id__in=threads.values("dao_id")) | Q(id__in=dips.values("dao_id"))
+    ).values_list("slug", flat=True)
+
+
+# votes are not watched one by one, VoteService.refresh_tally bumps once per sync
+@receiver(post_save, sender=User)
+def invalidate_forum_responses_on_profile(sender, instance, created, **kwargs):
+    if profile_changed(instance, created):
+        ResponseCache.bump(*[ResponseCache.forum_scope(slug) for slug in forum_slugs_of_user(instance)])
@@ -4,6 +4,7 @@ from datetime import timedelta
 from logging_config import logger
 from dao.models import Presale, PresaleStatus
 from dao.packages.services.presale_service import PresaleService
+from services.utils.events import DaoEvents
 
 
 @shared_task(bind=True)
@@ -51,6 +52,7 @@ def sync_proposals_task(self, dao_id: int):
     help = "handles the entire dip sync process"
 
     from services.blockchain.dip_sync_service import DipSyncronizationService
+    from .packages.services.finalization_service import DipFinalization
 
     try:
 
@@ -66,6 +68,22 @@ def sync_proposals_task(self, dao_id: int):
         result = sync_service.process_blockchain_data(dao)
         logger.info(f"result: {result}")
 
+        for dip in result:
+            DaoEvents.publish_on_commit(
+                dao.slug,
+                DaoEvents.DIP_CREATED,
+                {
+                    "id": dip.id,
+                    "proposal_id": dip.proposal_id,
+                    "title": dip.title,
+                    "status": dip.status,
+                },
+            )
+            DipFinalization.schedule(dip)
+        DaoEvents.sync_completed(
+            dao.slug, self.request.id, "dips", dip_ids=[dip.id for dip in result]
+        )
+
         return {
             "status": "completed",
             "message": f"syncronized {len(result)} proposals",
@@ -96,59 +114,212 @@ def sync_votes_task(self, dip_id):
     Returns:
         dict:
     """
-    from forum.models import Dip
-    from .packages.services.vote_service import VoteService
-
     try:
-        dip = Dip.objects.get(id=dip_id)
-
-        vote_service = VoteService()
-        result = vote_service.create_vote_instance(dip)
-
-        return {
-            "status": "completed",
-            "dip_id": dip_id,
-            "message": f"syncronized {len(result)} votes",
-            "data": [{"id": vote.id, "support": vote.support} for vote in result],
-        }
-
+        return _sync_dip_votes(dip_id, self.request.id)
     except Exception as ex:
         logger.error(f"async task failed in votes_task: {str(ex)}")
         raise self.retry(exc=ex)
 
 
+def _sync_dip_votes(dip_id, task_id, wait_for_propagation=True):
+    """
+    syncs the votes of a dip and tells listeners about the new tally. finalization
+    reads after voting ended and skips the wait for a vote that was just sent
+    """
+    from forum.models import Dip
+    from .packages.services.vote_service import VoteService
+
+    dip = Dip.objects.select_related("dao").get(id=dip_id)
+
+    vote_service = VoteService()
+    result = vote_service.create_vote_instance(dip, wait_for_propagation)
+
+    dip.refresh_from_db(
+        fields=["for_votes", "against_votes", "voter_count", "tally_synced_block"]
+    )
+    DaoEvents.publish(
+        dip.dao.slug,
+        DaoEvents.VOTE_TALLY,
+        {
+            "dip_id": dip.id,
+            "for_votes": dip.for_votes,
+            "against_votes": dip.against_votes,
+            "voter_count": dip.voter_count,
+            "synced_block": dip.tally_synced_block,
+        },
+    )
+    DaoEvents.sync_completed(dip.dao.slug, task_id, "votes", dip_id=dip.id)
+
+    return {
+        "status": "completed",
+        "dip_id": dip_id,
+        "message": f"syncronized {len(result)} votes",
+        "data": [{"id": vote.id, "support": vote.support} for vote in result],
+    }
+
+
+def _retry_or_report(task, step, dip_id, ex) -> dict:
+    """
+    a per-dip finalization step retries, then reports the error to the commit instead
+    of failing the chord, the other dips of the dao are still committed
+    """
+    if task.request.retries < task.max_retries:
+        raise task.retry(exc=ex)
+    logger.error(f"finalization step {step} failed for dip {dip_id}: {str(ex)}")
+    return {"step": step, "dip_id": dip_id, "error": str(ex)}
+
+
 @shared_task(
     bind=True,
     max_retries=3,
     default_retry_delay=5,
-    autoretry_for=(Exception,),
-    name="blockchain.sync_dip_status",
+    name="blockchain.finalize_read_proposal",
 )
-def sync_dip_status(self, dip_id):
-    """_summary_ update status for a single dip if the end_time is over
+def finalize_read_proposal_task(self, dip_id):
+    """
+    finalization step, reads the proposal of a dip
 
     Args:
-        dip_id (int): The ID of the DIP to update
+        dip_id (int): The ID of the DIP
 
     Returns:
-        dict: updated proposal data
+        dict: on-chain end time, execution flag and vote totals, or the error
     """
     from .packages.services.status_service import UpdateStatus
     from .models import Dip
 
     try:
         dip = Dip.objects.get(id=dip_id)
-        update_service = UpdateStatus()
-        updated_dip = update_service.update_dip_status(dip)
-        return {
-            "dip_id": dip_id,
-            "proposal_id": dip.proposal_id,
-            "success": True,
-            "status": updated_dip.status,
-        }
+        proposal = UpdateStatus().read_proposal(dip)
+    except Exception as ex:
+        return _retry_or_report(self, "proposal", dip_id, ex)
+    return {"step": "proposal", "dip_id": dip_id, "proposal": proposal}
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=5,
+    name="blockchain.finalize_sync_votes",
+)
+def finalize_sync_votes_task(self, dip_id):
+    """finalization step, stores the final votes and tally of a dip"""
+    try:
+        _sync_dip_votes(dip_id, self.request.id, wait_for_propagation=False)
+    except Exception as ex:
+        return _retry_or_report(self, "votes", dip_id, ex)
+    return {"step": "votes", "dip_id": dip_id}
+
+
+@shared_task(bind=True, name="blockchain.finalize_read_quorum")
+def finalize_read_quorum_task(self, dao_id):
+    """finalization step, reads total stake and quorum threshold once per dao"""
+    from .packages.services.status_service import UpdateStatus
+    from dao.models import Contract
+
+    try:
+        contract = Contract.objects.get(dao_id=dao_id)
+        quorum = UpdateStatus().read_quorum(contract)
+    except Exception as ex:
+        # the commit falls back to the execution flag
+        logger.error(f"Error reading quorum of dao {dao_id}: {str(ex)}")
+        quorum = None
+    return {"step": "quorum", "dao_id": dao_id, "quorum": quorum}
+
+
+@shared_task(bind=True, name="blockchain.finalize_read_treasury")
+def finalize_read_treasury_task(self, dao_id):
+    """finalization step, reads treasury balances stored if a proposal was executed"""
+    from .packages.services.status_service import UpdateStatus
+    from dao.models import Contract
+
+    try:
+        contract = Contract.objects.get(dao_id=dao_id)
+        balances = UpdateStatus().read_treasury(contract)
     except Exception as ex:
-        logger.error(f"async task failed in dip_status: {str(ex)}")
-        self.retry(exc=ex)
+        logger.error(f"Failed to read treasury balance of dao {dao_id}: {str(ex)}")
+        balances = None
+    return {"step": "treasury", "dao_id": dao_id, "balances": balances}
+
+
+@shared_task(bind=True, name="blockchain.finalize_read_presale")
+def finalize_read_presale_task(self, dip_id):
+    """finalization step, reads the presale contract opened by a presale proposal"""
+    from .packages.services.status_service import UpdateStatus
+    from .models import Dip
+
+    try:
+        dip = Dip.objects.get(id=dip_id)
+        service = UpdateStatus()
+        presale = service.read_presale(dip, service.fetch_contract(dip))
+    except Exception as ex:
+        # the status is still committed, the presale is not created
+        logger.error(f"Failed to read presale of dip {dip_id}: {str(ex)}")
+        presale = None
+    return {"step": "presale", "dip_id": dip_id, "presale": presale}
+
+
+@shared_task(bind=True, name="blockchain.finalize_commit")
+def finalize_commit_task(self, results, dao_id, dip_ids):
+    """
+    last step of the finalization pipeline, applies the reads in one transaction
+    per dip
+
+    Args:
+        results (list): return values of the parallel steps
+        dao_id (int): dao the dips belong to
+        dip_ids (list): dips of the pipeline
+
+    Returns:
+        dict: status of every dip after the commit
+    """
+    from .packages.services.finalization_service import DipFinalization
+
+    statuses = DipFinalization.commit(results, dao_id, dip_ids, task_id=self.request.id)
+    return {"dao_id": dao_id, "statuses": statuses}
+
+
+@shared_task(name="blockchain.finalize_failed")
+def finalize_failed_task(request, exc, traceback, dao_id, dip_ids):
+    """
+    errback of the commit, runs when the chord fails before the commit could. celery
+    sends no task_failure for the skipped commit, the refresh lock and the claims of
+    the run are released here
+    """
+    from .packages.services.finalization_service import DipFinalization
+
+    logger.error(f"finalization {request.id} of dao {dao_id} failed: {str(exc)}")
+    DipFinalization.abandon(request.id, dip_ids)
+
+
+@shared_task(bind=True, name="blockchain.finalize_dips")
+def finalize_dips_task(self, dao_id, dip_ids):
+    """
+    finalizes ended dips of one dao, queued at the end time of a dip or by the sweep.
+    claims the dips and hands them to the finalization pipeline
+
+    Args:
+        dao_id (int): dao the dips belong to
+        dip_ids (list): dips to finalize
+
+    Returns:
+        dict: ids of the dips whose pipeline was queued
+    """
+    from .packages.services.finalization_service import DipFinalization
+
+    queued = DipFinalization.finalize(dao_id, dip_ids)
+    logger.info(f"task {self.request.id}: finalizing dips of dao {dao_id}: {queued}")
+    return {"dao_id": dao_id, "queued": queued}
+
+
+@shared_task(name="forum.finalize_ended_dips")
+def finalize_ended_dips_task():
+    """beat sweep, catches dips whose finalize task was missed or never scheduled"""
+    from .packages.services.finalization_service import DipFinalization
+
+    result = DipFinalization.sweep()
+    logger.info(f"dip finalization sweep: {result}")
+    return result
 
 
 @shared_task(
@@ -172,10 +343,12 @@ def update_presale_state(self, presale_id=None):
     try:
         # Get presales to update
         if presale_id:
-            presales = Presale.objects.filter(id=presale_id)
+            presales = Presale.objects.filter(id=presale_id).select_related("dao")
         else:
             # Only update active presales
-            presales = Presale.objects.filter(status=PresaleStatus.ACTIVE)
+            presales = Presale.objects.filter(
+                status=PresaleStatus.ACTIVE
+            ).select_related("dao")
         
         if not presales:
             logger.info(f"No presales to update")
@@ -202,10 +375,16 @@ def update_presale_state(self, presale_id=None):
                 presale_contract=presale.presale_contract,
                 network=contract.network
             )
+            previous_state = DaoEvents.presale_state(presale)
             updated_presale = presale_service.update_presale_state(presale)
             
             if updated_presale:
                 updated_presales.append(updated_presale.id)
+                state = DaoEvents.presale_state(updated_presale)
+                if state != previous_state:
+                    DaoEvents.publish(
+                        presale.dao.slug, DaoEvents.PRESALE_UPDATED, state
+                    )
         
         return {
             "status": "completed",
@@ -216,3 +395,12 @@ def update_presale_state(self, presale_id=None):
     except Exception as ex:
         logger.error(f"Error updating presale state: {str(ex)}")
         raise self.retry(exc=ex)
+
+
+@shared_task(name="forum.flush_views")
+def flush_views_task():
+    """writes views buffered in redis into View rows and views_count"""
+    from .packages.services.view_service import ViewService
+
+    flushed = ViewService.flush_views()
+    return {"status": "completed", "message": f"flushed {flushed} views"}
@@ -6,7 +6,10 @@ from rest_framework import status
 
 from core.helpers.create_user import create_user
 from dao.tests.dao_utils import DaoFactoryMixin
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
+from django.test import override_settings
+from services.utils.redis_client import get_redis
+from services.utils.sync_gate import SyncGate
 from forum.models import Dip, Vote
 from .forum_utils import DipBaseMixin
 
@@ -222,12 +225,9 @@ class DipAPITests(APITestCase):
         for key in self.pagination_keys:
             self.assertIn(key, response.data["data"])
 
-    @patch("forum.tasks.sync_votes_task.delay")
+    @patch("forum.tasks.sync_votes_task.apply_async")
     def test_dip_vote_refresh_is_successful(self, mock_sync_votes_task):
         """Test that DIP vote synchronization works correctly"""
-        mock_task = MagicMock()
-        mock_task.id = "test-task-id"
-        mock_sync_votes_task.return_value = mock_task
 
         response = self.client.post(
             f"/api/v1/refresh/dip/{self.dip.id}/vote/",
@@ -241,15 +241,13 @@ class DipAPITests(APITestCase):
         self.assertEqual(response.data["dip_id"], str(self.dip.id))
         self.assertEqual(response.data["message"], "vote sync task queued successfully")
 
-        mock_sync_votes_task.assert_called_once_with(str(self.dip.id))
+        mock_sync_votes_task.assert_called_once_with(
+            args=[str(self.dip.id)], task_id=response.data["task_id"]
+        )
 
-    @patch("forum.tasks.sync_votes_task.delay")
+    @patch("forum.tasks.sync_votes_task.apply_async")
     def test_dip_vote_refresh_with_single_vote(self, mock_sync_votes_task):
         """Test that DIP vote synchronization works with a single vote"""
-        # Mock the Celery task to return a task ID
-        mock_task = MagicMock()
-        mock_task.id = "test-task-id-2"
-        mock_sync_votes_task.return_value = mock_task
 
         response = self.client.post(
             f"/api/v1/refresh/dip/{self.dip.id}/vote/", **self.HTTP_AUTHORIZATION
@@ -260,7 +258,40 @@ class DipAPITests(APITestCase):
         self.assertEqual(response.data["dip_id"], str(self.dip.id))
         self.assertEqual(response.data["message"], "vote sync task queued successfully")
 
-        mock_sync_votes_task.assert_called_once_with(str(self.dip.id))
+        mock_sync_votes_task.assert_called_once_with(
+            args=[str(self.dip.id)], task_id=response.data["task_id"]
+        )
+
+    @override_settings(SYNC_GATE_ENABLED=True, SYNC_FRESHNESS_SECONDS={"votes": 60})
+    @patch("forum.tasks.sync_votes_task.apply_async")
+    def test_dip_vote_refresh_coalesces_and_respects_freshness(self, mock_apply):
+        """concurrent refreshes share one task, a fresh dip is not synced again"""
+        keys = [
+            SyncGate._lock_key("votes", self.dip.id),
+            SyncGate._synced_key("votes", self.dip.id),
+        ]
+        get_redis().delete(*keys)
+        self.addCleanup(get_redis().delete, *keys)
+        url = f"/api/v1/refresh/dip/{self.dip.id}/vote/"
+
+        first = self.client.post(url, **self.HTTP_AUTHORIZATION)
+        second = self.client.post(url, **self.HTTP_AUTHORIZATION)
+
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(first.data["status"], "queued")
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.data["status"], "in_progress")
+        self.assertEqual(second.data["task_id"], first.data["task_id"])
+        mock_apply.assert_called_once()
+
+        # the worker reports success through the task_success signal
+        SyncGate.release(first.data["task_id"], synced=True)
+
+        third = self.client.post(url, **self.HTTP_AUTHORIZATION)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertEqual(third.data["status"], "fresh")
+        self.assertEqual(third.data["task_id"], first.data["task_id"])
+        mock_apply.assert_called_once()
 
     def test_like_reply_on_dip_is_successful(self):
         response_reply = self.client.post(
@@ -284,3 +315,103 @@ class DipAPITests(APITestCase):
         )
         self.assertEqual(response_unlike.status_code, status.HTTP_200_OK)
         self.assertEqual(response_unlike.data["status"], "unliked")
+
+    def test_dip_vote_tally_is_stored_on_sync(self):
+        from forum.packages.services.vote_service import VoteService
+
+        Vote.objects.create(dip=self.dip, user=create_user(), support=True, voting_power=70)
+        Vote.objects.create(dip=self.dip, user=create_user(), support=True, voting_power=20)
+        Vote.objects.create(dip=self.dip, user=create_user(), support=False, voting_power=30)
+
+        VoteService.refresh_tally(self.dip, synced_block=4321)
+
+        self.dip.refresh_from_db()
+        self.assertEqual(self.dip.voter_count, 3)
+        self.assertEqual(self.dip.tally_synced_block, 4321)
+
+        response = self.client.get(f"{self.url_prefix}{self.dip.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["proposal_data"]["for_votes"], "90")
+        self.assertEqual(response.data["proposal_data"]["against_votes"], "30")
+        self.assertEqual(response.data["proposal_data"]["total_votes"], "120")
+
+    def test_dip_with_wei_tally_and_chain_amounts_renders(self):
+        from forum.packages.services.vote_service import VoteService
+
+        Vote.objects.create(
+            dip=self.dip, user=create_user(), support=True, voting_power=10**21
+        )
+        VoteService.refresh_tally(self.dip)
+        # proposal data is copied from the chain with raw integer amounts
+        Dip.objects.filter(id=self.dip.id).update(
+            proposal_data={"amount": 5 * 10**21, "recipient": "0x0"}
+        )
+
+        response = self.client.get(f"{self.url_prefix}{self.dip.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(body["proposal_data"]["for_votes"], str(10**21))
+        self.assertEqual(body["proposal_data"]["total_votes"], str(10**21))
+        self.assertEqual(body["proposal_data"]["amount"], str(5 * 10**21))
+
+        response = self.client.get(self.url_prefix)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # amounts that would fit a json number are strings as well
+        Dip.objects.filter(id=self.dip.id).update(
+            proposal_data={"amount": 5, "recipient": "0x0"}
+        )
+        body = self.client.get(f"{self.url_prefix}{self.dip.id}/").json()
+        self.assertEqual(body["proposal_data"]["amount"], "5")
+        self.assertEqual(body["proposal_data"]["recipient"], "0x0")
+
+    def test_dip_voters_are_joined_ordered_and_summarized(self):
+        from forum.packages.services.vote_service import VoteService
+
+        for voting_power in (10, 50, 30):
+            Vote.objects.create(
+                dip=self.dip, user=create_user(), support=voting_power != 30, voting_power=voting_power
+            )
+        VoteService.refresh_tally(self.dip)
+
+        # summary, its voters, count and the joined page, independent of the number of voters
+        with self.assertNumQueries(4):
+            response = self.client.get(f"{self.url_prefix}{self.dip.id}/voters/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.data["data"]["results"]
+        self.assertEqual([vote["voting_power"] for vote in results], ["50", "30", "10"])
+        self.assertIn("eth_address", results[0])
+
+        summary = response.data["data"]["summary"]
+        self.assertEqual(summary["for_votes"], "60")
+        self.assertEqual(summary["against_votes"], "30")
+        self.assertEqual(summary["voter_count"], 3)
+        self.assertEqual(summary["top_voters"][0]["voting_power"], "50")
+        self.assertNotIn("user_id", summary["top_voters"][0])
+
+    def test_dip_top_voters_show_current_user_data(self):
+        from core.models import User
+        from forum.packages.services.vote_service import VoteService
+
+        vote = Vote.objects.create(
+            dip=self.dip, user=create_user(), support=True, voting_power=10
+        )
+        VoteService.refresh_tally(self.dip)
+
+        # rename and new avatar after the snapshot, the old variant files are gone
+        User.objects.filter(id=vote.user_id).update(
+            nickname="renamed",
+            image="images/new.png",
+            image_variants={
+                "image": {
+                    "source": "images/new.png",
+                    "avatar": {"webp": "images/new_avatar.webp", "jpeg": "images/new_avatar.jpeg"},
+                }
+            },
+        )
+
+        response = self.client.get(f"{self.url_prefix}{self.dip.id}/voters/")
+        top_voter = response.data["data"]["summary"]["top_voters"][0]
+        self.assertEqual(top_voter["user"], "renamed")
+        self.assertTrue(top_voter["image"].endswith("images/new_avatar.webp"))
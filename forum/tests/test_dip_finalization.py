@@ -0,0 +1,202 @@
+"""
+test finalization of dips at the end of voting
+"""
+
+import time
+from unittest.mock import ANY, patch
+
+from django.test import TestCase
+
+from dao.models import Treasury
+from dao.tests.dao_utils import DaoFactoryMixin
+from forum.models import Dip, DipStatus
+from forum.packages.services.finalization_service import DipFinalization
+from services.utils.redis_client import get_redis
+
+
+class DipFinalizationTests(TestCase):
+    """ended dips are finalized in one batch per dao, once"""
+
+    def setUp(self):
+        client = get_redis()
+        for key in client.scan_iter(f"{DipFinalization.PREFIX}:*"):
+            client.delete(key)
+        self.dao = DaoFactoryMixin().create_dao()
+        self.other_dao = DaoFactoryMixin().create_dao(slug="otherdao")
+
+    def create_dip(self, dao, proposal_id, ends_in):
+        return Dip.objects.create(
+            title="no title",
+            content="no-content",
+            dao=dao,
+            author=dao.owner,
+            status=DipStatus.ACTIVE,
+            end_time=int(time.time()) + ends_in,
+            proposal_id=proposal_id,
+            proposal_type="0",
+        )
+
+    @patch("forum.tasks.finalize_dips_task.apply_async")
+    def test_dip_is_scheduled_once_at_its_end_time(self, patched_apply):
+        dip = self.create_dip(self.dao, 1, ends_in=60)
+        later_dip = self.create_dip(self.dao, 2, ends_in=60 * 60 * 24)
+
+        self.assertTrue(DipFinalization.schedule(dip))
+        self.assertFalse(DipFinalization.schedule(dip))
+        self.assertFalse(DipFinalization.schedule(later_dip))
+
+        patched_apply.assert_called_once()
+        kwargs = patched_apply.call_args.kwargs
+        self.assertEqual(kwargs["args"], [self.dao.id, [dip.id]])
+        self.assertEqual(
+            kwargs["eta"].timestamp(), dip.end_time + DipFinalization.grace()
+        )
+
+    @patch("forum.tasks.finalize_dips_task.apply_async")
+    @patch("forum.tasks.finalize_dips_task.delay")
+    def test_sweep_batches_ended_dips_per_dao(self, patched_delay, patched_apply):
+        first = self.create_dip(self.dao, 1, ends_in=-60)
+        second = self.create_dip(self.dao, 2, ends_in=-5)
+        other = self.create_dip(self.other_dao, 1, ends_in=-5)
+        self.create_dip(self.dao, 3, ends_in=60)
+
+        result = DipFinalization.sweep()
+
+        self.assertEqual(result, {"batches": 2, "ended": 3, "scheduled": 1})
+        batches = {call.args[0]: sorted(call.args[1]) for call in patched_delay.call_args_list}
+        self.assertEqual(
+            batches,
+            {self.dao.id: sorted([first.id, second.id]), self.other_dao.id: [other.id]},
+        )
+        patched_apply.assert_called_once()
+
+    @patch("forum.packages.services.finalization_service.DipFinalization.pipeline")
+    def test_finalize_claims_each_dip_once(self, patched_pipeline):
+        ended = self.create_dip(self.dao, 1, ends_in=-5)
+        running = self.create_dip(self.dao, 2, ends_in=60)
+
+        self.assertEqual(DipFinalization.finalize(self.dao.id, [ended.id, running.id]), [ended.id])
+        self.assertEqual(DipFinalization.finalize(self.dao.id, [ended.id]), [])
+        patched_pipeline.assert_called_once_with(self.dao.id, [ended.id], task_id=ANY)
+        owner = patched_pipeline.call_args.kwargs["task_id"]
+
+        # a refresh neither takes nor releases a claim held by another run
+        with patch("forum.packages.services.finalization_service.DipFinalization.pipeline"):
+            DipFinalization.refresh(self.dao.id, ended.id, "refresh-task")
+        DipFinalization.commit([], self.dao.id, [ended.id], task_id="refresh-task")
+        self.assertEqual(get_redis().get(DipFinalization._claim_key(ended.id)), owner)
+
+        DipFinalization.commit([], self.dao.id, [ended.id], task_id=owner)
+        self.assertIsNone(get_redis().get(DipFinalization._claim_key(ended.id)))
+
+    @patch("forum.packages.services.vote_service.VoteService.create_vote_instance", return_value=[])
+    @patch("forum.packages.services.status_service.UpdateStatus.read_treasury")
+    @patch("forum.packages.services.status_service.UpdateStatus.read_quorum")
+    @patch("forum.packages.services.status_service.UpdateStatus.read_proposal")
+    def test_pipeline_reads_in_parallel_and_commits_once(
+        self, patched_proposal, patched_quorum, patched_treasury, patched_votes
+    ):
+        executed = self.create_dip(self.dao, 1, ends_in=-5)
+        no_quorum = self.create_dip(self.dao, 2, ends_in=-5)
+        votes = {executed.id: 900, no_quorum.id: 10}
+
+        patched_proposal.side_effect = lambda dip: {
+            "end_time": dip.end_time,
+            "executed": dip.id == executed.id,
+            "for_votes": votes[dip.id],
+            "against_votes": 0,
+        }
+        patched_quorum.return_value = {"total_staked": 1000, "quorum_threshold": 5000}
+        patched_treasury.return_value = {"0xtoken": "42"}
+
+        pipeline = DipFinalization.pipeline(self.dao.id, [executed.id, no_quorum.id])
+        steps = [step.task for step in pipeline.tasks]
+        # dao reads once, proposal and votes per dip, no presale read for transfers
+        self.assertEqual(steps.count("blockchain.finalize_read_quorum"), 1)
+        self.assertEqual(steps.count("blockchain.finalize_read_treasury"), 1)
+        self.assertEqual(steps.count("blockchain.finalize_read_proposal"), 2)
+        self.assertEqual(steps.count("blockchain.finalize_sync_votes"), 2)
+        self.assertNotIn("blockchain.finalize_read_presale", steps)
+
+        result = pipeline.apply().get()
+
+        self.assertEqual(
+            result["statuses"],
+            {executed.id: DipStatus.EXECUTED, no_quorum.id: DipStatus.FAILED},
+        )
+        self.assertEqual(Treasury.objects.get(dao=self.dao).balances, {"0xtoken": "42"})
+        patched_votes.assert_called_with(ANY, False)
+
+        # a second commit finds nothing active to move
+        reads = [{"step": "proposal", "dip_id": executed.id, "proposal": {}}]
+        commit = DipFinalization.commit(reads, self.dao.id, [executed.id])
+        self.assertEqual(commit, {executed.id: DipStatus.EXECUTED})
+
+    @patch("forum.packages.services.vote_service.VoteService.create_vote_instance", return_value=[])
+    @patch("forum.packages.services.status_service.UpdateStatus.read_treasury", return_value=None)
+    @patch("forum.packages.services.status_service.UpdateStatus.read_quorum", return_value=None)
+    @patch("forum.packages.services.status_service.UpdateStatus.read_proposal")
+    def test_failed_step_leaves_only_its_dip_active(
+        self, patched_proposal, patched_quorum, patched_treasury, patched_votes
+    ):
+        executed = self.create_dip(self.dao, 1, ends_in=-5)
+        broken = self.create_dip(self.dao, 2, ends_in=-5)
+
+        def read_proposal(dip):
+            if dip.id == broken.id:
+                raise ValueError("no proposal data found")
+            return {"end_time": dip.end_time, "executed": True, "for_votes": 1, "against_votes": 0}
+
+        patched_proposal.side_effect = read_proposal
+
+        result = DipFinalization.pipeline(self.dao.id, [executed.id, broken.id]).apply().get()
+
+        self.assertEqual(result["statuses"], {executed.id: DipStatus.EXECUTED})
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, DipStatus.ACTIVE)
+        # left out of the next sweeps until the recheck window passes
+        self.assertEqual(DipFinalization.ended(), {})
+
+    @patch("services.utils.sync_gate.SyncGate.release")
+    def test_failed_chord_releases_gate_and_own_claims(self, patched_gate):
+        from types import SimpleNamespace
+        from forum.tasks import finalize_failed_task
+
+        dip = self.create_dip(self.dao, 1, ends_in=-5)
+        other = self.create_dip(self.dao, 2, ends_in=-5)
+        DipFinalization.claim(dip.id, "failed-commit")
+        DipFinalization.claim(other.id, "sweep-commit")
+
+        pipeline = DipFinalization.pipeline(self.dao.id, [dip.id], task_id="failed-commit")
+        errbacks = pipeline.body.options["link_error"]
+        self.assertEqual(errbacks[0]["task"], "blockchain.finalize_failed")
+
+        finalize_failed_task(
+            SimpleNamespace(id="failed-commit"), ValueError("worker lost"), None,
+            self.dao.id, [dip.id, other.id],
+        )
+
+        patched_gate.assert_called_once_with("failed-commit")
+        self.assertIsNone(get_redis().get(DipFinalization._claim_key(dip.id)))
+        self.assertEqual(get_redis().get(DipFinalization._claim_key(other.id)), "sweep-commit")
+
+    def test_status_event_is_published_after_the_commit(self):
+        from django.db import transaction
+        from services.utils.events import DaoEvents
+
+        dip = self.create_dip(self.dao, 1, ends_in=-5)
+        proposal = {"end_time": dip.end_time, "executed": True, "for_votes": 1, "against_votes": 0}
+        reads = [{"step": "proposal", "dip_id": dip.id, "proposal": proposal}]
+
+        with patch("services.utils.events.DaoEvents.publish") as patched_publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    DipFinalization.commit(reads, self.dao.id, [dip.id])
+                    # listeners would refetch the dip before the new status is visible
+                    patched_publish.assert_not_called()
+
+        patched_publish.assert_called_once_with(
+            self.dao.slug,
+            DaoEvents.DIP_STATUS,
+            {"id": dip.id, "proposal_id": dip.proposal_id, "status": DipStatus.EXECUTED},
+        )
@@ -1,4 +1,4 @@
-import json, copy
+import json, copy, io
 from uuid import uuid4
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.test import APITestCase
@@ -45,6 +45,19 @@ class ThreadAPITests(APITestCase):
             "title": "no title",
         }
 
+    def setUp(self):
+        # redis outlives the test database, buffered views of recycled ids would leak in
+        self._clear_buffered_views()
+        self.addCleanup(self._clear_buffered_views)
+
+    @staticmethod
+    def _clear_buffered_views():
+        from services.utils.redis_client import get_redis
+
+        client = get_redis()
+        for key in client.scan_iter("forum:views:*"):
+            client.delete(key)
+
     def test_threads_retrieves_empty_list_successful(self):
         self.thread.delete()
         response = self.client.get(self.url_prefix)
@@ -195,3 +208,299 @@ class ThreadAPITests(APITestCase):
         )
         self.assertEqual(response_unlike.status_code, status.HTTP_200_OK)
         self.assertEqual(response_unlike.data["status"], "unliked")
+
+    def test_thread_list_query_count_is_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def list_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.url_prefix, **self.HTTP_AUTHORIZATION)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        self.thread_base.create_thread()
+        queries_for_two = list_queries()
+
+        for _ in range(4):
+            self.thread_base.create_thread()
+        queries_for_six = list_queries()
+
+        self.assertEqual(queries_for_two, queries_for_six)
+
+    def test_thread_list_serves_excerpt_instead_of_content(self):
+        payload = {
+            "title": "excerpt",
+            "content": {
+                "root": {
+                    "children": [
+                        {
+                            "type": "paragraph",
+                            "children": [{"type": "text", "text": "word " * 100}],
+                        },
+                        {
+                            "type": "paragraph",
+                            "children": [{"type": "text", "text": "tail"}],
+                        },
+                    ]
+                }
+            },
+        }
+        response = self.client.post(
+            self.url_prefix, payload, format="json", **self.HTTP_AUTHORIZATION
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["word_count"], 101)
+
+        response = self.client.get(f"{self.url_prefix}?ordering=-created_at")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        latest = response.data["data"]["results"][0]
+        self.assertNotIn("content", latest)
+        self.assertLessEqual(len(latest["excerpt"]), 281)
+        self.assertTrue(latest["excerpt"].endswith("…"))
+
+        response = self.client.get(f"{self.url_prefix}{latest['id']}/")
+        self.assertIn("content", response.data)
+
+    def test_search_rejects_short_query_and_unknown_type(self):
+        response = self.client.get("/api/v1/dao/search/?q=a")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get("/api/v1/dao/slugish/search/?q=proposal&type=users")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_ranks_title_matches_and_highlights(self):
+        def post(title, text):
+            payload = {
+                "title": title,
+                "content": {
+                    "root": {
+                        "children": [
+                            {
+                                "type": "paragraph",
+                                "children": [{"type": "text", "text": text}],
+                            }
+                        ]
+                    }
+                },
+            }
+            response = self.client.post(
+                self.url_prefix, payload, format="json", **self.HTTP_AUTHORIZATION
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return response.data["id"]
+
+        # the match sits past the stored excerpt, the headline comes from the full text
+        body_match = post("treasury", "we should fund the pool " * 20 + "with liquidity")
+        title_match = post("liquidity incentives", "rewards for providers")
+        post("unrelated", "nothing to see")
+
+        response = self.client.get("/api/v1/dao/slugish/search/?q=liquidity")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["data"]["results"]
+        self.assertEqual([hit["id"] for hit in results], [title_match, body_match])
+        self.assertIn("<mark>liquidity</mark>", results[1]["headline"])
+        self.assertNotIn("liquidity", results[1]["excerpt"])
+
+        response = self.client.get("/api/v1/dao/search/?q=liquidity&type=dips")
+        self.assertEqual(response.data["data"]["results"], [])
+
+    def test_thread_detail_embeds_first_replies_page(self):
+        for _ in range(12):
+            response = self.client.post(
+                f"{self.url_prefix}{self.thread.id}/replies/",
+                self.payload,
+                format="json",
+                **self.HTTP_AUTHORIZATION,
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(f"{self.url_prefix}{self.thread.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        replies = response.data["replies"]
+        self.assertEqual(replies["count"], 12)
+        self.assertEqual(len(replies["results"]), 10)
+        self.assertIn(f"{self.url_prefix}{self.thread.id}/replies/", replies["next"])
+
+        response = self.client.get(replies["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]["results"]), 2)
+
+    def test_like_and_reply_counters_are_maintained(self):
+        from forum.models import Thread
+        from django.core.management import call_command
+
+        self.client.post(
+            f"{self.url_prefix}{self.thread.id}/like/", **self.HTTP_AUTHORIZATION
+        )
+        self.client.post(
+            f"{self.url_prefix}{self.thread.id}/replies/",
+            self.payload,
+            format="json",
+            **self.HTTP_AUTHORIZATION,
+        )
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.likes_count, 1)
+        self.assertEqual(self.thread.replies_count, 1)
+
+        self.client.post(
+            f"{self.url_prefix}{self.thread.id}/like/", **self.HTTP_AUTHORIZATION
+        )
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.likes_count, 0)
+
+        Thread.objects.filter(id=self.thread.id).update(replies_count=7)
+        call_command("repair_forum_counters", stdout=io.StringIO())
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.replies_count, 1)
+
+        popular = self.thread_base.create_thread()
+        Thread.objects.filter(id=popular.id).update(likes_count=3)
+        response = self.client.get(self.url_prefix, {"ordering": "-likes_count"})
+        self.assertEqual(response.data["data"]["results"][0]["id"], popular.id)
+        self.assertEqual(response.data["data"]["results"][0]["likes_count"], 3)
+
+    def test_thread_views_are_buffered_until_flushed(self):
+        from forum.models import View
+        from forum.packages.services.view_service import ViewService
+
+        thread = self.thread_base.create_thread()
+        viewer = create_user()
+        token = RefreshToken.for_user(viewer).access_token
+
+        for _ in range(2):
+            response = self.client.get(
+                f"{self.url_prefix}{thread.id}/", HTTP_AUTHORIZATION=f"Bearer {token}"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["views_count"], 1)
+
+        thread.refresh_from_db()
+        self.assertEqual(thread.views_count, 0)
+        self.assertFalse(View.objects.filter(object_id=thread.id, user=viewer).exists())
+
+        ViewService.flush_views()
+
+        thread.refresh_from_db()
+        self.assertEqual(thread.views_count, 1)
+        self.assertTrue(View.objects.filter(object_id=thread.id, user=viewer).exists())
+
+        response = self.client.get(
+            f"{self.url_prefix}{thread.id}/", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        self.assertEqual(response.data["views_count"], 1)
+
+        # a revalidating reader is still counted, detail reads never answer 304
+        reader = create_user()
+        response = self.client.get(
+            f"{self.url_prefix}{thread.id}/",
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(reader).access_token}",
+            HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["views_count"], 2)
+
+    def test_views_of_deleted_viewers_are_dropped_on_flush(self):
+        from forum.models import View
+        from forum.packages.services.view_service import ViewService
+        from services.utils.redis_client import get_redis
+
+        thread = self.thread_base.create_thread()
+        viewer, gone = create_user(), create_user()
+        for user in (viewer, gone):
+            ViewService.record_view(thread, user)
+        gone.delete()
+
+        self.assertEqual(ViewService.flush_views(), 1)
+        self.assertTrue(View.objects.filter(object_id=thread.id, user=viewer).exists())
+        self.assertFalse(get_redis().exists(ViewService.PENDING_KEY))
+
+    def test_thread_list_is_served_from_response_cache(self):
+        from django.db import connection
+        from django.test import override_settings
+        from django.test.utils import CaptureQueriesContext
+
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with override_settings(RESPONSE_CACHE_ENABLED=True, CACHES=locmem):
+            first = self.client.get(self.url_prefix)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+            with CaptureQueriesContext(connection) as context:
+                cached = self.client.get(self.url_prefix)
+            self.assertEqual(len(context.captured_queries), 0)
+            self.assertEqual(cached.data, first.data)
+
+            # writes bump the forum generation of the dao
+            thread = self.thread_base.create_thread()
+            response = self.client.get(self.url_prefix)
+            self.assertEqual(response.data["data"]["count"], first.data["data"]["count"] + 1)
+
+            self.client.post(f"{self.url_prefix}{thread.id}/like/", **self.HTTP_AUTHORIZATION)
+            self.client.get(self.url_prefix)
+            response = self.client.get(self.url_prefix, **self.HTTP_AUTHORIZATION)
+            liked = {item["id"]: item["is_liked"] for item in response.data["data"]["results"]}
+            self.assertTrue(liked[thread.id])
+            anonymous = self.client.get(self.url_prefix)
+            self.assertFalse(
+                any(item["is_liked"] for item in anonymous.data["data"]["results"])
+            )
+
+    def test_author_profile_change_invalidates_cached_lists(self):
+        from django.test import override_settings
+        from django.utils import timezone
+        from services.utils.response_cache import ResponseCache
+
+        scope = ResponseCache.forum_scope(self.dao.slug)
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with override_settings(RESPONSE_CACHE_ENABLED=True, CACHES=locmem):
+            self.client.get(self.url_prefix)
+
+            # a login leaves the cached payloads valid
+            generation = ResponseCache.state([scope])[0]
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=["last_login"])
+            self.assertEqual(ResponseCache.state([scope])[0], generation)
+
+            # so does a plain save that leaves nickname and avatar as loaded
+            self.user.save()
+            self.assertEqual(ResponseCache.state([scope])[0], generation)
+
+            nickname = self.user.nickname
+            self.user.nickname = "renamed-author"
+            self.user.save()
+            try:
+                response = self.client.get(self.url_prefix)
+                authors = {item["author"]["nickname"] for item in response.data["data"]["results"]}
+                self.assertEqual(authors, {"renamed-author"})
+            finally:
+                self.user.nickname = nickname
+                self.user.save()
+
+    def test_forum_slug_of_joins_generic_parents_in_one_query(self):
+        from forum.models import Like, Reply
+        from forum.signals import forum_slug_of
+
+        reply = Reply.objects.create(
+            content_object=self.thread, author=self.user, content=self.payload["content"]
+        )
+        like = Like.objects.create(content_object=reply, user=self.user)
+
+        for instance in (self.thread, reply, like):
+            with self.assertNumQueries(1):
+                self.assertEqual(forum_slug_of(instance), self.dao.slug)
+
+    def test_counter_orderings_use_page_numbers(self):
+        for _ in range(10):
+            self.thread_base.create_thread()
+
+        response = self.client.get(f"{self.url_prefix}?ordering=-likes_count")
+        self.assertIn("page=2", response.data["data"]["next"])
+        second = self.client.get(response.data["data"]["next"])
+        first_ids = {item["id"] for item in response.data["data"]["results"]}
+        second_ids = {item["id"] for item in second.data["data"]["results"]}
+        self.assertFalse(first_ids & second_ids)
+
+        # creation order never changes, it keeps the keyset cursor
+        response = self.client.get(self.url_prefix)
+        self.assertIn("cursor=", response.data["data"]["next"])
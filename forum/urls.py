@@ -12,6 +12,7 @@ from .views import (
     ThreadLikeView,
     VoteSynchronizationView,
     VotingHistoryView,
+    ForumSearchView,
 )
 
 app_name = "forum"
@@ -94,4 +95,14 @@ urlpatterns = [
     path("", include(dip_replies_router.urls)),
     path("", include(dip_reply_like_router.urls)),
     path("", include(voting_history_router.urls)),
+    path(
+        "search/",
+        ForumSearchView.as_view({"get": "list"}),
+        name="search",
+    ),
+    path(
+        "<slug:slug>/search/",
+        ForumSearchView.as_view({"get": "list"}),
+        name="dao-search",
+    ),
 ]
@@ -1,12 +1,14 @@
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import F
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.db.models import Q
 from django.db import transaction
+from django.urls import reverse
+from django.shortcuts import get_object_or_404
 import logging
 from drf_spectacular.utils import extend_schema
-from django.db.models import When, Case, IntegerField, Sum
-from .tasks import sync_dip_status, sync_votes_task
+from .tasks import sync_votes_task, sync_proposals_task
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -18,10 +20,18 @@ from .packages.abstract.abstract_view import (
     BaseReplyView,
     BaseLikeView,
     BaseTransactionDip,
-    BaseTransactionDip,
     BaseDipStatusUpdate,
+    BaseSearch,
 )
 from services.utils.permission_handler import StakeRequiredPermissionHandler
+from core.helpers.snapshot_users import render_snapshot, snapshot_users
+from services.utils.custom_pagination import CustomCursorPagination, CustomPagination
+from services.utils.response_cache import CachedResponseMixin, ResponseCache
+from services.utils.sync_gate import SyncResponseMixin
+from .packages.services.engagement_service import EngagementService
+from .packages.services.view_service import ViewService
+from .packages.services.finalization_service import DipFinalization
+from .packages.services.search_service import SearchService
 from .serializers import (
     ThreadSerializer,
     ThreadDetailSerializer,
@@ -33,37 +43,101 @@ from .serializers import (
     VoteSerializer,
     VotingHistorySerializer,
     DipSingleRefreshSerializer,
+    SearchResultSerializer,
     serializers,
 )
-from .models import Thread, Dip, DipStatus, Reply, Like, View, Vote
-
-
-class BaseContentView(BaseForumView):
+from .models import Thread, Dip, DipStatus, Reply, Like, Vote
+
+
+class BaseContentView(CachedResponseMixin, BaseForumView):
+    ORDERING_FIELDS = ["created_at", "likes_count", "replies_count", "views_count"]
+    default_ordering = "-created_at"
+
+    def get_ordering(self):
+        """?ordering= on a stored counter or created_at, "-" prefix for descending"""
+        ordering = self.request.query_params.get("ordering", self.default_ordering)
+        if ordering.lstrip("-") not in self.ORDERING_FIELDS:
+            ordering = self.default_ordering
+        return [ordering, "-id"]
+
+    @property
+    def pagination_class(self):
+        # counters change while users scroll, a cursor positioned on them would skip or
+        # repeat rows. only created_at orderings are keyset paginated
+        if getattr(self, "request", None) is None:
+            return CustomCursorPagination
+        if self.get_ordering()[0].lstrip("-") == "created_at":
+            return CustomCursorPagination
+        return CustomPagination
+
+    @property
+    def cursor_ordering(self):
+        if self.get_ordering()[0].startswith("-"):
+            return ("-created_at", "-id")
+        return ("created_at", "id")
+
+    # detail reads record views, a 304 would answer before the view is counted.
+    # only lists are served from the response cache and answer conditional requests
+    cached_actions = ("list",)
+    conditional_actions = ("list",)
+
+    def get_cache_scopes(self):
+        return [ResponseCache.forum_scope(self.kwargs.get("slug"))]
+
+    def apply_user_overlay(self, data, request):
+        results = data["data"]["results"]
+        liked = set(
+            Like.objects.filter(
+                user=request.user,
+                content_type=ContentType.objects.get_for_model(
+                    self.get_serializer_class().Meta.model
+                ),
+                object_id__in=[item["id"] for item in results],
+            ).values_list("object_id", flat=True)
+        )
+        for item in results:
+            item["is_liked"] = item["id"] in liked
+        return data
 
     def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(self.retrieve_content, request, *args, **kwargs)
+
+    def retrieve_content(self, request, *args, **kwargs):
         instance = self.get_object()
-        print(f"instance: {instance}")
-        print(f"instance id: {instance.id}")
-        print(f"user: {request.user}")
-        content_type = ContentType.objects.get_for_model(instance)
-        with transaction.atomic():
-            # Only track views for authenticated users
-            if request.user.is_authenticated:
-                view, created = View.objects.update_or_create(
-                    content_type=content_type,
-                    object_id=instance.id,
-                    user=request.user,
-                )
-                if created:
-                    instance.views_count = F("views_count") + 1
-                    instance.save()
-                    instance.refresh_from_db()
-            else:
-                # For anonymous users, just increment the view count
-                print(f"view not counted for anonymous user")
-        serializer = self.get_serializer(instance)
+        # Only track views for authenticated users, buffered in redis until flushed
+        if request.user.is_authenticated:
+            instance.views_count += ViewService.record_view(instance, request.user)
+        else:
+            logger.debug(f"view of {instance} not counted for anonymous user")
+        context = self.get_serializer_context()
+        context["replies_page"] = self.get_replies_page(instance)
+        serializer = self.get_serializer(instance, context=context)
         return Response(serializer.data)
 
+    def get_replies_page(self, instance):
+        """first page of replies for detail responses, later pages are served by the reply view"""
+        queryset = BaseReplyContentView.replies_of(
+            type(instance), instance.id, self.request.user
+        )
+        paginator = CustomCursorPagination()
+        page = paginator.paginate_queryset(
+            queryset, self.request, view=BaseReplyContentView
+        )
+        # continue from the reply endpoint instead of the detail url
+        paginator.base_url = self.request.build_absolute_uri(
+            reverse(
+                self.replies_url_name,
+                kwargs={"slug": self.kwargs.get("slug"), "id": instance.id},
+            )
+        )
+        return {
+            "count": paginator.count,
+            "next": paginator.get_next_link(),
+            "results": ReplySerializer(
+                page, many=True, context=self.get_serializer_context()
+            ).data,
+        }
+
     def create(self, request, *args, **kwargs):
         dao_slug = self.kwargs.get("slug")
         if not dao_slug:
@@ -80,10 +154,20 @@ class BaseContentView(BaseForumView):
         )
 
 
-class BaseReplyContentView(BaseReplyView):
+class BaseReplyContentView(CachedResponseMixin, BaseReplyView):
     """base view for replies to either Thread or Dip"""
 
+    # replies carry is_liked, polling clients still get 304s
+    cached_actions = ()
+    conditional_actions = ("list",)
+
+    def get_cache_scopes(self):
+        return [ResponseCache.forum_scope(self.kwargs.get("slug"))]
+
     serializer_class = ReplySerializer
+    pagination_class = CustomCursorPagination
+    # chronological from oldest to newest, id breaks ties between equal timestamps
+    cursor_ordering = ("created_at", "id")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -91,12 +175,17 @@ class BaseReplyContentView(BaseReplyView):
         context[context_key] = self.kwargs.get("id")
         return context
 
-    def get_queryset(self):
-        object_id = self.kwargs.get("id")
-        return Reply.objects.filter(
-            content_type=ContentType.objects.get_for_model(self.model),
+    @staticmethod
+    def replies_of(model, object_id, user):
+        """replies of one thread or dip with engagement annotated, shared with detail views"""
+        queryset = Reply.objects.filter(
+            content_type=ContentType.objects.get_for_model(model),
             object_id=object_id,
         )
+        return EngagementService.annotate_engagement(queryset, user)
+
+    def get_queryset(self):
+        return self.replies_of(self.model, self.kwargs.get("id"), self.request.user)
 
     def create(self, request, *args, **kwargs):
         object_id = self.kwargs.get("id")
@@ -138,7 +227,11 @@ class BaseLikeContentView(BaseLikeView):
             object_id=object_id,
         ).first()
         if like:
-            like.delete()
+            with transaction.atomic():
+                like.delete()
+                EngagementService.adjust_counter(
+                    self.model, object_id, "likes_count", -1
+                )
             return Response(
                 {
                     "status": "unliked",
@@ -147,12 +240,16 @@ class BaseLikeContentView(BaseLikeView):
                 status=status.HTTP_200_OK,
             )
         else:
-            like = Like.objects.create(
-                user=request.user,
-                content_type=content_type,
-                object_id=object_id,
-            )
-            print(f"created new like {like}")
+            with transaction.atomic():
+                like = Like.objects.create(
+                    user=request.user,
+                    content_type=content_type,
+                    object_id=object_id,
+                )
+                EngagementService.adjust_counter(
+                    self.model, object_id, "likes_count", 1
+                )
+            logger.debug(f"created new like {like}")
             serializer = self.get_serializer(like)
             # QUESTION
             # serializer.is_valid(raise_exception=True)
@@ -165,25 +262,24 @@ class ThreadView(BaseContentView):
     thread view includes operations: list, retrieve, create for dip model
     """
 
+    replies_url_name = "forum:thread-reply-list"
+
     def get_serializer_class(self):
         return ThreadDetailSerializer if self.action == "retrieve" else ThreadSerializer
 
     def get_queryset(self):
         dao_slug = self.kwargs.get("slug")
-        print(f"dao slug: {dao_slug}")
+        logger.debug(f"dao slug: {dao_slug}")
 
-        thread = Thread.objects.filter(dao__slug=dao_slug).order_by('-created_at')
-        return thread
+        thread = Thread.objects.filter(dao__slug=dao_slug).order_by(*self.get_ordering())
+        if self.action == "list":
+            thread = thread.defer("content")
+        return EngagementService.annotate_engagement(thread, self.request.user)
 
 
 @extend_schema(tags=["thread"])
 class ThreadReplyView(BaseReplyContentView):
     model = Thread
-    
-    def get_queryset(self):
-        """Override to order replies chronologically from oldest to newest"""
-        queryset = super().get_queryset()
-        return queryset.order_by('created_at')
 
 
 @extend_schema(tags=["thread"])
@@ -206,11 +302,6 @@ class ReplyLikeView(BaseLikeContentView):
 @extend_schema(tags=["dip"])
 class DipReplyView(BaseReplyContentView):
     model = Dip
-    
-    def get_queryset(self):
-        """Override to order replies chronologically from oldest to newest"""
-        queryset = super().get_queryset()
-        return queryset.order_by('created_at')
 
 
 @extend_schema(tags=["dip"])
@@ -233,6 +324,9 @@ class DipView(BaseContentView):
     """
 
     permission_classes = [StakeRequiredPermissionHandler]
+    replies_url_name = "forum:dip-reply-list"
+    ORDERING_FIELDS = BaseContentView.ORDERING_FIELDS + ["proposal_id"]
+    default_ordering = "-proposal_id"
 
     def create(self, request, *args, **kwargs):
         dao_slug = self.kwargs.get("slug")
@@ -278,33 +372,27 @@ class DipView(BaseContentView):
     def get_queryset(self):
         dao_slug = self.kwargs.get("slug")
         status = self.request.query_params.get("status")
+        # only drafts lack a proposal id, the cursor can not position on null keys
         queryset = Dip.objects.filter(dao__slug=dao_slug).exclude(
             status=DipStatus.DRAFT
-        )
+        ).exclude(proposal_id__isnull=True)
         if status:
             queryset = queryset.filter(status=status)
 
-        return queryset.annotate(
-            for_votes=Sum(
-                Case(
-                    When(votes__support=True, then=F("votes__voting_power")),
-                    default=0,
-                    output_field=IntegerField(),
-                ),
-            ),
-            against_votes=Sum(
-                Case(
-                    When(votes__support=False, then=F("votes__voting_power")),
-                    default=0,
-                    output_field=IntegerField(),
-                )
-            ),
-        ).order_by("-proposal_id")
+        if self.action == "list":
+            # lists serve the excerpt, the lexical tree stays in postgres
+            queryset = queryset.defer("content", "top_voters")
+        queryset = EngagementService.annotate_engagement(queryset, self.request.user)
+        # tallies are stored on the dip by VoteService when votes are synced
+        return queryset.order_by(*self.get_ordering())
 
 
 @extend_schema(tags=["refresh"])
-class DipSyncronizationView(BaseTransactionDip):
-    """dip view for refreshing and synchronizing database records and on-chain proposals"""
+class DipSyncronizationView(SyncResponseMixin, BaseTransactionDip):
+    """
+    dip view for refreshing and synchronizing database records and on-chain proposals.
+    one sync per dao at a time, concurrent refreshes get the running task id
+    """
 
     serializer_class = DipRefreshSerializer
     queryset = Dip.objects.all()
@@ -320,17 +408,20 @@ class DipSyncronizationView(BaseTransactionDip):
             data=request.data, context=self.get_serializer_context()
         )
         serializer.is_valid(raise_exception=True)
+        dao = serializer.validated_data["dao"]
 
-        serializer.save()
-
-        return Response(
-            {"message": "sync started"},
-            status=status.HTTP_200_OK,
+        return self.sync_response(
+            "dips",
+            dao.id,
+            lambda task_id: sync_proposals_task.apply_async(
+                kwargs={"dao_id": dao.id}, task_id=task_id
+            ),
+            "sync started",
         )
 
 
 @extend_schema(tags=["refresh"])
-class VoteSynchronizationView(BaseTransactionDip):
+class VoteSynchronizationView(SyncResponseMixin, BaseTransactionDip):
     serializer_class = VoteSerializer
 
     def get_queryset(self):
@@ -357,26 +448,34 @@ class VoteSynchronizationView(BaseTransactionDip):
                 {"error": f"dip with id {dip_id} not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        task = sync_votes_task.delay(dip_id)
-
-        return Response(
-            {
-                "task_id": task.id,
-                "dip_id": dip_id,
-                "message": "vote sync task queued successfully",
-            },
-            status=status.HTTP_202_ACCEPTED,
+        return self.sync_response(
+            "votes",
+            dip.id,
+            lambda task_id: sync_votes_task.apply_async(args=[dip_id], task_id=task_id),
+            "vote sync task queued successfully",
+            dip_id=dip_id,
         )
 
 
 @extend_schema(tags=["dip"])
-class VotingHistoryView(BaseVoters):
+class VotingHistoryView(CachedResponseMixin, BaseVoters):
     serializer_class = VotingHistorySerializer
+    cached_actions = ()
+    conditional_actions = ("list",)
+    # voting power is no cursor key, page numbers keep pages stable across syncs
+    pagination_class = CustomPagination
+
+    def get_cache_scopes(self):
+        return [ResponseCache.forum_scope(self.kwargs.get("slug"))]
 
     def get_queryset(self):
         context = self.get_serializer_context()
         dip_id = context["id"]
-        return Vote.objects.filter(dip_id=dip_id).all()
+        return (
+            Vote.objects.filter(dip_id=dip_id)
+            .select_related("user")
+            .order_by("-voting_power", "-id")
+        )
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -384,8 +483,46 @@ class VotingHistoryView(BaseVoters):
 
         return context
 
+    def get_summary(self):
+        """tally precomputed by VoteService, read from the dip row"""
+        dip = get_object_or_404(
+            Dip.objects.only(
+                "for_votes",
+                "against_votes",
+                "voter_count",
+                "tally_synced_block",
+                "top_voters",
+            ),
+            id=self.kwargs.get("id"),
+            dao__slug=self.kwargs.get("slug"),
+        )
+        request = self.request
+        return {
+            "for_votes": str(dip.for_votes),
+            "against_votes": str(dip.against_votes),
+            "total_votes": str(dip.for_votes + dip.against_votes),
+            "voter_count": dip.voter_count,
+            "synced_block": dip.tally_synced_block,
+            "top_voters": render_snapshot(
+                dip.top_voters,
+                snapshot_users(
+                    (voter.get("user_id") for voter in dip.top_voters or []), request
+                ),
+            ),
+        }
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.list_voters, request, *args, **kwargs)
+
+    def list_voters(self, request, *args, **kwargs):
+        summary = self.get_summary()
+        # skip the mixin, conditional handling already happened in list
+        response = super(CachedResponseMixin, self).list(request, *args, **kwargs)
+        response.data["data"]["summary"] = summary
+        return response
 
-class DipSingleSyncronizationView(BaseDipStatusUpdate):
+
+class DipSingleSyncronizationView(SyncResponseMixin, BaseDipStatusUpdate):
     serializer_class = DipSingleRefreshSerializer
 
     def get_queryset(self):
@@ -396,13 +533,83 @@ class DipSingleSyncronizationView(BaseDipStatusUpdate):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
 
-        task = sync_dip_status.delay(instance.id)
-
-        return Response(
-            {
-                "proposal_id": instance.proposal_id,
-                "task_id": task.id,
-                "message": "Status update task queued successfully",
-            },
-            status=status.HTTP_202_ACCEPTED,
+        return self.sync_response(
+            "dip_status",
+            instance.id,
+            lambda task_id: DipFinalization.refresh(instance.dao_id, instance.id, task_id),
+            "Status update task queued successfully",
+            proposal_id=instance.proposal_id,
         )
+
+
+@extend_schema(tags=["search"])
+class ForumSearchView(BaseSearch):
+    """
+    full-text search over threads, dips or replies (?type=), ranked by relevance.
+    scoped to a dao when the url carries a slug, global otherwise
+    """
+
+    serializer_class = SearchResultSerializer
+    pagination_class = CustomCursorPagination
+    cursor_ordering = ("-rank", "-id")
+    SEARCH_TYPES = {"threads": Thread, "dips": Dip, "replies": Reply}
+
+    def get_search_query(self):
+        query = (self.request.query_params.get("q") or "").strip()
+        if len(query) < SearchService.MIN_QUERY_LENGTH:
+            raise serializers.ValidationError(
+                f"q must be at least {SearchService.MIN_QUERY_LENGTH} characters"
+            )
+        return query
+
+    def get_search_model(self):
+        search_type = self.request.query_params.get("type", "threads")
+        if search_type not in self.SEARCH_TYPES:
+            raise serializers.ValidationError(
+                f"type must be one of {', '.join(self.SEARCH_TYPES)}"
+            )
+        return self.SEARCH_TYPES[search_type]
+
+    def get_queryset(self):
+        query = self.get_search_query()
+        model = self.get_search_model()
+        slug = self.kwargs.get("slug")
+
+        if model is Reply:
+            queryset = Reply.objects.select_related(
+                "author", "content_type"
+            ).prefetch_related(
+                GenericPrefetch(
+                    "content_object",
+                    [
+                        Thread.objects.select_related("dao").defer("content"),
+                        Dip.objects.select_related("dao").defer("content"),
+                    ],
+                )
+            )
+            if slug:
+                queryset = queryset.filter(
+                    Q(
+                        content_type=ContentType.objects.get_for_model(Thread),
+                        object_id__in=Thread.objects.filter(dao__slug=slug).values("id"),
+                    )
+                    | Q(
+                        content_type=ContentType.objects.get_for_model(Dip),
+                        object_id__in=Dip.objects.filter(dao__slug=slug).values("id"),
+                    )
+                )
+        else:
+            queryset = model.objects.select_related("author", "dao")
+            if slug:
+                queryset = queryset.filter(dao__slug=slug)
+            if model is Dip:
+                queryset = queryset.exclude(status=DipStatus.DRAFT)
+
+        # the lexical tree is only loaded for the headlines of the served page
+        return SearchService.search(queryset.defer("content"), query)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            SearchService.headlines(page, self.get_search_query())
+        return page
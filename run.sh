@@ -11,4 +11,4 @@ python manage.py migrate
 python manage.py collectstatic --noinput
 
 # Start the Gunicorn server
-gunicorn app.wsgi:application --bind 0.0.0.0:8000
+gunicorn app.wsgi:application --config app/gunicorn.conf.py
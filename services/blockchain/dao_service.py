@@ -140,6 +140,7 @@ class DaoConfirmationService(BlockchainClient):
                         "version": version,
                         "symbol": symbol,
                         "total_supply": total_supply,
+                        "deployment_block": log["blockNumber"],
                     }
                 except Exception as ex:
                     # Reset current_block to its original value before raising
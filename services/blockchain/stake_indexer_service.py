@@ -0,0 +1,97 @@
+from web3 import Web3
+from logging_config import logger
+from .blockchain_client import BlockchainClient
+
+
+class StakeIndexerService(BlockchainClient):
+    """indexes Staked/Unstaked events of a dao staking contract.
+    events only tell which holders changed, the authoritative amount and voting power
+    are read from the staking contract at the indexed block so that every holder stays current"""
+
+    STAKE_EVENTS = ("Staked(address,uint256)", "Unstaked(address,uint256)")
+    BATCH_SIZE = 100
+
+    def __init__(self, dao_address: str = None, staking_address: str = None, network: int = None, retries: int = 3):
+        super().__init__(dao_address=dao_address, network=network, retries=retries)
+        self.staking_address = Web3.to_checksum_address(staking_address)
+        self.staking_contract = self.web3.eth.contract(
+            address=self.staking_address, abi=self.get_abi("staking_abi")
+        )
+
+    def get_event_topics(self) -> list:
+        return ["0x" + self.web3.keccak(text=event).hex() for event in self.STAKE_EVENTS]
+
+    def fetch_changed_holders(self, from_block: int, to_block: int) -> set:
+        """
+        scans stake and unstake logs between two blocks (inclusive) in block_range sized windows
+
+        Args:
+            from_block (int): first block to scan
+            to_block (int): last block to scan
+
+        Returns:
+            set: lowercase addresses of holders whose stake changed
+        """
+        topics = self.get_event_topics()
+        holders = set()
+
+        window_start = from_block
+        while window_start <= to_block:
+            window_end = min(to_block, window_start + self.block_range - 1)
+            logs = self.web3.eth.get_logs(
+                {
+                    "fromBlock": window_start,
+                    "toBlock": window_end,
+                    "address": self.staking_address,
+                    # a nested list matches any of the topics
+                    "topics": [topics],
+                }
+            )
+            for log in logs:
+                holders.add("0x" + log["topics"][1].hex()[-40:].lower())
+
+            logger.info(
+                f"staking {self.staking_address}: {len(logs)} events in blocks {window_start}-{window_end}"
+            )
+            window_start = window_end + 1
+
+        return holders
+
+    def read_holder_states(self, holders, block_identifier="latest") -> dict:
+        """
+        reads stakedAmount and getVotingPower for the given holders using json-rpc batches
+
+        Args:
+            holders (iterable): holder addresses
+            block_identifier (int | str): block to read the state at
+
+        Returns:
+            dict: address -> {"amount": int, "voting_power": int}
+        """
+        holders = list(holders)
+        states = {}
+
+        for start in range(0, len(holders), self.BATCH_SIZE):
+            chunk = holders[start : start + self.BATCH_SIZE]
+            with self.web3.batch_requests() as batch:
+                for holder in chunk:
+                    address = Web3.to_checksum_address(holder)
+                    batch.add(
+                        self.staking_contract.functions.stakedAmount(address).call(
+                            block_identifier=block_identifier
+                        )
+                    )
+                    batch.add(
+                        self.staking_contract.functions.getVotingPower(address).call(
+                            block_identifier=block_identifier
+                        )
+                    )
+                results = batch.execute()
+
+            for index, holder in enumerate(chunk):
+                states[holder.lower()] = {
+                    "amount": int(results[index * 2]),
+                    "voting_power": int(results[index * 2 + 1]),
+                }
+
+        return states
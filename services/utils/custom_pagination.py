@@ -1,6 +1,9 @@
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser, FormParser
+from .renderers import ORJSONParser
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.response import Response
+from django.db import connections
+import json
 
 ################### CUSTOM PAGINATION ###################
 
@@ -21,11 +24,85 @@ class CustomPagination(PageNumberPagination):
         )
 
 
+class CustomCursorPagination(CursorPagination):
+    """
+    keyset pagination with the same {"data": {...}} envelope as CustomPagination.
+    views choose the keys through a cursor_ordering attribute, every page costs the same
+    as the first one because no OFFSET scan is involved
+    """
+
+    page_size = 10
+    ordering = ("-created_at", "-id")
+    # above this planner estimate the total is reported approximately instead of COUNT(*)
+    approximate_count_threshold = 10000
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, "cursor_ordering", None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def get_count(self, queryset, view=None):
+        """
+        exact count for small lists, the postgres planner estimate for large ones.
+        the exact count is capped at the threshold, so a small list costs a single
+        query and only lists reaching the cap pay for the EXPLAIN.
+        views can opt out of the estimate with approximate_count = False
+
+        Args:
+            queryset (QuerySet): unpaginated queryset
+            view (APIView, optional): view the queryset belongs to
+
+        Returns:
+            int: total rows (approximate above the threshold)
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql" or not getattr(
+            view, "approximate_count", True
+        ):
+            return queryset.count()
+
+        queryset = queryset.order_by()
+        capped = queryset[: self.approximate_count_threshold].count()
+        if capped < self.approximate_count_threshold:
+            return capped
+
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        # the planner can underestimate, the total is never reported below the cap
+        return max(int(plan[0]["Plan"]["Plan Rows"]), capped)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # the total is only worth computing on the first page
+        self.count = (
+            None
+            if request.query_params.get(self.cursor_query_param)
+            else self.get_count(queryset, view)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "data": {
+                    "count": self.count,
+                    "next": self.get_next_link(),
+                    "previous": self.get_previous_link(),
+                    "results": data,
+                }
+            }
+        )
+
+
 class CustomParserPaginationMixin:
     """
     mixin for handling multiple parser types
     separates parser configs from view logic
     """
 
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
     pagination_class = CustomPagination
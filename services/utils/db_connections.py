@@ -0,0 +1,120 @@
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from logging_config import logger
+from .redis_client import get_redis
+
+################### PERSISTENT DATABASE CONNECTIONS ###################
+
+# connections inherited from a parent process, kept referenced so garbage collection
+# never sends a terminate message over the socket the parent still uses
+_inherited = []
+
+
+def discard_inherited_connections() -> None:
+    """
+    called in a freshly forked gunicorn or celery child. drops the parent's connection
+    objects without closing them, the child opens its own on first use
+    """
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None:
+            _inherited.append(connection.connection)
+            connection.connection = None
+    ConnectionMetrics.process_started()
+
+
+def make_psycopg_green() -> None:
+    """
+    called when a celery worker starts. in a gevent worker psycopg2 then waits for the
+    server through the gevent hub, a query yields to the other greenlets instead of
+    blocking the whole worker
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return
+    if not monkey.is_module_patched("socket"):
+        return
+
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
+    logger.info("psycopg2 patched for gevent")
+
+
+class ConnectionMetrics:
+    """
+    counters of physical connections opened per process role (web, worker), kept in
+    redis so every process reports to the same place. a well tuned CONN_MAX_AGE shows
+    few opened connections per served request
+    """
+
+    PREFIX = "dbconn"
+
+    @staticmethod
+    def role() -> str:
+        return os.environ.get("DB_APPLICATION_NAME", "daocafe")
+
+    @staticmethod
+    def _key() -> str:
+        return f"{ConnectionMetrics.PREFIX}:{ConnectionMetrics.role()}"
+
+    @staticmethod
+    def connection_opened(sender=None, connection=None, **kwargs) -> None:
+        """connection_created receiver"""
+        try:
+            client = get_redis()
+            pipeline = client.pipeline()
+            pipeline.hincrby(ConnectionMetrics._key(), "opened", 1)
+            pipeline.hset(ConnectionMetrics._key(), "last_opened_at", int(time.time()))
+            pipeline.execute()
+        except Exception as ex:
+            logger.debug(f"failed to record connection metrics: {str(ex)}")
+
+    @staticmethod
+    def process_started() -> None:
+        try:
+            get_redis().hincrby(ConnectionMetrics._key(), "processes", 1)
+        except Exception as ex:
+            logger.debug(f"failed to record connection metrics: {str(ex)}")
+
+    @staticmethod
+    def snapshot() -> dict:
+        """
+        opened connection counters per role plus the live connections postgres reports
+
+        Returns:
+            dict: {"counters": {role: {...}}, "server": [{"application": .., "state": .., "count": ..}],
+            "max_connections": int, "conn_max_age": int}
+        """
+        client = get_redis()
+        counters = {
+            key.split(":", 1)[1]: client.hgetall(key)
+            for key in client.scan_iter(f"{ConnectionMetrics.PREFIX}:*")
+        }
+
+        with connections["default"].cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT application_name, COALESCE(state, 'unknown'), COUNT(*)
+                FROM pg_stat_activity
+                WHERE datname = current_database()
+                GROUP BY 1, 2
+                ORDER BY 1, 2
+                """
+            )
+            server = [
+                {"application": application, "state": state, "count": count}
+                for application, state, count in cursor.fetchall()
+            ]
+            cursor.execute("SHOW max_connections")
+            max_connections = int(cursor.fetchone()[0])
+
+        return {
+            "counters": counters,
+            "server": server,
+            "max_connections": max_connections,
+            "conn_max_age": settings.DATABASES["default"].get("CONN_MAX_AGE", 0),
+        }
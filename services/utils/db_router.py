@@ -0,0 +1,175 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from logging_config import logger
+
+################### READ REPLICA ROUTING ###################
+
+# set for safe-method requests and read-only celery tasks, everything else reads the primary
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def use_replicas():
+    """routes reads in the block to a healthy replica"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """routes reads in the block to the primary, even inside a replica-enabled request"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaHealth:
+    """replication lag per replica alias, measured at most once per check interval"""
+
+    PREFIX = "replica"
+
+    @staticmethod
+    def max_lag() -> float:
+        return getattr(settings, "REPLICA_MAX_LAG_SECONDS", 2)
+
+    @staticmethod
+    def check_interval() -> int:
+        return getattr(settings, "REPLICA_LAG_CHECK_SECONDS", 5)
+
+    @staticmethod
+    def measure(alias) -> float:
+        """
+        seconds the replica is behind, zero when it replayed everything it received
+
+        Args:
+            alias (str): database alias of the replica
+
+        Returns:
+            float: lag in seconds, infinity when the replica can not be reached
+        """
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT CASE
+                        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE COALESCE(
+                            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+                        )
+                    END
+                    """
+                )
+                return float(cursor.fetchone()[0])
+        except Exception as ex:
+            logger.error(f"replica {alias} lag check failed: {str(ex)}")
+            return float("inf")
+
+    @staticmethod
+    def lag(alias) -> float:
+        key = f"{ReplicaHealth.PREFIX}:lag:{alias}"
+        lag = cache.get(key)
+        if lag is None:
+            lag = ReplicaHealth.measure(alias)
+            cache.set(key, lag, ReplicaHealth.check_interval())
+        return lag
+
+    @staticmethod
+    def healthy(aliases) -> list:
+        """replicas within the lag threshold, empty means reads fall back to the primary"""
+        return [
+            alias for alias in aliases if ReplicaHealth.lag(alias) <= ReplicaHealth.max_lag()
+        ]
+
+
+class ReplicaRouter:
+    """
+    sends reads to a random healthy replica while replica reads are enabled for the
+    current request or task, writes, migrations and reads inside transactions stay
+    on the primary
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if not replicas or not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        # reads inside a transaction must see its own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        healthy = ReplicaHealth.healthy(replicas)
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    enables replica reads for GET, HEAD and OPTIONS. a client that just wrote is pinned
+    to the primary for REPLICA_PIN_SECONDS so it reads its own writes
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def pin_key(request) -> str:
+        # jwt auth resolves in the view, the token (or the address) identifies the client
+        identity = request.META.get("HTTP_AUTHORIZATION") or (
+            request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")[0].strip()
+            or request.META.get("REMOTE_ADDR", "")
+        )
+        digest = hashlib.md5(identity.encode()).hexdigest()
+        return f"{ReplicaHealth.PREFIX}:pin:{digest}"
+
+    def __call__(self, request):
+        if not getattr(settings, "DATABASE_REPLICAS", []):
+            return self.get_response(request)
+
+        if request.method not in self.SAFE_METHODS:
+            response = self.get_response(request)
+            cache.set(
+                self.pin_key(request),
+                1,
+                getattr(settings, "REPLICA_PIN_SECONDS", 5),
+            )
+            return response
+
+        if cache.get(self.pin_key(request)):
+            return self.get_response(request)
+
+        with use_replicas():
+            return self.get_response(request)
+
+
+def enable_replicas_for_task(task=None, **kwargs):
+    """celery task_prerun handler, tasks declared with read_only=True read from replicas"""
+    if getattr(task, "read_only", False):
+        task.request.replica_token = _replica_reads.set(True)
+
+
+def reset_replicas_for_task(task=None, **kwargs):
+    """celery task_postrun handler"""
+    token = getattr(task.request, "replica_token", None) if task else None
+    if token is not None:
+        _replica_reads.reset(token)
+        task.request.replica_token = None
@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+import orjson
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import transaction
+from logging_config import logger
+from .redis_client import get_redis
+from .renderers import orjson_default
+
+################### DAO EVENT STREAM ###################
+
+
+class DaoEvents:
+    """
+    per dao channel in redis pub/sub. celery tasks publish sync completions, new dips,
+    vote tallies and presale state, the events endpoint relays them to browsers as
+    server-sent events. delivery is best effort, a missed event means a client
+    refetches the list like it did before
+    """
+
+    PREFIX = "events:dao"
+
+    SYNC_COMPLETED = "sync.completed"
+    DIP_CREATED = "dip.created"
+    DIP_STATUS = "dip.status"
+    VOTE_TALLY = "vote.tally"
+    PRESALE_UPDATED = "presale.updated"
+
+    @staticmethod
+    def channel(slug) -> str:
+        return f"{DaoEvents.PREFIX}:{slug}"
+
+    @staticmethod
+    def publish(slug, event, data) -> None:
+        """
+        Args:
+            slug (str): dao the event belongs to
+            event (str): one of the event names above
+            data (dict): payload, serialized with the api renderer rules
+        """
+        payload = orjson.dumps(
+            {"event": event, "data": data, "sent_at": time.time()},
+            default=orjson_default,
+        )
+        try:
+            get_redis().publish(DaoEvents.channel(slug), payload)
+        except Exception as ex:
+            logger.error(f"failed to publish {event} for dao {slug}: {str(ex)}")
+
+    @staticmethod
+    def publish_on_commit(slug, event, data) -> None:
+        """
+        publishes once the surrounding transaction commits, so listeners refetch fresh
+        rows. outside a transaction it publishes right away
+        """
+        transaction.on_commit(lambda: DaoEvents.publish(slug, event, data))
+
+    @staticmethod
+    def sync_completed(slug, task_id, kind, **data) -> None:
+        """tells the client which of the task ids it received is done"""
+        DaoEvents.publish(
+            slug, DaoEvents.SYNC_COMPLETED, {"task_id": task_id, "kind": kind, **data}
+        )
+
+    @staticmethod
+    def presale_state(presale) -> dict:
+        return {
+            "id": presale.id,
+            "status": presale.status,
+            "current_tier": presale.current_tier,
+            "current_price": presale.current_price,
+            "remaining_in_tier": presale.remaining_in_tier,
+            "total_remaining": presale.total_remaining,
+            "total_raised": presale.total_raised,
+        }
+
+
+class EventStream:
+    """
+    async generator of server-sent events for one dao. comments keep idle connections
+    open through proxies, streams end after SSE_MAX_SECONDS and EventSource reconnects
+    """
+
+    RETRY_MS = 3000
+
+    @staticmethod
+    def heartbeat_seconds() -> int:
+        return getattr(settings, "SSE_HEARTBEAT_SECONDS", 15)
+
+    @staticmethod
+    def max_seconds() -> int:
+        return getattr(settings, "SSE_MAX_SECONDS", 300)
+
+    @staticmethod
+    def format(message) -> bytes:
+        """
+        Args:
+            message (str | bytes): payload published by DaoEvents.publish
+
+        Returns:
+            bytes: one server-sent event, named after the published event
+        """
+        payload = orjson.loads(message)
+        data = orjson.dumps(payload["data"], default=orjson_default)
+        return b"event: " + payload["event"].encode() + b"\ndata: " + data + b"\n\n"
+
+    @staticmethod
+    async def stream(slug):
+        # pub/sub holds its connection for the whole stream, one client per stream
+        client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(DaoEvents.channel(slug))
+        try:
+            # sent right away so proxies forward the headers and the client knows the backoff
+            yield f"retry: {EventStream.RETRY_MS}\n\n".encode()
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + EventStream.max_seconds()
+            while loop.time() < deadline:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=EventStream.heartbeat_seconds(),
+                )
+                if message is None:
+                    yield b": keepalive\n\n"
+                    continue
+                try:
+                    yield EventStream.format(message["data"])
+                except (orjson.JSONDecodeError, KeyError) as ex:
+                    logger.error(f"dropped malformed event for dao {slug}: {str(ex)}")
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+            await client.aclose()
@@ -0,0 +1,163 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+from logging_config import logger
+
+################### IMAGE VARIANTS ###################
+
+
+class ImageVariantService:
+    """
+    fixed-size webp and jpeg derivatives of uploaded images. models declare
+    IMAGE_VARIANTS = {field: (variant, ...)} and keep the generated file names in an
+    image_variants json field, keyed by field with the source file they were made from
+    """
+
+    SIZES = {
+        "avatar": (96, 96),
+        "card": (400, 400),
+        "cover": (1200, 400),
+    }
+    FORMATS = {
+        "webp": ("WEBP", {"quality": 80, "method": 6}),
+        "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+    }
+    DEFAULT_FORMAT = "webp"
+
+    @staticmethod
+    def pending_fields(instance) -> list:
+        """
+        image fields whose stored variants were generated from another file (or never)
+
+        Args:
+            instance (Model): model declaring IMAGE_VARIANTS
+
+        Returns:
+            list: names of the image fields that need new variants
+        """
+        pending = []
+        variants = instance.image_variants or {}
+        for field_name in getattr(instance, "IMAGE_VARIANTS", {}):
+            image = getattr(instance, field_name)
+            # shared placeholders are served as they are
+            if not image or image.name == instance._meta.get_field(field_name).default:
+                continue
+            if variants.get(field_name, {}).get("source") != image.name:
+                pending.append(field_name)
+        return pending
+
+    @staticmethod
+    def schedule(instance) -> None:
+        """enqueues generation once the upload is committed, no-op when nothing changed"""
+        if not ImageVariantService.pending_fields(instance):
+            return
+        from core.tasks import generate_image_variants
+
+        label, pk = instance._meta.label, instance.pk
+        transaction.on_commit(lambda: generate_image_variants.delay(label, pk))
+
+    @staticmethod
+    def render(source, variant, extension) -> ContentFile:
+        """crops and scales the source to the variant size and encodes it"""
+        image_format, options = ImageVariantService.FORMATS[extension]
+        fitted = ImageOps.fit(
+            source, ImageVariantService.SIZES[variant], Image.Resampling.LANCZOS
+        )
+        # jpeg has no alpha channel, webp keeps transparency
+        fitted = fitted.convert("RGB" if image_format == "JPEG" else "RGBA")
+        buffer = BytesIO()
+        fitted.save(buffer, image_format, **options)
+        return ContentFile(buffer.getvalue())
+
+    @staticmethod
+    def generate(instance) -> dict:
+        """
+        writes every pending variant to the storage of its field, removes the files
+        made from the previous upload and saves the new names on the instance
+
+        Args:
+            instance (Model): model declaring IMAGE_VARIANTS
+
+        Returns:
+            dict: the updated image_variants
+        """
+        variants = dict(instance.image_variants or {})
+        for field_name in ImageVariantService.pending_fields(instance):
+            image = getattr(instance, field_name)
+            storage = image.storage
+            try:
+                with image.open("rb"):
+                    source = ImageOps.exif_transpose(Image.open(image))
+                    source.load()
+            except (FileNotFoundError, UnidentifiedImageError) as ex:
+                logger.error(
+                    f"cannot read {field_name} of {instance._meta.label} {instance.pk}: {str(ex)}"
+                )
+                continue
+
+            stem = os.path.splitext(image.name)[0]
+            entry = {"source": image.name}
+            for variant in instance.IMAGE_VARIANTS[field_name]:
+                entry[variant] = {
+                    extension: storage.save(
+                        f"{stem}_{variant}.{extension}",
+                        ImageVariantService.render(source, variant, extension),
+                    )
+                    for extension in ImageVariantService.FORMATS
+                }
+
+            ImageVariantService._delete_files(storage, variants.get(field_name, {}))
+            variants[field_name] = entry
+
+        instance.image_variants = variants
+        instance.save(update_fields=["image_variants"])
+        return variants
+
+    @staticmethod
+    def _delete_files(storage, entry) -> None:
+        for variant, files in entry.items():
+            if variant == "source":
+                continue
+            for name in files.values():
+                storage.delete(name)
+
+    @staticmethod
+    def url(instance, field_name, variant, request=None, extension=None):
+        """
+        url of a derivative, falls back to the original file until it is generated
+
+        Args:
+            instance (Model): model declaring IMAGE_VARIANTS
+            field_name (str): image field
+            variant (str): avatar, card or cover
+            request (Request, optional): makes the url absolute
+            extension (str, optional): webp (default) or jpeg
+
+        Returns:
+            str | None: url of the variant, the original or None without an image
+        """
+        image = getattr(instance, field_name)
+        if not image:
+            return None
+
+        entry = (instance.image_variants or {}).get(field_name, {})
+        name = None
+        if entry.get("source") == image.name:
+            name = entry.get(variant, {}).get(
+                extension or ImageVariantService.DEFAULT_FORMAT
+            )
+        url = image.storage.url(name) if name else image.url
+        return request.build_absolute_uri(url) if request is not None else url
+
+    @staticmethod
+    def urls(instance, field_name, variant, request=None) -> dict:
+        """urls of the variant in every format, for <picture> sources"""
+        return {
+            extension: ImageVariantService.url(
+                instance, field_name, variant, request, extension
+            )
+            for extension in ImageVariantService.FORMATS
+        }
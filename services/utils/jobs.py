@@ -0,0 +1,228 @@
+import time
+import uuid
+
+import orjson
+from celery import Task
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from logging_config import logger
+from .redis_client import get_redis
+from .renderers import orjson_default
+from .sync_gate import SyncGate
+
+################### BACKGROUND JOBS ###################
+
+
+def error_message(exc) -> str:
+    """readable message of a job failure, validation errors keep only their texts"""
+    if isinstance(exc, serializers.ValidationError):
+        detail = exc.detail
+        if isinstance(detail, dict):
+            detail = [f"{field}: {' '.join(map(str, errors))}" for field, errors in detail.items()]
+        return " ".join(map(str, detail)) if isinstance(detail, list) else str(detail)
+    return str(exc)
+
+
+class JobStore:
+    """
+    state of request-triggered background jobs, one redis hash per job. the job id
+    doubles as the celery task id, the web process only writes the queued state and
+    reads, the worker reports progress, the result or the error
+    """
+
+    PREFIX = "job"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @staticmethod
+    def ttl() -> int:
+        return getattr(settings, "JOB_RESULT_TTL", 60 * 60 * 24)
+
+    @staticmethod
+    def _key(job_id) -> str:
+        return f"{JobStore.PREFIX}:{job_id}"
+
+    @staticmethod
+    def _write(job_id, **fields) -> None:
+        fields["updated_at"] = int(time.time())
+        key = JobStore._key(job_id)
+        pipeline = get_redis().pipeline()
+        pipeline.hset(key, mapping={name: str(value) for name, value in fields.items()})
+        pipeline.expire(key, JobStore.ttl())
+        pipeline.execute()
+
+    @staticmethod
+    def create(kind, user=None, job_id=None) -> str:
+        """
+        registers a queued job
+
+        Args:
+            kind (str): what the job does, e.g. dao_fetch
+            user (User, optional): owner, the only user allowed to read the job
+            job_id (str, optional): id reserved by the caller, a new uuid by default
+
+        Returns:
+            str: job id
+        """
+        job_id = job_id or str(uuid.uuid4())
+        owner = user.pk if user is not None and user.is_authenticated else ""
+        JobStore._write(
+            job_id,
+            id=job_id,
+            kind=kind,
+            owner=owner,
+            status=JobStore.QUEUED,
+            progress=0,
+            message="",
+            created_at=int(time.time()),
+        )
+        return job_id
+
+    @staticmethod
+    def enqueue(task, kind, user=None, *args, job_id=None, **kwargs) -> str:
+        """
+        creates the job and queues the task under the same id, the task receives the
+        job id as its first argument
+
+        Returns:
+            str: job id
+        """
+        job_id = JobStore.create(kind, user, job_id)
+        try:
+            task.apply_async(args=[job_id, *args], kwargs=kwargs, task_id=job_id)
+        except Exception as ex:
+            JobStore.fail(job_id, f"failed to queue job: {str(ex)}")
+            raise
+        return job_id
+
+    @staticmethod
+    def progress(job_id, progress, message="") -> None:
+        JobStore._write(job_id, progress=int(progress), message=message)
+
+    @staticmethod
+    def start(job_id) -> None:
+        JobStore._write(job_id, status=JobStore.RUNNING)
+
+    @staticmethod
+    def retry(job_id, error) -> None:
+        JobStore._write(job_id, status=JobStore.RETRYING, error=error)
+
+    @staticmethod
+    def succeed(job_id, result) -> None:
+        JobStore._write(
+            job_id,
+            status=JobStore.SUCCEEDED,
+            progress=100,
+            error="",
+            result=orjson.dumps(result, default=orjson_default).decode(),
+        )
+
+    @staticmethod
+    def fail(job_id, error) -> None:
+        JobStore._write(job_id, status=JobStore.FAILED, error=error)
+
+    @staticmethod
+    def get(job_id):
+        """
+        Args:
+            job_id (str): id returned by enqueue
+
+        Returns:
+            dict | None: job state with the decoded result, None when unknown or expired
+        """
+        job = get_redis().hgetall(JobStore._key(job_id))
+        if not job:
+            return None
+
+        result = job.pop("result", "")
+        return {
+            "id": job["id"],
+            "kind": job.get("kind"),
+            "status": job.get("status"),
+            "progress": int(job.get("progress") or 0),
+            "message": job.get("message") or None,
+            "result": orjson.loads(result) if result else None,
+            "error": job.get("error") or None,
+            "owner": int(job["owner"]) if job.get("owner") else None,
+            "created_at": int(job.get("created_at") or 0),
+            "updated_at": int(job.get("updated_at") or 0),
+        }
+
+
+class JobTask(Task):
+    """
+    celery base class of job tasks, mirrors the task lifecycle into the JobStore.
+    the task id is the job id, the return value becomes the job result
+    """
+
+    # bad input does not get better by retrying
+    dont_autoretry_for = (serializers.ValidationError, ObjectDoesNotExist)
+
+    def before_start(self, task_id, args, kwargs):
+        JobStore.start(task_id)
+
+    def on_success(self, retval, task_id, args, kwargs):
+        JobStore.succeed(task_id, retval)
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        JobStore.retry(task_id, str(exc))
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        logger.error(f"job {self.name} {task_id} failed: {str(exc)}")
+        JobStore.fail(task_id, error_message(exc))
+
+    def progress(self, progress, message="") -> None:
+        """reports progress of the running job, 0 to 100"""
+        JobStore.progress(self.request.id, progress, message)
+
+
+class JobResponseMixin:
+    """
+    views that hand chain work to a job answer 202 with where to poll for it. with a
+    sync_target the job goes through the SyncGate, a job already running for the
+    target is returned instead of a new one and a fresh target answers 200 with the
+    job of the last run
+    """
+
+    def job_response(
+        self, task, kind, *args, sync_target=None, shared=False, **kwargs
+    ) -> Response:
+        # shared jobs refresh public data, any user polling them may read the result
+        owner = None if shared else self.request.user
+
+        def enqueue(job_id):
+            JobStore.enqueue(task, kind, owner, *args, job_id=job_id, **kwargs)
+
+        if sync_target is None:
+            job_id = str(uuid.uuid4())
+            enqueue(job_id)
+            flight = {"task_id": job_id, "status": SyncGate.QUEUED}
+        else:
+            flight = SyncGate.run(kind, sync_target, enqueue)
+
+        job_id = flight["task_id"]
+        job = JobStore.get(job_id) if flight["status"] != SyncGate.QUEUED else None
+        fresh = flight["status"] == SyncGate.FRESH
+        messages = {
+            SyncGate.QUEUED: f"{kind} job queued successfully",
+            SyncGate.IN_PROGRESS: f"{kind} job already in progress",
+            SyncGate.FRESH: f"{kind} ran recently, returning its job",
+        }
+        return Response(
+            {
+                "job_id": job_id,
+                "status": job["status"] if job else JobStore.QUEUED,
+                "status_url": self.request.build_absolute_uri(
+                    reverse("job-status", kwargs={"job_id": job_id})
+                ),
+                "message": messages[flight["status"]],
+            },
+            status=status.HTTP_200_OK if fresh else status.HTTP_202_ACCEPTED,
+        )
@@ -0,0 +1,44 @@
+################### LEXICAL CONTENT HELPERS ###################
+
+# node types that end a line of text in the editor
+BLOCK_NODES = {"paragraph", "heading", "quote", "listitem", "code", "linebreak"}
+
+
+def lexical_plain_text(content) -> str:
+    """
+    flattens a Lexical editor tree into plain text
+
+    Args:
+        content (dict | str): Lexical JSON ({"root": {"children": [...]}}) or plain text
+
+    Returns:
+        str: text of every text node, blocks separated by a space
+    """
+    if not isinstance(content, dict):
+        return str(content or "")
+
+    parts = []
+    stack = [content.get("root", content)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        if isinstance(node.get("text"), str):
+            parts.append(node["text"])
+        if node.get("type") in BLOCK_NODES:
+            # closes the block after its children have been visited
+            stack.append(" ")
+        stack.extend(reversed(node.get("children") or []))
+
+    return " ".join("".join(parts).split())
+
+
+def build_excerpt(text, length=280) -> str:
+    """cuts plain text at a word boundary so list payloads stay small"""
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0]
+    return f"{cut}…"
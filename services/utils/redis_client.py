@@ -0,0 +1,10 @@
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    """shared connection pool to the redis instance configured by REDIS_URL"""
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
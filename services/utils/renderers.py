@@ -0,0 +1,65 @@
+import datetime
+import decimal
+
+import orjson
+from django.db.models.query import QuerySet
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+################### ORJSON RENDERING ###################
+
+
+def orjson_default(obj):
+    """types orjson does not serialize natively, mirrors DRF's JSONEncoder choices"""
+    if isinstance(obj, decimal.Decimal):
+        # token amounts are 32 digit integers, strings keep them exact in javascript
+        return str(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, (set, frozenset, QuerySet)):
+        return list(obj)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "__iter__") and not isinstance(obj, (bytes, bytearray)):
+        return list(obj)
+    raise TypeError(f"object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    drop-in replacement of JSONRenderer backed by orjson. datetimes, dates, uuids and
+    decimals are handled natively or by orjson_default, no per-serializer conversion needed
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        options = self.options
+        renderer_context = renderer_context or {}
+        # the browsable api asks for indented output through the media type
+        if renderer_context.get("indent") or "indent=" in (accepted_media_type or ""):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=orjson_default, option=options)
+
+
+class ORJSONParser(BaseParser):
+    """parses application/json request bodies with orjson"""
+
+    media_type = "application/json"
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as ex:
+            raise ParseError(f"JSON parse error - {str(ex)}")
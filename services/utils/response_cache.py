@@ -0,0 +1,240 @@
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from logging_config import logger
+from .db_router import use_primary
+
+################### RESPONSE CACHE ###################
+
+
+class ResponseCache:
+    """
+    generation based cache of public read payloads. every cached view names the scopes
+    it depends on, writes bump the generation of a scope which makes every key built
+    with the previous generation unreachable, stale entries simply expire.
+    the same generations (and the time of the last bump) back ETag and Last-Modified
+    """
+
+    PREFIX = "respcache"
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, "RESPONSE_CACHE_ENABLED", False)
+
+    @staticmethod
+    def timeout() -> int:
+        return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+    @staticmethod
+    def forum_scope(slug) -> str:
+        return f"forum:{slug}"
+
+    @staticmethod
+    def _generation_key(scope) -> str:
+        return f"{ResponseCache.PREFIX}:gen:{scope}"
+
+    @staticmethod
+    def _modified_key(scope) -> str:
+        return f"{ResponseCache.PREFIX}:modified:{scope}"
+
+    @staticmethod
+    def _incr(scope) -> None:
+        key = ResponseCache._generation_key(scope)
+        try:
+            # a lost counter restarts from the clock so old generations are never reused
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+            cache.incr(key)
+        except ValueError:
+            # evicted between add and incr
+            cache.set(key, time.time_ns() // 1000, timeout=None)
+        except Exception as ex:
+            logger.error(f"failed to bump response cache scope {scope}: {str(ex)}")
+        cache.set(ResponseCache._modified_key(scope), int(time.time()), timeout=None)
+
+    @staticmethod
+    def bump(*scopes) -> None:
+        """
+        invalidates every cached payload and etag of the given scopes. bumps right away so
+        this process never serves its own write stale, and again after commit so payloads
+        cached from pre-commit reads under the new generation are dropped as well
+
+        Args:
+            *scopes (str): scopes such as "dao", "presale" or forum_scope(slug)
+        """
+        for scope in scopes:
+            ResponseCache._incr(scope)
+            transaction.on_commit(lambda scope=scope: ResponseCache._incr(scope))
+
+    @staticmethod
+    def state(scopes) -> tuple:
+        """
+        reads the generations of the scopes with a single cache round trip
+
+        Args:
+            scopes (list): scopes the view depends on
+
+        Returns:
+            tuple: (generation string, unix time of the latest bump)
+        """
+        keys = {}
+        for scope in scopes:
+            keys[scope] = (
+                ResponseCache._generation_key(scope),
+                ResponseCache._modified_key(scope),
+            )
+        values = cache.get_many([key for pair in keys.values() for key in pair])
+
+        now = int(time.time())
+        generations, modified = [], []
+        for scope, (generation_key, modified_key) in keys.items():
+            if generation_key not in values:
+                cache.add(generation_key, time.time_ns() // 1000, timeout=None)
+                values[generation_key] = cache.get(generation_key, 0)
+            if modified_key not in values:
+                cache.add(modified_key, now, timeout=None)
+                values[modified_key] = cache.get(modified_key, now)
+            generations.append(str(values[generation_key]))
+            modified.append(int(values[modified_key]))
+
+        return ".".join(generations), max(modified, default=now)
+
+    @staticmethod
+    def reads_for(last_modified):
+        """
+        right after a bump a replica may not have replayed the write yet, payloads
+        cached or tagged under the new generation are read from the primary for the
+        same window a writing client is pinned to it
+
+        Args:
+            last_modified (int): unix time of the latest bump of the view's scopes
+
+        Returns:
+            context manager routing the reads of the handler
+        """
+        window = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+        if time.time() - last_modified <= window:
+            return use_primary()
+        return nullcontext()
+
+    @staticmethod
+    def _digest(namespace, generation, request, audience) -> str:
+        query = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+        )
+        return hashlib.md5(
+            f"{namespace}:{generation}:{audience}:{request.path}?{query}".encode()
+        ).hexdigest()
+
+    @staticmethod
+    def key(namespace, generation, request) -> str:
+        """cache key of the anonymous payload for the path, the sorted query and the generation"""
+        digest = ResponseCache._digest(namespace, generation, request, "anon")
+        return f"{ResponseCache.PREFIX}:{namespace}:{digest}"
+
+    @staticmethod
+    def etag(namespace, generation, request) -> str:
+        """strong etag, per user because per-user fields are part of the payload"""
+        audience = (
+            f"user{request.user.id}" if request.user.is_authenticated else "anon"
+        )
+        return quote_etag(
+            ResponseCache._digest(namespace, generation, request, audience)
+        )
+
+    @staticmethod
+    def not_modified(request, etag, last_modified) -> bool:
+        """evaluates If-None-Match (preferred) or If-Modified-Since like RFC 9110"""
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return "*" in etags or etag in etags
+
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        return if_modified_since is not None and last_modified <= if_modified_since
+
+
+class CachedResponseMixin:
+    """
+    serves list/retrieve payloads from the response cache and answers conditional GETs.
+    the cache only ever holds what an anonymous visitor sees, authenticated requests
+    reuse it and get their per-user fields filled in by apply_user_overlay.
+    etag and last-modified come from the scope generations, no serialization needed for a 304
+    """
+
+    cache_scopes = ()
+    cached_actions = ("list", "retrieve")
+    conditional_actions = ("list", "retrieve")
+
+    def get_cache_scopes(self):
+        return list(self.cache_scopes)
+
+    def apply_user_overlay(self, data, request):
+        """fills per-user fields (is_liked, user_stake) into a cached anonymous payload"""
+        return data
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cacheable = ResponseCache.enabled() and self.action in self.cached_actions
+        conditional = self.action in self.conditional_actions
+        if not (cacheable or conditional):
+            return handler(request, *args, **kwargs)
+
+        namespace = self.__class__.__name__
+        generation, last_modified = ResponseCache.state(self.get_cache_scopes())
+
+        headers = {}
+        if conditional:
+            headers = {
+                "ETag": ResponseCache.etag(namespace, generation, request),
+                "Last-Modified": http_date(last_modified),
+            }
+            if ResponseCache.not_modified(request, headers["ETag"], last_modified):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        with ResponseCache.reads_for(last_modified):
+            response = self._cached_or_handled(
+                cacheable, handler, namespace, generation, request, *args, **kwargs
+            )
+        if response.status_code == status.HTTP_200_OK:
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    def _cached_or_handled(
+        self, cacheable, handler, namespace, generation, request, *args, **kwargs
+    ):
+        if not cacheable:
+            return handler(request, *args, **kwargs)
+
+        key = ResponseCache.key(namespace, generation, request)
+        data = cache.get(key)
+
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            # only anonymous payloads are shareable between visitors
+            if (
+                response.status_code == status.HTTP_200_OK
+                and not request.user.is_authenticated
+            ):
+                cache.set(key, response.data, ResponseCache.timeout())
+            return response
+
+        if request.user.is_authenticated:
+            data = self.apply_user_overlay(data, request)
+        return Response(data)
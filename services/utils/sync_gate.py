@@ -0,0 +1,180 @@
+import time
+import uuid
+
+import orjson
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from .redis_client import get_redis
+
+################### SINGLE-FLIGHT REFRESHES ###################
+
+
+class SyncGate:
+    """
+    one in-flight chain sync per (operation, target). the first refresh request takes
+    a redis lock holding the id of the task it queues, concurrent requests get that id
+    back instead of queueing a duplicate. a successful run leaves a last-synced marker
+    that expires with the freshness window of the operation, refreshes inside the
+    window answer right away with the id of that run
+    """
+
+    PREFIX = "sync"
+
+    QUEUED = "queued"
+    IN_PROGRESS = "in_progress"
+    FRESH = "fresh"
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, "SYNC_GATE_ENABLED", True)
+
+    @staticmethod
+    def freshness(operation) -> int:
+        windows = getattr(settings, "SYNC_FRESHNESS_SECONDS", {})
+        return windows.get(operation, windows.get("default", 0))
+
+    @staticmethod
+    def lock_timeout() -> int:
+        # upper bound of a run with its retries, a crashed worker never wedges the target
+        return getattr(settings, "SYNC_LOCK_SECONDS", 600)
+
+    @staticmethod
+    def _lock_key(operation, target) -> str:
+        return f"{SyncGate.PREFIX}:lock:{operation}:{target}"
+
+    @staticmethod
+    def _synced_key(operation, target) -> str:
+        return f"{SyncGate.PREFIX}:last:{operation}:{target}"
+
+    @staticmethod
+    def _task_key(task_id) -> str:
+        return f"{SyncGate.PREFIX}:task:{task_id}"
+
+    @staticmethod
+    def last_synced(operation, target):
+        """
+        Returns:
+            dict | None: {"task_id": .., "synced_at": ..} of the last run inside the
+            freshness window, None when the target is stale
+        """
+        marker = get_redis().get(SyncGate._synced_key(operation, target))
+        return orjson.loads(marker) if marker else None
+
+    @staticmethod
+    def run(operation, target, enqueue) -> dict:
+        """
+        queues the sync unless the target is fresh or a sync of it is in flight
+
+        Args:
+            operation (str): kind of sync, e.g. dips, votes, presale_refresh
+            target (str | int): what is synced, e.g. a dao id
+            enqueue (callable): queues the task under the task id it is given
+
+        Returns:
+            dict: {"task_id": .., "status": queued | in_progress | fresh}, fresh
+            results also carry synced_at
+        """
+        task_id = str(uuid.uuid4())
+        if not SyncGate.enabled():
+            enqueue(task_id)
+            return {"task_id": task_id, "status": SyncGate.QUEUED}
+
+        marker = SyncGate.last_synced(operation, target)
+        if marker:
+            return {**marker, "status": SyncGate.FRESH}
+
+        client = get_redis()
+        lock_key = SyncGate._lock_key(operation, target)
+        if not client.set(lock_key, task_id, nx=True, ex=SyncGate.lock_timeout()):
+            running = client.get(lock_key)
+            if running:
+                return {"task_id": running, "status": SyncGate.IN_PROGRESS}
+            # released between set and get, the caller may simply retry
+            return SyncGate.run(operation, target, enqueue)
+
+        client.set(
+            SyncGate._task_key(task_id),
+            f"{operation}|{target}",
+            ex=SyncGate.lock_timeout(),
+        )
+        try:
+            enqueue(task_id)
+        except Exception:
+            SyncGate.release(task_id)
+            raise
+        return {"task_id": task_id, "status": SyncGate.QUEUED}
+
+    @staticmethod
+    def release(task_id, synced=False) -> None:
+        """
+        frees the lock taken for the task, a successful run also marks the target fresh.
+        tasks queued outside the gate (beat schedules) are ignored
+
+        Args:
+            task_id (str): id of the finished task
+            synced (bool): whether the run succeeded
+        """
+        client = get_redis()
+        entry = client.get(SyncGate._task_key(task_id))
+        if not entry:
+            return
+        operation, target = entry.split("|", 1)
+        lock_key = SyncGate._lock_key(operation, target)
+
+        if synced and SyncGate.freshness(operation) > 0:
+            client.set(
+                SyncGate._synced_key(operation, target),
+                orjson.dumps({"task_id": task_id, "synced_at": int(time.time())}),
+                ex=SyncGate.freshness(operation),
+            )
+
+        # only the owner deletes the lock, an expired one may already belong to a new run
+        def delete_own_lock(pipe):
+            owner = pipe.get(lock_key)
+            pipe.multi()
+            if owner == task_id:
+                pipe.delete(lock_key)
+            pipe.delete(SyncGate._task_key(task_id))
+
+        client.transaction(delete_own_lock, lock_key)
+
+
+class SyncResponseMixin:
+    """refresh views answer with the task serving the request, new or already running"""
+
+    SYNC_MESSAGES = {
+        SyncGate.IN_PROGRESS: "sync already in progress",
+        SyncGate.FRESH: "synced recently, no new sync queued",
+    }
+
+    def sync_response(self, operation, target, enqueue, queued_message, **data) -> Response:
+        """
+        Args:
+            operation (str): kind of sync
+            target (str | int): what is synced
+            enqueue (callable): queues the task under the task id it is given
+            queued_message (str): message when a new task was queued
+            **data: extra response fields
+
+        Returns:
+            Response: 202 with the queued or running task, 200 when the target is fresh
+        """
+        flight = SyncGate.run(operation, target, enqueue)
+        message = self.SYNC_MESSAGES.get(flight["status"], queued_message)
+        return Response(
+            {**data, **flight, "message": message},
+            status=status.HTTP_200_OK
+            if flight["status"] == SyncGate.FRESH
+            else status.HTTP_202_ACCEPTED,
+        )
+
+
+def release_sync_on_success(sender=None, **kwargs):
+    """celery task_success handler"""
+    SyncGate.release(sender.request.id, synced=True)
+
+
+def release_sync_on_failure(sender=None, task_id=None, **kwargs):
+    """celery task_failure handler, raised after the last retry"""
+    SyncGate.release(task_id)
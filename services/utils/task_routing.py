@@ -0,0 +1,112 @@
+import inspect
+
+from celery import current_app
+from django.conf import settings
+from logging_config import logger
+
+################### CELERY QUEUES ###################
+
+
+class TaskRouting:
+    """
+    chain tasks spend their time waiting on rpc nodes, they go to a chain.<network>
+    queue consumed by gevent workers with high concurrency so a slow network only
+    fills its own queue. database maintenance and image work stay on the prefork
+    maintenance queue
+    """
+
+    DEFAULT_QUEUE = "celery"
+    MAINTENANCE_QUEUE = "maintenance"
+    CHAIN_PREFIX = "chain"
+    CHAIN_DEFAULT_QUEUE = "chain.default"
+
+    CHAIN_TASK_PREFIX = "blockchain."
+    MAINTENANCE_TASKS = {
+        "forum.tasks.dip_cleanup",
+        "forum.flush_views",
+        "forum.finalize_ended_dips",
+        "dao.reconcile_dao_stats",
+        "media.generate_image_variants",
+    }
+
+    # task arguments that tell which network a task talks to, first match wins
+    NETWORK_ARGUMENTS = ("network", "dao_id", "slug", "dip_id", "presale_id")
+
+    @staticmethod
+    def chain_queue(network) -> str:
+        """networks without a queue of their own share chain.default"""
+        if network in getattr(settings, "CHAIN_QUEUE_NETWORKS", []):
+            return f"{TaskRouting.CHAIN_PREFIX}.{network}"
+        return TaskRouting.CHAIN_DEFAULT_QUEUE
+
+    @staticmethod
+    def _lookup_network(argument, value):
+        from dao.models import Dao, Presale
+        from forum.models import Dip
+
+        lookups = {
+            "dao_id": lambda: Dao.objects.filter(id=value).values_list("network"),
+            "slug": lambda: Dao.objects.filter(slug=value).values_list("network"),
+            "dip_id": lambda: Dip.objects.filter(id=value).values_list("dao__network"),
+            "presale_id": lambda: Presale.objects.filter(id=value).values_list(
+                "dao__network"
+            ),
+        }
+        row = lookups[argument]().first()
+        return row[0] if row else None
+
+    @staticmethod
+    def network_of(task, args, kwargs):
+        """
+        Args:
+            task (Task): task being sent
+            args (tuple): its positional arguments
+            kwargs (dict): its keyword arguments
+
+        Returns:
+            int | None: chain id the task works on, None for sweeps over every network
+        """
+        try:
+            arguments = inspect.signature(task.run).bind_partial(*args, **kwargs).arguments
+        except (TypeError, ValueError):
+            return None
+
+        for argument in TaskRouting.NETWORK_ARGUMENTS:
+            value = arguments.get(argument)
+            if value in (None, ""):
+                continue
+            if argument == "network":
+                return int(value)
+            try:
+                return TaskRouting._lookup_network(argument, value)
+            except Exception as ex:
+                # routing must never keep a task from being sent
+                logger.error(f"failed to resolve the network of {task.name}: {str(ex)}")
+                return None
+        return None
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """celery task_routes entry"""
+    if name in TaskRouting.MAINTENANCE_TASKS:
+        return {"queue": TaskRouting.MAINTENANCE_QUEUE}
+    if name.startswith(TaskRouting.CHAIN_TASK_PREFIX):
+        task = task or current_app.tasks.get(name)
+        network = TaskRouting.network_of(task, args, kwargs) if task else None
+        return {"queue": TaskRouting.chain_queue(network)}
+    return None
+
+
+class QueueAnnotations:
+    """
+    delivery settings per queue, applied to the task classes through task_annotations.
+    chain syncs and maintenance runs are idempotent, they are acknowledged after they
+    finish so a lost worker hands them to another one
+    """
+
+    def annotate(self, task):
+        if task.name.startswith(TaskRouting.CHAIN_TASK_PREFIX):
+            return {"acks_late": True, "reject_on_worker_lost": True}
+        if task.name in TaskRouting.MAINTENANCE_TASKS:
+            return {"acks_late": True}
+        return None
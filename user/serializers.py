@@ -1,9 +1,15 @@
 from rest_framework import serializers
 from core.models import User
+from services.utils.image_variants import ImageVariantService
 
 
 class UserSerializer(serializers.ModelSerializer):
 
+    def __init__(self, *args, avatar=False, **kwargs):
+        # avatar=True links the avatar derivative instead of the uploaded image
+        self.avatar = avatar
+        super().__init__(*args, **kwargs)
+
     class Meta:
         model = User
         fields = ["nickname", "email", "image"]
@@ -24,6 +30,14 @@ class UserSerializer(serializers.ModelSerializer):
             instance.image = validated_data["image"]
         return super().update(instance, validated_data)
 
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        if self.avatar:
+            representation["image"] = ImageVariantService.url(
+                instance, "image", "avatar", self.context.get("request")
+            )
+        return representation
+
 
 class UserDetailSerializer(serializers.ModelSerializer):
     class Meta:
@@ -41,4 +55,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
             else:
                 # Fallback to relative URL if request is not available
                 representation['image'] = instance.image.url
+        representation["avatar"] = ImageVariantService.urls(
+            instance, "image", "avatar", self.context.get("request")
+        )
         return representation
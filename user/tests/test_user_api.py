@@ -100,3 +100,20 @@ class UserAPITests(APITestCase):
 
         response = self.client.delete(self.profile_url, **self.HTTP_AUTHORIZATION)
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_avatar_is_linked_only_when_asked(self):
+        from user.serializers import UserSerializer
+
+        self.user.image_variants = {
+            "image": {
+                "source": self.user.image.name,
+                "avatar": {"webp": "images/user_avatar.webp", "jpeg": "images/user_avatar.jpeg"},
+            }
+        }
+
+        # a top level list has a parent too, it keeps the uploaded image
+        listed = UserSerializer([self.user], many=True).data[0]
+        self.assertEqual(listed["image"], self.user.image.url)
+
+        nested = UserSerializer(self.user, avatar=True).data
+        self.assertTrue(nested["image"].endswith("images/user_avatar.webp"))
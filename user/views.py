@@ -12,7 +12,8 @@ from user.serializers import (
 from core.models import User
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.parsers import FormParser, MultiPartParser, JSONParser
+from rest_framework.parsers import FormParser, MultiPartParser
+from services.utils.renderers import ORJSONParser
 from drf_spectacular.utils import extend_schema
 from services.utils.exception_handler import ErrorHandlingMixin
 
@@ -25,7 +26,7 @@ class BaseUserView(
 ):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
 
     def get_queryset(self):
         """retrieves objects belonging to the authenticated user"""
@@ -36,7 +37,7 @@ class UserApiView(BaseUserView):
     serializer_class = UserSerializer
     queryset = User.objects.all()
     lookup_field = "eth_address"
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
 
     @extend_schema(responses=UserDetailSerializer)
     @action(detail=False, methods=["get"], url_path="profile")